@@ -2,6 +2,7 @@
 """
 简介：解析 Markdown 文本，生成标题层级结构树，并可选择包含代码块，支持父级访问和查找功能。
 使用方法：调用 parse_markdown 函数并传入 Markdown 文本和是否包含代码块的参数，返回结构对象。
+对于很大的文档，调用 iter_markdown_nodes 传入文件对象或文本块迭代器，流式产出标题和代码块节点。
 工作流：
 1. 导入必要的模块
 2. 定义节点类
@@ -13,18 +14,31 @@
 import re
 import json
 import os
+import codecs
 import logging as log
 from enum import Enum
-from markdown_it import MarkdownIt
+from functools import lru_cache
 import traceback
-from create_dir_structure import create_dir_structure
-from extract_file_paths import extract_path, find_longest_path
+
+# markdown_it、create_dir_structure 和 extract_file_paths 在首次使用时才导入：
+# create_dir_structure 导入时会把日志级别设为 DEBUG，只解析 Markdown 的调用方不需要承担这些开销
+_MARKDOWN_PARSERS = {}  # {(预设名称, 选项): MarkdownIt 实例}，同一配置共享一个实例
+
+
+PATH_SEPARATOR = "/"  # 标题路径中各级标题之间的分隔符，如 "项目结构/配置模块"
 
 
 class NodeType(Enum):
     HEADING = "heading"
     CODE_BLOCK = "code_block"
 
+@lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """编译并缓存查找用的正则表达式，已编译的表达式原样返回。"""
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    return re.compile(pattern, re.UNICODE)
+
 class Node:
     """节点类，表示结构树中的每个节点。"""
 
@@ -36,32 +50,66 @@ class Node:
         self.code_type = code_type
         self.children = []
         self.parent = None
+        self._index = None  # index() 建立的索引，树结构变化时清空
 
     def add_child(self, child):
         """添加子节点并设置父节点。"""
         child.parent = self
         self.children.append(child)
+        node = self
+        while node is not None:
+            node._index = None
+            node = node.parent
+
+    def walk(self):
+        """按文档顺序（先序）迭代遍历自身及所有子孙节点。"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
 
     def find_title(self, title_pattern):
         """根据标题进行正则查找。"""
-        if re.search(title_pattern, self.title or '', re.UNICODE):
-            yield self
-        for child in self.children:
-            yield from child.find_title(title_pattern)
+        search = compile_pattern(title_pattern).search
+        for node in self.walk():
+            if search(node.title or ''):
+                yield node
 
     def find_content(self, content_pattern):
         """根据内容进行正则查找。"""
-        if self.content and re.search(content_pattern, self.content, re.UNICODE):
-            yield self
-        for child in self.children:
-            yield from child.find_content(content_pattern)
+        search = compile_pattern(content_pattern).search
+        for node in self.walk():
+            if node.content and search(node.content):
+                yield node
 
     def find_type(self, node_type):
         """根据类型查找节点。"""
-        if self.type == node_type:
-            yield self
-        for child in self.children:
-            yield from child.find_type(node_type)
+        for node in self.walk():
+            if node.type == node_type:
+                yield node
+
+    def heading_path(self):
+        """返回从顶级标题到本节点所属标题的路径，如 "项目结构/配置模块"；代码块使用所在标题的路径。"""
+        titles = []
+        node = self
+        while node is not None and node.parent is not None:
+            if node.type == 'heading':
+                titles.append(node.title or '')
+            node = node.parent
+        return PATH_SEPARATOR.join(reversed(titles))
+
+    def index(self):
+        """
+        返回以本节点为根的查找索引，首次调用时建立，之后树结构不变时直接复用。
+
+        使用方法：
+        index = tree.index()
+        index.get_path("项目结构/配置模块")
+        """
+        if self._index is None:
+            self._index = NodeIndex(self)
+        return self._index
 
     def to_dict(self):
         """将节点及其子节点转换为字典结构。"""
@@ -80,78 +128,359 @@ class Node:
     def __repr__(self):
         return self.__str__()
 
-def parse_markdown(markdown_text, include_code_blocks=True):
+class NodeIndex:
+    """
+    结构树的查找索引：一次遍历建立按类型、按标题和按标题路径的索引，重复查询不再遍历整棵树。
+    正则查询只匹配去重后的标题或内容，并缓存结果；返回的节点均按文档顺序排列。
+    """
+
+    def __init__(self, root):
+        """
+        :param root: 结构树的根节点（通常是 parse_markdown 的返回值）
+        """
+        self.root = root
+        self.nodes = []  # 先序遍历顺序的全部节点（不含根节点）
+        self.positions = {}  # {节点: 在 nodes 中的下标}
+        self.by_type = {}  # {节点类型: [节点]}
+        self.by_title = {}  # {标题: [节点]}
+        self.by_path = {}  # {标题路径: [标题节点]}
+        self._queries = {}  # {(查询类型, 正则): 结果节点元组}
+
+        stack = [(child, '') for child in reversed(root.children)]
+        while stack:
+            node, parent_path = stack.pop()
+            self.positions[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.by_type.setdefault(node.type, []).append(node)
+            path = parent_path
+            if node.type == 'heading':
+                title = node.title or ''
+                path = f"{parent_path}{PATH_SEPARATOR}{title}" if parent_path else title
+                self.by_title.setdefault(title, []).append(node)
+                self.by_path.setdefault(path, []).append(node)
+            stack.extend((child, path) for child in reversed(node.children))
+
+    def find_type(self, node_type):
+        """返回指定类型的全部节点。"""
+        return list(self.by_type.get(node_type, ()))
+
+    def get_title(self, title):
+        """返回标题完全等于 title 的全部节点。"""
+        return list(self.by_title.get(title, ()))
+
+    def get_path(self, path):
+        """
+        返回标题路径完全匹配的标题节点。
+
+        :param path: "项目结构/配置模块" 形式的字符串，或标题列表 ["项目结构", "配置模块"]
+        :return: 节点列表，同一路径下有重名标题时可能有多个
+        """
+        if not isinstance(path, str):
+            path = PATH_SEPARATOR.join(path)
+        return list(self.by_path.get(path, ()))
+
+    def find_title(self, title_pattern):
+        """根据标题进行正则查找。"""
+        return self._query('title', title_pattern, self.by_title)
+
+    def find_path(self, path_pattern):
+        """根据标题路径进行正则查找，如 r"^项目结构/.*模块$"。"""
+        return self._query('path', path_pattern, self.by_path)
+
+    def find_content(self, content_pattern):
+        """根据内容进行正则查找。"""
+        key = ('content', content_pattern)
+        result = self._queries.get(key)
+        if result is None:
+            search = compile_pattern(content_pattern).search
+            result = tuple(node for node in self.nodes if node.content and search(node.content))
+            self._queries[key] = result
+        return list(result)
+
+    def children_of_type(self, path, node_type):
+        """返回标题路径下（不含更深层标题中的）指定类型的直接子节点，如某一节中的代码块。"""
+        return [child for node in self.get_path(path) for child in node.children if child.type == node_type]
+
+    def _query(self, kind, pattern, mapping):
+        """对去重后的键做正则匹配，合并对应节点并恢复文档顺序。"""
+        key = (kind, pattern)
+        result = self._queries.get(key)
+        if result is None:
+            search = compile_pattern(pattern).search
+            matched = [node for text, nodes in mapping.items() if search(text) for node in nodes]
+            matched.sort(key=self.positions.__getitem__)
+            result = tuple(matched)
+            self._queries[key] = result
+        return list(result)
+
+def get_markdown_parser(config="commonmark", options=None):
+    """
+    获取共享的 MarkdownIt 实例，同一配置只在首次调用时创建。MarkdownIt.parse 不修改实例状态，可以重复使用。
+    选项中有列表、字典等不可哈希的值时无法作为缓存键，每次调用都创建新的实例。
+
+    :param config: MarkdownIt 预设名称，如 "commonmark"、"gfm-like"
+    :param options: 覆盖预设的选项字典，如 {"breaks": True}
+    :return: MarkdownIt 实例
+    """
+    key = (config, tuple(sorted(options.items())) if options else ())
+    try:
+        md = _MARKDOWN_PARSERS.get(key)
+    except TypeError:
+        from markdown_it import MarkdownIt
+        return MarkdownIt(config, options)
+    if md is None:
+        from markdown_it import MarkdownIt
+        md = _MARKDOWN_PARSERS.setdefault(key, MarkdownIt(config, options))
+    return md
+
+def parse_markdown(markdown_text, include_code_blocks=True, config="commonmark", options=None):
     """
     解析 Markdown 文本，生成结构树，包括可选的代码块。
 
     使用方法：
     tree = parse_markdown('你的 Markdown 文本', include_code_blocks=True)
+
+    参数：
+    - config：MarkdownIt 预设名称，默认 "commonmark"。
+    - options：覆盖预设的选项字典，默认为 None。相同的 config 和 options 共享一个解析器实例。
     
     工作流：
     1. 解析文本
-    2. 构建结构树
+    2. 按下标单次遍历令牌列表，构建结构树（耗时与令牌数成线性关系）
     """
     try:
-        md = MarkdownIt()
-        tokens = md.parse(markdown_text)
+        tokens = get_markdown_parser(config, options).parse(markdown_text)
 
         root = Node(level=0)  # 根节点
         stack = [root]
-        
-        for token in tokens:
-            if token.type == 'heading_open':
-                level = int(token.tag[1])  # 获取标题级别
-                title_token = tokens[tokens.index(token) + 1]
-                title = title_token.content if title_token.type == 'inline' else ''
-
-                # 创建标题节点
-                node = Node(level, title=title, node_type='heading')
-
-                # 调整栈以匹配层级
-                while stack and stack[-1].level >= level:
-                    stack.pop()
-
-                stack[-1].add_child(node)
-                stack.append(node)
-
-            elif token.type == 'fence' and include_code_blocks:  # 处理代码块
-                code_content = token.content.strip()  # 获取代码内容
-                code_node = Node(
-                  level=stack[-1].level + 1, 
-                  content=code_content, 
-                  node_type='code_block',
-                  code_type=token.info)
-                
-                if stack:
-                    stack[-1].add_child(code_node)
+        for node, parent in build_nodes(tokens, stack, include_code_blocks):
+            parent.add_child(node)
 
         return root
 
-    except Exception as e:
+    except Exception:
         log.error("Markdown parsing failed: ", exc_info=True)
         return None
 
+def build_nodes(tokens, stack, include_code_blocks=True):
+    """
+    按下标单次遍历令牌列表，维护标题栈，按文档顺序产出标题和代码块节点及其父节点。
+    标题内容是紧随 heading_open 的 inline 令牌，按下标取，不用 tokens.index 线性查找。
+
+    :param tokens: MarkdownIt.parse 返回的令牌列表
+    :param stack: 标题栈，栈底是根节点；遍历过程中原地更新，可跨多次调用延续
+    :param include_code_blocks: 是否产出代码块节点
+    :return: (节点, 父节点) 的生成器，节点尚未挂到父节点上
+    """
+    token_count = len(tokens)
+    for index, token in enumerate(tokens):
+        if token.type == 'heading_open':
+            level = int(token.tag[1])  # 获取标题级别
+            title_token = tokens[index + 1] if index + 1 < token_count else None
+            title = title_token.content if title_token is not None and title_token.type == 'inline' else ''
+            node = Node(level, title=title, node_type='heading')
+
+            # 调整栈以匹配层级
+            while stack[-1].level >= level:
+                stack.pop()
+            parent = stack[-1]
+            stack.append(node)
+            yield node, parent
+
+        elif token.type == 'fence' and include_code_blocks:  # 处理代码块
+            parent = stack[-1]
+            yield Node(level=parent.level + 1, content=token.content.strip(), node_type='code_block',
+                       code_type=token.info), parent
+
+FENCE_OPEN_PATTERN = re.compile(r" {0,3}(`{3,}|~{3,})(.*)")
+FENCE_CLOSE_PATTERN = re.compile(r" {0,3}(`{3,}|~{3,})[ \t]*\r?\n?$")
+ATX_HEADING_PATTERN = re.compile(r"#{1,6}(?:[ \t]|\r?\n?$)")
+# 可以跨越空行的 HTML 块（CommonMark 类型1-5）的 (开始条件, 结束条件)，与 MarkdownIt 的 html_block 规则相同
+HTML_BLOCK_PATTERNS = [
+    (re.compile(r" {0,3}<(?:script|pre|style|textarea)(?=\s|>|$)", re.IGNORECASE),
+     re.compile(r"</(?:script|pre|style|textarea)>", re.IGNORECASE)),
+    (re.compile(r" {0,3}<!--"), re.compile(r"-->")),
+    (re.compile(r" {0,3}<\?"), re.compile(r"\?>")),
+    (re.compile(r" {0,3}<![A-Z]"), re.compile(r">")),
+    (re.compile(r" {0,3}<!\[CDATA\["), re.compile(r"\]\]>")),
+]
+
+def iter_text_chunks(source, chunk_size=65536):
+    """
+    把文件对象、字符串或文本块迭代器统一为文本块生成器，二进制内容按 UTF-8 增量解码。
+
+    :param source: 文本或二进制模式打开的文件对象、字符串、bytes，或产出 str / bytes 的迭代器
+    :param chunk_size: 从文件对象每次读取的大小
+    """
+    if isinstance(source, (str, bytes)):
+        source = [source]
+    elif hasattr(source, 'read'):
+        source = iter_file_chunks(source, chunk_size)
+
+    decoder = None
+    for chunk in source:
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+def iter_file_chunks(file, chunk_size):
+    """逐块读取文件对象，直到读到空内容。"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def html_block_end(line):
+    """行开始一个可以跨越空行的 HTML 块且同一行内没有结束时，返回该块的结束条件，否则返回None。"""
+    if not line.lstrip(' ').startswith('<'):
+        return None
+    for start, end in HTML_BLOCK_PATTERNS:
+        if start.match(line):
+            return None if end.search(line) else end
+    return None
+
+def iter_markdown_sections(source, chunk_size=65536, section_size=65536):
+    """
+    把 Markdown 输入切分成可以独立解析的分段，每段至少 section_size 个字符（最后一段除外）。
+
+    只在这样的行之前切分：行首（无缩进）的 ATX 标题，前一行是空行，且不在顶层围栏代码块中，
+    也不在 HTML 注释、<script>/<pre> 等可以跨越空行的 HTML 块（类型1-5）中。
+    空行结束了段落、HTML块（类型6、7）、引用和列表的延续，无缩进的标题也不可能是缩进代码块，
+    因此这一行在完整文档中同样是一个标题，切分前后各段的解析结果与整篇解析一致。
+    只记录切分点之间的内容，内存占用与最大分段相当，与文档总大小无关。
+
+    :param source: 见 iter_text_chunks
+    :param chunk_size: 从文件对象每次读取的大小
+    :param section_size: 分段的最小字符数，较大的分段减少 MarkdownIt 的调用次数
+    :return: 分段文本的生成器
+    """
+    buffer = []
+    buffered = 0
+    fence = None  # 当前所在顶层围栏代码块的 (围栏字符, 围栏长度)
+    html_end = None  # 当前所在 HTML 块的结束条件
+    previous_blank = True
+    pending = ''
+
+    def feed(line):
+        nonlocal buffer, buffered, fence, html_end, previous_blank
+        section = None
+        if html_end is not None:
+            if html_end.search(line):
+                html_end = None
+        elif fence is None:
+            if previous_blank and buffered >= section_size and ATX_HEADING_PATTERN.match(line):
+                section = "".join(buffer)
+                buffer = []
+                buffered = 0
+            match = FENCE_OPEN_PATTERN.match(line)
+            if match and not (match.group(1)[0] == '`' and '`' in match.group(2)):
+                fence = (match.group(1)[0], len(match.group(1)))
+            else:
+                html_end = html_block_end(line)
+        else:
+            match = FENCE_CLOSE_PATTERN.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= fence[1]:
+                fence = None
+        buffer.append(line)
+        buffered += len(line)
+        previous_blank = not line.strip()
+        return section
+
+    for chunk in iter_text_chunks(source, chunk_size):
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            section = feed(line + '\n')
+            if section:
+                yield section
+    if pending:
+        section = feed(pending)
+        if section:
+            yield section
+    if buffer:
+        yield "".join(buffer)
+
+def iter_markdown_nodes(source, include_code_blocks=True, config="commonmark", options=None, chunk_size=65536,
+                        section_size=65536):
+    """
+    流式解析 Markdown，按文档顺序产出标题和代码块节点，每个分段读完即解析并产出其中的节点。
+    只保留当前的标题栈，不建立整棵结构树：节点的 parent 指向所属标题（顶级标题指向一个空的根节点），
+    但不会加入父节点的 children，因此内存占用与文档总大小无关。
+
+    使用方法：
+    with open("spec.md", "r", encoding="utf-8") as f:
+        for node in iter_markdown_nodes(f):
+            print(node.type, node.heading_path())
+
+    :param source: 文件对象、字符串、bytes，或产出 str / bytes 的迭代器
+    :param include_code_blocks: 是否产出代码块节点
+    :param config: MarkdownIt 预设名称
+    :param options: 覆盖预设的选项字典
+    :param chunk_size: 从文件对象每次读取的大小
+    :param section_size: 每次交给 MarkdownIt 解析的最小字符数，见 iter_markdown_sections
+    :return: 节点生成器
+    """
+    md = get_markdown_parser(config, options)
+    stack = [Node(level=0)]
+    for section in iter_markdown_sections(source, chunk_size, section_size):
+        try:
+            tokens = md.parse(section)
+        except Exception as e:
+            log.error(f"Markdown parsing failed, section skipped: {e}", exc_info=True)
+            continue
+        for node, parent in build_nodes(tokens, stack, include_code_blocks):
+            node.parent = parent
+            yield node
+
+def code_node_to_item(code_node):
+    """根据代码块节点的前两行和所属标题推断文件路径，返回 extract_code 的结果项。"""
+    from extract_file_paths import find_longest_path
+
+    code_text = code_node.content
+    path = find_longest_path("\n".join(code_text.strip().split("\n")[:2]), code_node.parent.title)
+    code_type = code_node.code_type
+
+    if code_type == "plaintext":
+        path = "project_structure.txt"
+    return {
+        "relative_path": path,
+        "code_type": code_type,
+        "content": code_text
+    }
+
 def extract_code(content):
+    """
+    提取 Markdown 中的全部代码块及其推断的文件路径。
+
+    :param content: Markdown 文本；也可以是文件对象或文本块迭代器，此时使用 iter_extract_code 流式解析
+    :return: [{"relative_path": 路径, "code_type": 语言, "content": 代码}]
+    """
+    if not isinstance(content, str):
+        return list(iter_extract_code(content))
+
     tree = parse_markdown(content)
     if not tree:
         return []
+    return [code_node_to_item(code_node) for code_node in tree.find_type('code_block')]
 
-    code_nodes = tree.find_type('code_block')
-    data = []
-    for code_node in code_nodes:
-        code_text = code_node.content
-        # 假设 `find_longest_path` 是已定义的函数，用于根据代码内容获取路径
-        path = find_longest_path("\n".join(code_text.strip().split("\n")[:2]), code_node.parent.title)  
-        code_type = code_node.code_type
-
-        if code_type == "plaintext":
-            path = "project_structure.txt"
-        data.append({
-            "relative_path": path, 
-            "code_type": code_type, 
-            "content": code_text
-        })
-    return data
+def iter_extract_code(source, **kwargs):
+    """
+    流式版本的 extract_code，逐个产出代码块，内存占用与文档总大小无关。
+
+    :param source: 文件对象、字符串、bytes，或产出 str / bytes 的迭代器
+    :param kwargs: 传给 iter_markdown_nodes 的其他参数
+    """
+    for node in iter_markdown_nodes(source, **kwargs):
+        if node.type == 'code_block':
+            yield code_node_to_item(node)
 
 def get_plaintext_file(codes):
     for item in codes:
@@ -159,53 +488,87 @@ def get_plaintext_file(codes):
             return item
     return {}
 
-def process_markdown(markdown_content: str, project_dir: str, is_create_dir_structure: bool = True, is_create_file: bool = True, is_replace_file: bool = True) -> None:
+def create_project_structure(directory_structure, project_dir, is_replace_file):
+    """根据 plaintext 目录结构文档创建目录结构，出错时打印错误并继续。"""
+    try:
+        from create_dir_structure import create_dir_structure
+        create_dir_structure(directory_structure["content"], project_dir, is_replace_file)
+        print("目录结构创建成功。")
+    except Exception:
+        print("创建目录结构时出现错误：")
+        traceback.print_exc()
+
+def write_code_file(item, project_dir, is_create_file, is_replace_file):
+    """把 extract_code 的一个结果项写入项目目录。"""
+    rel_path = item["relative_path"]
+    content = item["content"]
+    if not rel_path:
+        print("rel_path提取失败：无法找到文件名,内容：", content)
+        return
+    filepath = os.path.join(project_dir, rel_path)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    if is_create_file:
+        if not os.path.exists(filepath) or is_replace_file:
+            try:
+                with open(filepath, "w") as f:
+                    f.write(content)
+                print(f"文件 {filepath} 创建/更新成功。")
+            except Exception as e:
+                print(f"写入文件 {filepath} 时出现错误：{e}")
+        else:
+            print(f"跳过写入已存在的文件 {filepath}，因为不启用替换。")
+    else:
+        print("跳过文件创建。")
+
+def process_markdown(markdown_content, project_dir: str, is_create_dir_structure: bool = True, is_create_file: bool = True, is_replace_file: bool = True) -> None:
     """
     处理 Markdown 内容，根据参数创建目录结构和文件。
 
     参数：
-    - markdown_content：Markdown 文本内容。
+    - markdown_content：Markdown 文本内容；也可以是文件对象或文本块迭代器，此时边解析边写入文件，内存占用与文档大小无关。
     - project_dir：项目目录路径。
     - is_create_dir_structure：是否创建目录结构，默认为 True。
     - is_create_file：是否创建文件，默认为 True。
     - is_replace_file：是否替换已存在的文件，默认为 True。
     """
+    if not isinstance(markdown_content, str):
+        process_markdown_stream(markdown_content, project_dir, is_create_dir_structure, is_create_file, is_replace_file)
+        return
+
     code_files = extract_code(markdown_content)
     directory_structure = get_plaintext_file(code_files)
 
     if is_create_dir_structure:
         if directory_structure:
-            try:
-                create_dir_structure(directory_structure["content"], project_dir, is_replace_file)
-                print("目录结构创建成功。")
-            except Exception as e:
-                print("创建目录结构时出现错误：")
-                traceback.print_exc()
+            create_project_structure(directory_structure, project_dir, is_replace_file)
         else:
             print("没有检测到plaintext目录结构文档")
     else:
         print("跳过创建目录结构。")
 
     for item in code_files:
-        rel_path = item["relative_path"]
-        content = item["content"]
-        if not rel_path:
-            print("rel_path提取失败：无法找到文件名,内容：", content)
-            continue
-        filepath = os.path.join(project_dir, rel_path)
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        if is_create_file:
-            if not os.path.exists(filepath) or is_replace_file:
-                try:
-                    with open(filepath, "w") as f:
-                        f.write(content)
-                    print(f"文件 {filepath} 创建/更新成功。")
-                except Exception as e:
-                    print(f"写入文件 {filepath} 时出现错误：{e}")
-            else:
-                print(f"跳过写入已存在的文件 {filepath}，因为不启用替换。")
-        else:
-            print("跳过文件创建。")
+        write_code_file(item, project_dir, is_create_file, is_replace_file)
+
+def process_markdown_stream(source, project_dir, is_create_dir_structure=True, is_create_file=True, is_replace_file=True):
+    """
+    流式版本的 process_markdown：遇到第一个 plaintext 目录结构文档时创建目录结构，其余代码块读到即写入。
+    目录结构出现在部分代码文件之后时，不再用占位内容覆盖已存在的文件。
+
+    :param source: 文件对象、字符串、bytes，或产出 str / bytes 的迭代器
+    """
+    if not is_create_dir_structure:
+        print("跳过创建目录结构。")
+    structure_found = False
+    files_written = False
+    for item in iter_extract_code(source):
+        if item["code_type"] == "plaintext" and not structure_found:
+            structure_found = True
+            if is_create_dir_structure:
+                create_project_structure(item, project_dir, is_replace_file and not files_written)
+        write_code_file(item, project_dir, is_create_file, is_replace_file)
+        files_written = True
+    if is_create_dir_structure and not structure_found:
+        print("没有检测到plaintext目录结构文档")
 
 # 示例用法
 if __name__ == "__main__":
@@ -230,3 +593,6 @@ if __name__ == "__main__":
     markdown_text = open("temp.txt","r").read()+"\n\n\n\n"
     project_dir = "/content/utils/QuickUI"
     process_markdown(markdown_text, project_dir)
+    # 很大的文档可以直接传入文件对象，边解析边写入
+    # with open("temp.txt", "r", encoding="utf-8") as f:
+    #     process_markdown(f, project_dir)
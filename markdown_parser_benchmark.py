@@ -0,0 +1,219 @@
+# /content/utils/markdown_parser_benchmark.py
+"""
+简介：markdown_parser 性能基准测试。生成指定大小（MB）的合成项目说明文档（多级标题、段落、列表、
+带文件路径注释的代码块和 plaintext 目录结构），分别统计 MarkdownIt 分词、parse_markdown 建树、extract_code、
+建立 NodeIndex 索引、遍历查找与索引查找，以及流式解析 iter_markdown_nodes / iter_extract_code 各阶段的耗时、每秒处理字节数和峰值内存，以JSON格式输出，便于确认解析耗时随文档大小线性增长。
+
+使用方法：
+python markdown_parser_benchmark.py --sizes 1 4 16 --output md_bench.json
+
+工作流：
+1. 生成合成文档
+2. 依次运行各阶段并计时
+3. 可选地在 tracemalloc 下再运行一次，统计各阶段峰值内存
+4. 输出JSON结果
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import markdown_parser
+
+MB = 1024 * 1024
+QUERY_PATTERN = r"^模块 1\d*$"  # 查找阶段使用的标题正则
+STREAM_CHUNK_SIZE = 65536  # 流式阶段每次输入的文本块大小
+
+
+def iter_chunks(markdown_text):
+    """把文档切成文本块迭代器，模拟逐块读取文件。"""
+    for start in range(0, len(markdown_text), STREAM_CHUNK_SIZE):
+        yield markdown_text[start:start + STREAM_CHUNK_SIZE]
+
+
+def consume(iterator):
+    """消费迭代器并返回元素个数，不保留元素。"""
+    count = 0
+    for _ in iterator:
+        count += 1
+    return count
+
+
+def generate_synthetic_markdown(size_mb, code_ratio=0.5, seed=0):
+    """
+    生成合成的项目说明文档，结构与大模型输出的项目规格文档类似：
+    每个模块一个二级标题，下分说明、接口列表和实现三个三级标题，实现部分是首行带文件路径注释的代码块。
+
+    :param size_mb: 目标大小（MB），生成的文档略大于该值
+    :param code_ratio: 包含代码块的模块比例
+    :param seed: 随机种子，相同参数生成相同的文档
+    :return: Markdown 文本
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * MB)
+    parts = [
+        "# 项目结构\n",
+        "```plaintext\nproject/\n├── main.py # 主程序\n└── pkg/ # 模块目录\n```\n",
+    ]
+    size = sum(len(part.encode("utf-8")) for part in parts)
+    index = 0
+    while size < target:
+        if index % 50 == 0:
+            part = f"\n# 第 {index // 50} 部分\n\n本部分包含第 {index} 到 {index + 49} 个模块。\n"
+        else:
+            part = ""
+        words = " ".join(f"词{rng.randrange(1000)}" for _ in range(rng.randrange(20, 60)))
+        part += (
+            f"\n## 模块 {index}\n\n"
+            f"### 说明\n\n模块 {index} 的功能说明：{words}\n\n"
+            f"### 接口\n\n- `function_{index}(x, y=1)`：计算结果\n- `Model{index}`：数据模型\n"
+        )
+        if rng.random() < code_ratio:
+            body = "\n".join(f"    total += {n} * x" for n in range(rng.randrange(5, 30)))
+            part += (
+                f"\n### 实现\n\n```python\n# pkg/part_{index // 50}/mod_{index}.py\n"
+                f"def function_{index}(x, y=1):\n    total = 0\n{body}\n    return total * y\n```\n"
+            )
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+        index += 1
+    return "".join(parts)
+
+
+def run_phases(markdown_text):
+    """
+    依次运行各阶段，返回每个阶段的 (名称, 耗时秒数)，以及令牌数、节点数和代码块数。
+
+    :param markdown_text: Markdown 文本
+    :return: (阶段结果列表, 统计字典)
+    """
+    results = []
+
+    def timed(name, func):
+        start = time.perf_counter()
+        value = func()
+        results.append((name, time.perf_counter() - start))
+        return value
+
+    tokens = timed("markdown_it_parse", lambda: markdown_parser.get_markdown_parser().parse(markdown_text))
+    tree = timed("parse_markdown", lambda: markdown_parser.parse_markdown(markdown_text))
+    codes = timed("extract_code", lambda: markdown_parser.extract_code(markdown_text))
+    index = timed("node_index", tree.index)
+    timed("find_title_walk", lambda: list(tree.find_title(QUERY_PATTERN)))
+    timed("find_title_indexed", lambda: index.find_title(QUERY_PATTERN))
+    timed("find_title_indexed_repeat", lambda: index.find_title(QUERY_PATTERN))
+    timed("get_path_indexed", lambda: index.get_path("第 1 部分/模块 50/实现"))
+    timed("iter_markdown_nodes", lambda: consume(markdown_parser.iter_markdown_nodes(iter_chunks(markdown_text))))
+    timed("iter_extract_code", lambda: consume(markdown_parser.iter_extract_code(iter_chunks(markdown_text))))
+    counts = {"tokens": len(tokens), "nodes": count_nodes(tree), "code_blocks": len(codes)}
+    return results, counts
+
+
+def count_nodes(tree):
+    """统计结构树中的节点数（不含根节点）。"""
+    if tree is None:
+        return 0
+    count = 0
+    stack = list(tree.children)
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def measure_peak_memory(markdown_text):
+    """
+    在 tracemalloc 下再运行一次各阶段，统计每个阶段的Python对象分配峰值（字节）。
+
+    :param markdown_text: Markdown 文本
+    :return: {阶段名称: 峰值字节数}
+    """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def traced(name, func):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            func()
+            peaks[name] = tracemalloc.get_traced_memory()[1] - base
+
+        traced("markdown_it_parse", lambda: markdown_parser.get_markdown_parser().parse(markdown_text))
+        traced("parse_markdown", lambda: markdown_parser.parse_markdown(markdown_text))
+        traced("extract_code", lambda: markdown_parser.extract_code(markdown_text))
+        traced("iter_markdown_nodes", lambda: consume(markdown_parser.iter_markdown_nodes(iter_chunks(markdown_text))))
+        traced("iter_extract_code", lambda: consume(markdown_parser.iter_extract_code(iter_chunks(markdown_text))))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run_benchmark(size_mb, code_ratio=0.5, seed=0, measure_memory=True):
+    """
+    生成一个大小的合成文档并运行全部阶段。
+
+    :param size_mb: 文档大小（MB）
+    :param code_ratio: 包含代码块的模块比例
+    :param seed: 随机种子
+    :param measure_memory: 是否统计峰值内存（需要额外运行一次）
+    :return: 结果字典
+    """
+    start = time.perf_counter()
+    markdown_text = generate_synthetic_markdown(size_mb, code_ratio, seed)
+    generate_seconds = time.perf_counter() - start
+    size_bytes = len(markdown_text.encode("utf-8"))
+
+    phases, counts = run_phases(markdown_text)
+    peaks = measure_peak_memory(markdown_text) if measure_memory else {}
+
+    return {
+        "size_mb": size_mb,
+        "bytes": size_bytes,
+        "code_ratio": code_ratio,
+        "seed": seed,
+        "generate_seconds": round(generate_seconds, 4),
+        **counts,
+        "phases": [
+            {
+                "phase": name,
+                "seconds": round(seconds, 6),
+                "mb_per_second": round(size_bytes / MB / seconds, 3) if seconds > 0 else None,
+                "peak_memory_bytes": peaks.get(name),
+            }
+            for name, seconds in phases
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="markdown_parser 大文档基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1], help="文档大小（MB），可指定多个，如 1 4 16")
+    parser.add_argument("--code-ratio", type=float, default=0.5, help="包含代码块的模块比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存（可节省一半运行时间）")
+    parser.add_argument("--output", default=None, help="结果JSON文件路径，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "results": [
+            run_benchmark(size, args.code_ratio, args.seed, measure_memory=not args.no_memory)
+            for size in args.sizes
+        ],
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"基准测试结果已写入 {args.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
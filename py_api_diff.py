@@ -0,0 +1,380 @@
+# /content/utils/py_api_diff.py
+"""
+简介：比较两个目录（同一仓库的两个版本）中Python公开API的符号级差异：新增、删除和变化的类、方法、字段、函数和全局变量。
+每个符号只保存签名哈希和注释哈希；两个版本中内容哈希相同的文件直接跳过，不需要解析；
+每个文件的符号哈希按文件内容哈希缓存，同一内容在不同版本、不同次比较之间只解析一次。
+
+使用方法：
+python py_api_diff.py old_checkout new_checkout --cache api_cache.pkl
+diff = diff_api("old_checkout", "new_checkout", cache_file="api_cache.pkl")
+
+工作流：
+1. 分别遍历两个目录，按相对路径配对文件并计算内容哈希（文件状态未变时复用缓存的哈希，不读取文件）
+2. 内容哈希相同的文件跳过；其余文件取缓存的符号哈希，未缓存时解析
+3. 逐文件对比符号，输出新增、删除和变化（签名、注释或二者）的符号
+4. 从缓存中删除两个目录下已不存在的文件和不再被引用的符号哈希
+"""
+
+import os  # 用于遍历文件和处理路径
+import ast  # 用于提取函数签名
+import sys  # 用于命令行退出码
+import json  # 用于输出JSON结果
+import pickle  # 用于持久化符号哈希缓存
+import hashlib  # 用于计算符号哈希
+import argparse  # 用于命令行参数
+import traceback  # 用于打印错误堆栈
+from concurrent.futures import ProcessPoolExecutor  # 用于并行解析
+
+from py_parser import (FUNCTION_NODES, build_comment_map, file_digest, get_field_docstring, iter_python_files,
+                       iter_scope_statements)
+
+API_CACHE_VERSION = 1  # 缓存格式版本，符号提取规则变化时递增以使旧缓存失效
+
+
+def is_public(name):
+    """单下划线开头的名称是私有的，双下划线包围的特殊方法（如 __init__）属于公开API。"""
+    return not name.startswith("_") or (name.startswith("__") and name.endswith("__"))
+
+
+def symbol_hash(text):
+    """计算签名或注释文本的短哈希，None 与空字符串不同。"""
+    if text is None:
+        return None
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def function_signature(node):
+    """函数或方法的签名文本，包括装饰器、参数（含注解和默认值）和返回注解。"""
+    decorators = "".join(f"@{ast.unparse(decorator)}\n" for decorator in node.decorator_list)
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"{decorators}{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def class_signature(node):
+    """类的签名文本，包括装饰器、基类和关键字参数（如 metaclass）。"""
+    decorators = "".join(f"@{ast.unparse(decorator)}\n" for decorator in node.decorator_list)
+    bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(keyword) for keyword in node.keywords]
+    return f"{decorators}class {node.name}({', '.join(bases)})"
+
+
+def assignment_targets(node):
+    """返回赋值语句中作为名称的目标及其签名文本（名称、注解和值）。"""
+    value = f" = {ast.unparse(node.value)}" if node.value is not None else ""
+    if isinstance(node, ast.AnnAssign):
+        if isinstance(node.target, ast.Name):
+            return [(node.target.id, f"{node.target.id}: {ast.unparse(node.annotation)}{value}")]
+        return []
+    return [(target.id, f"{target.id}{value}") for target in node.targets if isinstance(target, ast.Name)]
+
+
+def extract_api_symbols(file_content):
+    """
+    提取文件中公开符号的签名哈希和注释哈希。遍历方式与 parse_python_file 相同（只进入模块和类作用域），
+    注释的提取规则也相同（文档字符串、字段上方或行尾的注释）。
+
+    :param file_content: 文件内容
+    :return: {限定名: (类型, 签名哈希, 注释哈希)}，类型为 class / method / field / function / global
+    """
+    tree = ast.parse(file_content)
+    file_lines = file_content.splitlines()
+    comment_map = build_comment_map(file_content, tree)
+    symbols = {}
+
+    def collect_class(node, qualname):
+        symbols[qualname] = ("class", symbol_hash(class_signature(node)), symbol_hash(ast.get_docstring(node)))
+        for member in iter_scope_statements(node.body):
+            if isinstance(member, FUNCTION_NODES):
+                if is_public(member.name):
+                    symbols[f"{qualname}.{member.name}"] = (
+                        "method", symbol_hash(function_signature(member)), symbol_hash(ast.get_docstring(member)))
+            elif isinstance(member, ast.ClassDef):
+                if is_public(member.name):
+                    collect_class(member, f"{qualname}.{member.name}")
+            elif isinstance(member, (ast.Assign, ast.AnnAssign)):
+                for name, signature in assignment_targets(member):
+                    if is_public(name):
+                        docstring = get_field_docstring(member, file_lines, comment_map)
+                        symbols[f"{qualname}.{name}"] = ("field", symbol_hash(signature), symbol_hash(docstring))
+
+    for node in iter_scope_statements(tree.body):
+        if isinstance(node, ast.ClassDef):
+            if is_public(node.name):
+                collect_class(node, node.name)
+        elif isinstance(node, FUNCTION_NODES):
+            if is_public(node.name):
+                symbols[node.name] = ("function", symbol_hash(function_signature(node)), symbol_hash(ast.get_docstring(node)))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            for name, signature in assignment_targets(node):
+                if is_public(name):
+                    docstring = get_field_docstring(node, file_lines, comment_map)
+                    symbols[name] = ("global", symbol_hash(signature), symbol_hash(docstring))
+    return symbols
+
+
+def extract_api_symbols_from_files(file_paths):
+    """
+    批量提取文件的符号哈希，作为进程池中的任务单元；单个文件失败不影响同批其他文件。
+
+    :param file_paths: 文件路径列表
+    :return: [(符号哈希字典, None)] 或失败时 [(None, 错误信息)]，与 file_paths 一一对应
+    """
+    results = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                results.append((extract_api_symbols(f.read()), None))
+        except Exception as e:
+            results.append((None, f"{e}"))
+    return results
+
+
+class SymbolHashCache:
+    """
+    符号哈希缓存：{文件内容哈希: 符号哈希字典}，另外记录 {绝对路径: (mtime, 文件大小, 内容哈希)}，
+    文件状态未变化时不必重新读取文件计算内容哈希。
+    """
+
+    def __init__(self, cache_file=None):
+        """
+        :param cache_file: 缓存文件路径，为None时只在内存中缓存
+        """
+        self.cache_file = cache_file
+        self.symbols = {}  # {内容哈希: {限定名: (类型, 签名哈希, 注释哈希)}}
+        self.digests = {}  # {绝对路径: (mtime, 文件大小, 内容哈希)}
+        self.parsed = 0
+        self.reused = 0
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """从缓存文件加载，文件损坏或版本不匹配时从空缓存开始。"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == API_CACHE_VERSION:
+                self.symbols = data["symbols"]
+                self.digests = data["digests"]
+        except Exception as e:
+            print(f"警告: 读取符号哈希缓存失败，将重新解析: {e}")
+
+    def save(self):
+        """写回缓存文件，先写临时文件再替换。"""
+        if not self.cache_file or not self._dirty:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                pickle.dump({"version": API_CACHE_VERSION, "symbols": self.symbols, "digests": self.digests}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            print(f"保存符号哈希缓存时发生错误: {e}")
+            traceback.print_exc()
+
+    def digest(self, file_path):
+        """
+        返回文件内容哈希，文件的 mtime 和大小未变化时直接使用缓存的哈希。
+
+        :param file_path: 文件路径
+        :return: 内容哈希
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        entry = self.digests.get(key)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        digest = file_digest(key)
+        self.digests[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        self._dirty = True
+        return digest
+
+    def prune(self, directory_paths, file_paths):
+        """
+        删除指定目录下本次扫描中已不存在的文件的条目（文件已删除或重命名），
+        以及不再被任何文件引用的符号哈希（如文件内容变化前的旧版本），使长期复用的缓存不会无限增长。
+
+        :param directory_paths: 本次扫描的目录列表
+        :param file_paths: 本次扫描到的文件路径
+        """
+        prefixes = tuple(os.path.join(os.path.abspath(directory_path), "") for directory_path in directory_paths)
+        current = {os.path.abspath(file_path) for file_path in file_paths}
+        stale = [key for key in self.digests if key.startswith(prefixes) and key not in current]
+        for key in stale:
+            del self.digests[key]
+        referenced = {entry[2] for entry in self.digests.values()}
+        unused = [digest for digest in self.symbols if digest not in referenced]
+        for digest in unused:
+            del self.symbols[digest]
+        if stale or unused:
+            self._dirty = True
+
+    def resolve(self, files, workers=None):
+        """
+        确保给定文件的符号哈希都已缓存，未缓存的文件（可并行）解析。
+
+        :param files: [(文件路径, 内容哈希)]
+        :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+        :return: {内容哈希: 错误信息}，解析失败的文件
+        """
+        pending = {}
+        for file_path, digest in files:
+            if digest in self.symbols:
+                self.reused += 1
+            elif digest not in pending:
+                pending[digest] = file_path
+
+        errors = {}
+        digests = list(pending)
+        paths = [pending[digest] for digest in digests]
+        if workers and workers > 1 and len(paths) > 1:
+            chunk_size = max(1, min(256, len(paths) // (workers * 4)))
+            chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = [result for chunk in executor.map(extract_api_symbols_from_files, chunks) for result in chunk]
+        else:
+            results = extract_api_symbols_from_files(paths)
+
+        for digest, file_path, (symbols, error) in zip(digests, paths, results):
+            if symbols is None:
+                errors[digest] = f"{error} (文件: {file_path})"
+                continue
+            self.symbols[digest] = symbols
+            self.parsed += 1
+            self._dirty = True
+        return errors
+
+
+def relative_python_files(directory_path):
+    """
+    :param directory_path: 目录路径
+    :return: {相对路径: 文件路径}，相对路径统一使用 / 分隔
+    """
+    return {os.path.relpath(file_path, directory_path).replace(os.sep, "/"): file_path
+            for file_path in iter_python_files(directory_path)}
+
+
+def diff_api(old_directory, new_directory, cache_file=None, workers=None, cache=None):
+    """
+    比较两个目录的公开API，返回符号级差异。
+
+    :param old_directory: 旧版本目录
+    :param new_directory: 新版本目录
+    :param cache_file: 符号哈希缓存文件路径，为None时不持久化
+    :param workers: 并行解析的进程数
+    :param cache: 可选的 SymbolHashCache 对象，传入时忽略 cache_file，由调用方负责保存
+    :return: {"added": [...], "removed": [...], "changed": [...], "errors": [...], "stats": {...}}，
+             每个符号为 {"file_path": 相对路径, "qualname": 限定名, "kind": 类型}，
+             changed 中另有 "change": "signature" / "docstring" / "signature+docstring" / "kind"
+    """
+    owns_cache = cache is None
+    if owns_cache:
+        cache = SymbolHashCache(cache_file)
+
+    old_files = relative_python_files(old_directory)
+    new_files = relative_python_files(new_directory)
+
+    # 1. 按相对路径配对，内容哈希相同的文件跳过
+    old_digests = {}
+    new_digests = {}
+    unchanged = 0
+    for relative_path in sorted(old_files.keys() | new_files.keys()):
+        old_digest = cache.digest(old_files[relative_path]) if relative_path in old_files else None
+        new_digest = cache.digest(new_files[relative_path]) if relative_path in new_files else None
+        if old_digest == new_digest:
+            unchanged += 1
+            continue
+        if old_digest is not None:
+            old_digests[relative_path] = old_digest
+        if new_digest is not None:
+            new_digests[relative_path] = new_digest
+
+    # 2. 只解析有变化且未缓存的文件
+    errors = cache.resolve([(old_files[path], digest) for path, digest in old_digests.items()]
+                           + [(new_files[path], digest) for path, digest in new_digests.items()], workers)
+
+    # 3. 逐文件对比符号
+    diff = {"added": [], "removed": [], "changed": [], "errors": sorted(errors.values())}
+    for relative_path in sorted(old_digests.keys() | new_digests.keys()):
+        old_digest = old_digests.get(relative_path)
+        new_digest = new_digests.get(relative_path)
+        if old_digest in errors or new_digest in errors:
+            continue
+        old_symbols = cache.symbols[old_digest] if old_digest is not None else {}
+        new_symbols = cache.symbols[new_digest] if new_digest is not None else {}
+        for qualname in old_symbols.keys() - new_symbols.keys():
+            diff["removed"].append({"file_path": relative_path, "qualname": qualname, "kind": old_symbols[qualname][0]})
+        for qualname in new_symbols.keys() - old_symbols.keys():
+            diff["added"].append({"file_path": relative_path, "qualname": qualname, "kind": new_symbols[qualname][0]})
+        for qualname in old_symbols.keys() & new_symbols.keys():
+            old_kind, old_signature, old_docstring = old_symbols[qualname]
+            new_kind, new_signature, new_docstring = new_symbols[qualname]
+            if old_kind != new_kind:
+                change = "kind"
+            else:
+                changes = []
+                if old_signature != new_signature:
+                    changes.append("signature")
+                if old_docstring != new_docstring:
+                    changes.append("docstring")
+                if not changes:
+                    continue
+                change = "+".join(changes)
+            diff["changed"].append({"file_path": relative_path, "qualname": qualname, "kind": new_kind, "change": change})
+
+    for key in ("added", "removed", "changed"):
+        diff[key].sort(key=lambda item: (item["file_path"], item["qualname"]))
+    diff["stats"] = {
+        "files_unchanged": unchanged,
+        "files_compared": len(old_digests.keys() | new_digests.keys()),
+        "files_parsed": cache.parsed,
+        "files_from_cache": cache.reused,
+    }
+
+    cache.prune([old_directory, new_directory], list(old_files.values()) + list(new_files.values()))
+    if owns_cache:
+        cache.save()
+    return diff
+
+
+def print_api_diff(diff):
+    """
+    打印API差异。
+
+    :param diff: diff_api 的结果
+    """
+    labels = (("added", "+ 新增"), ("removed", "- 删除"), ("changed", "~ 变化"))
+    for key, label in labels:
+        for item in diff[key]:
+            change = f" ({item['change']})" if "change" in item else ""
+            print(f"{label} {item['kind']} {item['file_path']}::{item['qualname']}{change}")
+    for error in diff["errors"]:
+        print(f"警告: 无法解析文件，已跳过: {error}")
+    stats = diff["stats"]
+    print(f"新增 {len(diff['added'])}，删除 {len(diff['removed'])}，变化 {len(diff['changed'])}；"
+          f"内容相同的文件 {stats['files_unchanged']} 个，比较 {stats['files_compared']} 个，"
+          f"解析 {stats['files_parsed']} 个，复用缓存 {stats['files_from_cache']} 个")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较两个目录中Python公开API的符号级差异")
+    parser.add_argument("old_directory", help="旧版本目录")
+    parser.add_argument("new_directory", help="新版本目录")
+    parser.add_argument("--cache", default=None, help="符号哈希缓存文件路径")
+    parser.add_argument("--workers", type=int, default=None, help="并行解析的进程数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args(argv)
+
+    diff = diff_api(args.old_directory, args.new_directory, cache_file=args.cache, workers=args.workers)
+    if args.json:
+        print(json.dumps(diff, ensure_ascii=False, indent=2))
+    else:
+        print_api_diff(diff)
+    return 1 if diff["added"] or diff["removed"] or diff["changed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,36 +2,245 @@
 
 import os  # 用于遍历文件目录
 import ast  # 用于解析Python代码结构
+import contextlib  # 用于阶段计时的上下文管理器
+import errno  # 用于识别文件描述符耗尽
+import hashlib  # 用于计算文件内容哈希
+import heapq  # 用于记录解析最慢的文件
+import inspect  # 用于整理字符串注释的缩进
+import io  # 用于将文件内容交给tokenize
+import json  # 用于导出JSON Lines
+import pickle  # 用于持久化解析缓存
+import re  # 用于扫描注释和导入语句
+import sys  # 用于驻留（intern）符号名
+import time  # 用于轮询监视和阶段计时
+import tokenize  # 用于正则无法处理的 f-string 的注释扫描
+from array import array  # 用于紧凑依赖图的整数边数组
 from collections import defaultdict, deque  # 用于构建依赖关系和进行拓扑排序
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # 用于并行解析和并行执行回调
 
-def list_python_files_and_contents(directory_path):
+try:
+    from inotify_simple import INotify, flags as inotify_flags  # 可选依赖，用于监视模式（仅Linux）
+except ImportError:
+    INotify = None  # 未安装时 watch 使用轮询
+
+def list_python_files_and_contents(directory_path, cache_file=None, workers=None, as_records=False, verbose=1,
+                                   metrics=None):
     """
     列出指定目录中的所有Python文件，生成文件依赖顺序，并解析文件中所有类、方法声明、类公开字段、
     全局变量及其注释，支持三个"的块注释。
 
     :param directory_path: 目录路径，如 /content/utils
+    :param cache_file: 持久化解析缓存文件路径，为None时不使用缓存，每次都重新解析全部文件
+    :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+    :param as_records: 是否返回紧凑的 FileInfo 记录对象（可通过 to_dict() 转换为字典），适合在内存中保存整个仓库的符号表
+    :param verbose: 输出详细级别，0 静默，1 批量进度和汇总，2 逐文件输出
+    :param metrics: 可选的 ParseMetrics 对象，传入时不输出汇总，由调用方读取各阶段耗时等指标
     :return: 包含文件名、脚本说明、类声明、公开字段及其注释、方法声明及其注释的列表
     """
-    # 1. 生成文件依赖图
-    dependencies = generate_dependency_graph(directory_path)
+    cache = ParseCache(cache_file) if cache_file else None
+    owns_metrics = metrics is None
+    if owns_metrics:
+        metrics = ParseMetrics(verbose)
+
+    # 1. 逐个文件读取并解析一次，同时生成文件依赖图和每个文件的解析结果
+    dependencies, analyses = analyze_directory(directory_path, cache=cache, workers=workers, as_records=as_records,
+                                               metrics=metrics)
 
-    # 2. 通过拓扑排序获取依赖顺序
-    sorted_files = topological_sort(dependencies)
+    # 2. 通过拓扑排序获取依赖顺序，循环依赖的文件作为一组输出，不会丢失
+    with metrics.phase("拓扑排序"):
+        sorted_files = topological_sort(dependencies, handle_cycles=True, verbose=metrics.verbose)
 
-    # 3. 按依赖顺序解析文件
+    # 3. 按依赖顺序输出文件解析结果
     result = []
     for file_path in sorted_files:
-        result.append(parse_python_file(file_path))
+        if file_path in analyses:
+            result.append(analyses[file_path]["file_info"])
+
+    if cache is not None:
+        cache.prune(directory_path)
+        cache.save()
+        metrics.log(cache.summary(), level=1)
+    if owns_metrics:
+        metrics.log(metrics.summary(), level=1)
 
     return result
 
+def iter_python_files_and_contents(directory_path, ordered=False, cache=None, workers=None, as_records=False,
+                                   verbose=1):
+    """
+    逐个产出目录中Python文件的解析结果，每个文件解析完成后立即产出，不在内存中累积全部结果。
+
+    ordered=False 时按目录遍历顺序产出，内存占用与文件数量无关。
+    ordered=True 时按 list_python_files_and_contents 的依赖顺序产出：先只提取各文件的导入建立依赖图
+    （只保留依赖边，不保留解析结果），再按顺序逐个解析文件；没有缓存时每个文件会被解析两次。
+
+    :param directory_path: 目录路径
+    :param ordered: 是否按依赖顺序产出
+    :param cache: 可选的 ParseCache 对象
+    :param workers: 并行解析的进程数，仅在 ordered=False 时生效
+    :param as_records: 是否产出 FileInfo 记录对象而不是字典
+    :param verbose: 输出详细级别，0 静默，1 输出解析失败警告
+    :return: 生成器，产出 (文件路径, parse_python_file 的结果)
+    """
+    metrics = ParseMetrics(verbose)
+    if not ordered:
+        file_paths = iter_python_files(directory_path) if not workers or workers <= 1 else list_python_files(directory_path)
+        for file_path, analysis, error in iter_file_analyses(file_paths, cache, workers, metrics=metrics):
+            if analysis is None:
+                continue  # 错误已由 metrics.file_failed 输出
+            file_info = analysis["file_info"]
+            yield file_path, FileInfo.from_dict(file_info) if as_records else file_info
+        return
+
+    # 1. 只提取导入，建立依赖图
+    file_paths = list_python_files(directory_path)
+    module_index = ModuleIndex(directory_path, file_paths)
+    dependencies = defaultdict(list)
+    for file_path in file_paths:
+        try:
+            if cache is not None:
+                imports = cache.get_or_compute(file_path, analyze_python_file)["imports"]
+            else:
+                imports = analyze_python_imports(file_path)
+        except Exception as e:
+            metrics.file_failed(file_path, str(e))
+            continue
+        dependencies[file_path] = module_index.resolve_imports(imports, file_path)
+
+    # 2. 按依赖顺序逐个解析并产出
+    for file_path in topological_sort(dependencies, handle_cycles=True, verbose=metrics.verbose):
+        if file_path not in dependencies:
+            continue  # 解析失败的文件
+        try:
+            if cache is not None:
+                file_info = cache.get_or_compute(file_path, analyze_python_file)["file_info"]
+            else:
+                file_info = parse_python_file(file_path)
+        except Exception as e:
+            metrics.file_failed(file_path, str(e))
+            continue
+        yield file_path, FileInfo.from_dict(file_info) if as_records else file_info
+
+def stream_python_files_and_contents(directory_path, cache=None, workers=None, as_records=False, verbose=1):
+    """
+    边解析边排序：每个文件的项目内依赖全部产出后，立即产出该文件的解析结果（依赖项在前）。
 
+    不必等全部文件解析、排序完成，第一个结果的等待时间接近单个文件的解析时间。
+    单进程解析时，一个文件解析后其尚未解析的依赖会被优先解析，尽快解除等待。
+    解析失败的文件不产出，也不阻塞依赖它的文件；循环依赖中的文件（以及依赖它们的文件）
+    在全部文件解析完成后按强连通分量顺序产出，同一循环中的文件相邻输出。
+
+    :param directory_path: 目录路径
+    :param cache: 可选的 ParseCache 对象
+    :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+    :param as_records: 是否产出 FileInfo 记录对象而不是字典
+    :param verbose: 输出详细级别，0 静默，1 输出解析失败和循环依赖警告
+    :return: 生成器，产出 (文件路径, parse_python_file 的结果)
+    """
+    metrics = ParseMetrics(verbose)
+    file_paths = list_python_files(directory_path)
+    module_index = ModuleIndex(directory_path, file_paths)
+
+    finished = set()  # 已产出或解析失败的文件
+    waiting = {}  # {文件路径: (解析结果, 尚未产出的依赖集合)}
+    blocked_by = defaultdict(list)  # {依赖文件: [等待它的文件]}
+    ready = deque()  # 依赖已全部产出、等待产出的 (文件路径, 解析结果)
+    parse_queue = deque(file_paths)  # 单进程时的解析顺序，未解析的依赖会被插到队首
+    parsed = set()
+
+    def prioritized_analyses():
+        while parse_queue:
+            file_path = parse_queue.popleft()
+            if file_path not in parsed:
+                parsed.add(file_path)
+                yield from iter_file_analyses([file_path], cache, metrics=metrics)
+
+    def add_analysis(file_path, analysis):
+        deps = {dep for dep in module_index.resolve_imports(analysis["imports"], file_path) if dep not in finished}
+        if not deps:
+            ready.append((file_path, analysis["file_info"]))
+            return
+        waiting[file_path] = (analysis["file_info"], deps)
+        for dep in deps:
+            blocked_by[dep].append(file_path)
+            if dep not in parsed:
+                parse_queue.appendleft(dep)
+
+    def finish(file_path):
+        finished.add(file_path)
+        for dependent in blocked_by.pop(file_path, ()):
+            file_info, deps = waiting[dependent]
+            deps.discard(file_path)
+            if not deps:
+                del waiting[dependent]
+                ready.append((dependent, file_info))
+
+    if not workers or workers <= 1:
+        analyses = prioritized_analyses()
+    else:
+        analyses = iter_file_analyses(file_paths, cache, workers, metrics=metrics)
+
+    for file_path, analysis, error in analyses:
+        if analysis is None:
+            finish(file_path)  # 错误已由 metrics.file_failed 输出
+        else:
+            add_analysis(file_path, analysis)
+        while ready:
+            ready_path, file_info = ready.popleft()
+            finish(ready_path)
+            yield ready_path, FileInfo.from_dict(file_info) if as_records else file_info
+
+    # 剩余的文件处于循环依赖中或依赖循环中的文件，按强连通分量顺序（依赖项在前）产出
+    if waiting:
+        subgraph = {file_path: [dep for dep in deps if dep in waiting] for file_path, (_, deps) in waiting.items()}
+        for component in strongly_connected_components(subgraph):
+            if len(component) > 1 and verbose >= 1:
+                print(f"警告: 发现循环依赖: {' -> '.join(component)}")
+            for file_path in component:
+                file_info = waiting[file_path][0]
+                yield file_path, FileInfo.from_dict(file_info) if as_records else file_info
+
+def write_python_files_jsonl(directory_path, output_path, ordered=False, cache_file=None, workers=None, verbose=1):
+    """
+    将目录中每个Python文件的解析结果写为一行JSON（JSON Lines），每解析完一个文件立即写出一行，
+    下游工具可以在运行结束前开始读取。每行在 parse_python_file 的结果基础上增加相对路径字段 file_path。
 
-def parse_python_file(file_path):
+    :param directory_path: 目录路径
+    :param output_path: 输出文件路径
+    :param ordered: 是否按依赖顺序输出
+    :param cache_file: 持久化解析缓存文件路径，为None时不使用缓存
+    :param workers: 并行解析的进程数，仅在 ordered=False 时生效
+    :param verbose: 输出详细级别，0 静默，1 输出解析失败警告、缓存统计和写出的文件数
+    :return: 写出的文件数
+    """
+    cache = ParseCache(cache_file) if cache_file else None
+    count = 0
+    # 行缓冲：每写完一行就刷新到文件
+    with open(output_path, "w", encoding="utf-8", buffering=1) as f:
+        for file_path, file_info in iter_python_files_and_contents(directory_path, ordered, cache, workers,
+                                                                 verbose=verbose):
+            record = {"file_path": os.path.relpath(file_path, directory_path)}
+            record.update(file_info)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+
+    if cache is not None:
+        cache.prune(directory_path)
+        cache.save()
+        if verbose >= 1:
+            print(cache.summary())
+    if verbose >= 1:
+        print(f"已写出 {count} 个文件的解析结果到 {output_path}")
+    return count
+
+
+
+def parse_python_file(file_path, as_records=False):
     """
     解析Python文件中的类、方法声明、类公开字段及其注释，支持三个"的块注释，全局变量注释，脚本说明。
 
     :param file_path: 文件路径
+    :param as_records: 是否返回紧凑的 FileInfo 记录对象而不是字典
     :return: 文件名，脚本说明，类，公开字段，方法及注释信息
     """
     with open(file_path, "r", encoding="utf-8") as f:
@@ -39,7 +248,20 @@ def parse_python_file(file_path):
 
     # 解析Python文件
     tree = ast.parse(file_content)
+    file_info = extract_file_info(file_path, tree, file_content)
+    return FileInfo.from_dict(file_info) if as_records else file_info
+
+def extract_file_info(file_path, tree, file_content):
+    """
+    从已解析的语法树中提取类、方法、公开字段、全局变量及其注释，供 parse_python_file 和 analyze_python_file 共用。
+
+    :param file_path: 文件路径
+    :param tree: ast.parse 得到的语法树
+    :param file_content: 文件内容
+    :return: 文件名，脚本说明，类，公开字段，方法及注释信息
+    """
     file_lines = file_content.splitlines()  # 将文件按行分割，便于逐行处理注释
+    comment_map = build_comment_map(file_content, tree)  # 一次性建立注释映射，之后每个字段的注释查找都是O(1)
 
     file_info = {
         "file_name": os.path.basename(file_path),
@@ -49,40 +271,14 @@ def parse_python_file(file_path):
         "functions": []
     }
 
-    # 遍历语法树，查找类、函数定义及全局变量
-    for node in ast.walk(tree):
+    # 只遍历模块作用域和类作用域中的语句，不进入函数体和表达式
+    for node in iter_scope_statements(tree.body):
         # 2. 提取类声明及其注释
         if isinstance(node, ast.ClassDef):
-            class_info = {
-                "class_name": node.name,
-                "docstring": ast.get_docstring(node),  # 类的注释
-                "fields": [],
-                "methods": []
-            }
-
-            # 3. 提取类中的公开字段及其注释
-            for class_body in node.body:
-                if isinstance(class_body, ast.Assign):  # 检测字段
-                    for target in class_body.targets:
-                        if isinstance(target, ast.Name) and not target.id.startswith("_"):
-                            field_info = {
-                                "field_name": target.id,
-                                "docstring": get_field_docstring(class_body, file_lines)
-                            }
-                            class_info["fields"].append(field_info)
-
-                # 4. 提取类中的方法声明及其注释
-                if isinstance(class_body, ast.FunctionDef):
-                    method_info = {
-                        "method_name": class_body.name,
-                        "docstring": ast.get_docstring(class_body)  # 方法的注释
-                    }
-                    class_info["methods"].append(method_info)
-
-            file_info["classes"].append(class_info)
+            collect_class_info(node, node.name, file_info["classes"], file_lines, comment_map)
 
         # 5. 提取顶级函数声明及其注释
-        elif isinstance(node, ast.FunctionDef):
+        elif isinstance(node, FUNCTION_NODES):
             function_info = {
                 "function_name": node.name,
                 "docstring": ast.get_docstring(node)  # 函数的注释
@@ -93,20 +289,106 @@ def parse_python_file(file_path):
         elif isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
             global_var_info = {
                 "global_var_name": node.targets[0].id,
-                "docstring": get_field_docstring(node, file_lines)
+                "docstring": get_field_docstring(node, file_lines, comment_map)
             }
             file_info["global_vars"].append(global_var_info)
 
     return file_info
 
-def get_field_docstring(assign_node, file_lines):
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+def collect_class_info(node, qualname, classes, file_lines, comment_map=None):
+    """
+    提取类声明、公开字段和方法，嵌套类以限定名（如 Outer.Inner）追加到同一个类列表中。
+
+    :param node: ast.ClassDef 节点
+    :param qualname: 类的限定名
+    :param classes: 类信息列表，当前类及其嵌套类依次追加到其中
+    :param file_lines: 文件的行内容列表
+    :param comment_map: 可选的 CommentMap，提供时字段注释直接查表
+    """
+    class_info = {
+        "class_name": node.name,
+        "qualname": qualname,
+        "docstring": ast.get_docstring(node),  # 类的注释
+        "fields": [],
+        "methods": []
+    }
+    classes.append(class_info)
+
+    for class_body in iter_scope_statements(node.body):
+        # 3. 提取类中的公开字段及其注释
+        if isinstance(class_body, ast.Assign):  # 检测字段
+            for target in class_body.targets:
+                if isinstance(target, ast.Name) and not target.id.startswith("_"):
+                    field_info = {
+                        "field_name": target.id,
+                        "docstring": get_field_docstring(class_body, file_lines, comment_map)
+                    }
+                    class_info["fields"].append(field_info)
+
+        # 4. 提取类中的方法声明及其注释
+        elif isinstance(class_body, FUNCTION_NODES):
+            method_info = {
+                "method_name": class_body.name,
+                "docstring": ast.get_docstring(class_body)  # 方法的注释
+            }
+            class_info["methods"].append(method_info)
+
+        # 嵌套类
+        elif isinstance(class_body, ast.ClassDef):
+            collect_class_info(class_body, f"{qualname}.{class_body.name}", classes, file_lines, comment_map)
+
+def iter_scope_statements(body):
+    """
+    按源码顺序产出一个作用域中的语句：会进入 if/for/while/with/try/match 等复合语句的子块
+    （它们仍属于同一作用域），但不进入函数和类的定义体。
+
+    :param body: 语句列表，如 tree.body 或 ClassDef.body
+    :return: 生成器，产出非复合语句以及函数/类定义节点
+    """
+    stack = [iter(body)]
+    while stack:
+        for stmt in stack[-1]:
+            blocks = scope_blocks(stmt)
+            if blocks is None:
+                yield stmt
+            else:
+                stack.append(iter([child for block in blocks for child in block]))
+                break
+        else:
+            stack.pop()
+
+def scope_blocks(stmt):
+    """
+    :param stmt: 语句节点
+    :return: 复合语句的子语句块列表，不是复合语句时返回None
+    """
+    if isinstance(stmt, (ast.If, ast.For, ast.AsyncFor, ast.While)):
+        return [stmt.body, stmt.orelse]
+    if isinstance(stmt, (ast.With, ast.AsyncWith)):
+        return [stmt.body]
+    if isinstance(stmt, TRY_NODES):
+        return [stmt.body] + [handler.body for handler in stmt.handlers] + [stmt.orelse, stmt.finalbody]
+    if isinstance(stmt, MATCH_NODES):
+        return [case.body for case in stmt.cases]
+    return None
+
+TRY_NODES = (ast.Try, ast.TryStar) if hasattr(ast, "TryStar") else (ast.Try,)
+MATCH_NODES = (ast.Match,) if hasattr(ast, "Match") else ()
+
+def get_field_docstring(assign_node, file_lines, comment_map=None):
     """
     获取类的字段或全局变量注释。支持三个"的块注释，行尾注释，及前几行的多行注释。
 
     :param assign_node: ast.Assign 节点，表示字段的赋值或全局变量
     :param file_lines: 文件的行内容列表
+    :param comment_map: 可选的 CommentMap（见 build_comment_map），提供时直接查表，不再逐行向上扫描
     :return: 字段或全局变量的注释字符串（如果存在）
     """
+    if comment_map is not None:
+        return comment_map.lookup(assign_node.lineno)
+
     line_num = assign_node.lineno - 1  # AST中的行号从1开始，文件列表行号从0开始
 
     # 1. 尝试获取字段所在行后的注释
@@ -138,94 +420,939 @@ def get_field_docstring(assign_node, file_lines):
 
     return None  # 未找到注释
 
+class CommentMap:
+    """
+    单个文件的注释映射，由 build_comment_map 一次遍历生成。
+
+    trailing 记录 行号 -> 该行代码后的行尾注释；full_line 记录 行号 -> 整行 # 注释；
+    strings 记录 结束行号 -> (起始行号, 文本)，即模块和类作用域中独立的字符串语句（不含文档字符串）。
+    """
+
+    def __init__(self):
+        self.trailing = {}
+        self.full_line = {}
+        self.strings = {}
+
+    def lookup(self, lineno):
+        """
+        获取某行声明的注释：优先取行尾注释，其次取紧邻上方的注释块
+        （连续的整行 # 注释和独立的字符串语句，中间没有空行或代码）。
+
+        :param lineno: 声明所在行号（从1开始）
+        :return: 注释字符串，没有注释时返回None
+        """
+        comment = self.trailing.get(lineno)
+        if comment is not None:
+            return comment
+
+        comments = []
+        line = lineno - 1
+        while True:
+            if line in self.full_line:
+                comments.append(self.full_line[line])
+                line -= 1
+            elif line in self.strings:
+                start_line, text = self.strings[line]
+                comments.append(text)
+                line = start_line - 1
+            else:
+                break
+        if comments:
+            return "\n".join(reversed(comments))
+        return None
+
+# 依次匹配字符串字面量和注释，跳过字符串才能正确识别注释，字符串中的 # 不会被当作注释
+COMMENT_OR_STRING_PATTERN = re.compile(r"""
+    (?P<string>[rRbBuUfF]{0,2}(?:
+        \'\'\'(?:\\[\s\S]|[^\\])*?\'\'\'
+      | \"\"\"(?:\\[\s\S]|[^\\])*?\"\"\"
+      | '(?:\\[\s\S]|[^'\\\n])*'
+      | "(?:\\[\s\S]|[^"\\\n])*"
+    ))
+  | (?P<comment>\#[^\r\n]*)
+""", re.VERBOSE)
+
+def build_comment_map(file_content, tree=None):
+    """
+    一次遍历文件建立注释映射。注释由编译好的正则在C层面扫描（跳过字符串字面量，字符串中的 # 不会被误认为注释），
+    独立的字符串语句取自语法树的模块和类作用域，模块、类、函数自身的文档字符串不会被当作其后字段的注释。
+
+    纯Python的 tokenize 逐个生成token，耗时约为 ast.parse 的5倍，是解析文件的主要开销，因此默认使用正则扫描。
+    正则无法确定 f-string 的边界时（替换字段中的字符串含有花括号，或 Python 3.12 起允许的嵌套同种引号，
+    如 f"{d["#"]}"），改用 tokenize 扫描整个文件的注释，保证结果正确。
+
+    :param file_content: 文件内容
+    :param tree: 可选的 ast.parse 语法树，提供时识别作为注释的独立字符串语句
+    :return: CommentMap 对象，文件无法分词时返回None（调用方回退到逐行扫描）
+    """
+    comment_map = CommentMap()
+    if not scan_comments(file_content, comment_map):
+        comment_map = CommentMap()
+        if not scan_comments_tokenize(file_content, comment_map):
+            return None
+
+    if tree is not None:
+        collect_string_statements(tree.body, comment_map.strings)
+    return comment_map
+
+def scan_comments(file_content, comment_map):
+    """
+    用 COMMENT_OR_STRING_PATTERN 扫描注释，整行注释记入 full_line，代码后的注释记入 trailing。
+
+    :param file_content: 文件内容
+    :param comment_map: 要填充的 CommentMap
+    :return: 是否扫描成功；遇到花括号不配对的 f-string（正则可能在替换字段中间结束字符串）时返回False
+    """
+    line = 1
+    position = 0
+    for match in COMMENT_OR_STRING_PATTERN.finditer(file_content):
+        if match.lastgroup == "string":
+            literal = match.group()
+            if literal[0] not in "'\"" and "f" in literal[:2].lower() and literal.count("{") != literal.count("}"):
+                return False
+            continue
+        start = match.start()
+        line += file_content.count("\n", position, start)
+        position = start
+        line_start = file_content.rfind("\n", 0, start) + 1
+        text = match.group().lstrip("#").strip()
+        if file_content[line_start:start].strip():
+            comment_map.trailing[line] = text
+        else:
+            comment_map.full_line[line] = text
+    return True
+
+def scan_comments_tokenize(file_content, comment_map):
+    """
+    使用 tokenize 扫描注释，结果与 scan_comments 相同，用于正则无法处理的文件。
+
+    :param file_content: 文件内容
+    :param comment_map: 要填充的 CommentMap
+    :return: 是否分词成功
+    """
+    last_code_line = 0  # 最近一个代码token结束的行
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(file_content).readline):
+            if token.type == tokenize.COMMENT:
+                line = token.start[0]
+                text = token.string.lstrip("#").strip()
+                if line == last_code_line:
+                    comment_map.trailing[line] = text
+                else:
+                    comment_map.full_line[line] = text
+            elif token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+                last_code_line = token.end[0]
+    except (tokenize.TokenError, SyntaxError) as e:
+        print(f"警告: 无法对文件分词，改为逐行查找注释: {e}")
+        return False
+    return True
+
+def collect_string_statements(body, strings):
+    """
+    收集作用域（及其中的类作用域）中独立的字符串语句，作用域的第一条语句是文档字符串，不收集。
+
+    :param body: 语句列表
+    :param strings: 结果字典 {结束行号: (起始行号, 文本)}
+    """
+    for stmt in iter_scope_statements(body):
+        if isinstance(stmt, ast.ClassDef):
+            collect_string_statements(stmt.body, strings)
+        elif (isinstance(stmt, ast.Expr) and stmt is not body[0]
+              and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)):
+            strings[stmt.end_lineno] = (stmt.lineno, inspect.cleandoc(stmt.value.value))
+
+class FieldInfo:
+    """紧凑的字段/全局变量记录。"""
+    __slots__ = ("name", "docstring")
+
+    def __init__(self, name, docstring=None):
+        self.name = sys.intern(name)
+        self.docstring = docstring
+
+    def to_dict(self, name_key="field_name"):
+        """
+        :param name_key: 名称字段的键，全局变量使用 "global_var_name"
+        :return: 与 parse_python_file 相同格式的字典
+        """
+        return {name_key: self.name, "docstring": self.docstring}
+
+    def __reduce__(self):
+        # 反序列化时重新经过 __init__，使名称再次被驻留
+        return FieldInfo, (self.name, self.docstring)
+
+    def __repr__(self):
+        return f"FieldInfo({self.name!r})"
+
+class FunctionInfo:
+    """紧凑的函数/方法记录。"""
+    __slots__ = ("name", "docstring")
+
+    def __init__(self, name, docstring=None):
+        self.name = sys.intern(name)
+        self.docstring = docstring
+
+    def to_dict(self, name_key="function_name"):
+        """
+        :param name_key: 名称字段的键，方法使用 "method_name"
+        :return: 与 parse_python_file 相同格式的字典
+        """
+        return {name_key: self.name, "docstring": self.docstring}
+
+    def __reduce__(self):
+        return FunctionInfo, (self.name, self.docstring)
+
+    def __repr__(self):
+        return f"FunctionInfo({self.name!r})"
+
+class ClassInfo:
+    """紧凑的类记录，字段和方法保存为元组。"""
+    __slots__ = ("name", "qualname", "docstring", "fields", "methods")
+
+    def __init__(self, name, qualname=None, docstring=None, fields=(), methods=()):
+        self.name = sys.intern(name)
+        self.qualname = self.name if qualname is None or qualname == name else sys.intern(qualname)
+        self.docstring = docstring
+        self.fields = tuple(fields)
+        self.methods = tuple(methods)
+
+    @classmethod
+    def from_dict(cls, class_info):
+        return cls(
+            class_info["class_name"],
+            class_info.get("qualname"),
+            class_info["docstring"],
+            [FieldInfo(field["field_name"], field["docstring"]) for field in class_info["fields"]],
+            [FunctionInfo(method["method_name"], method["docstring"]) for method in class_info["methods"]],
+        )
+
+    def to_dict(self):
+        """:return: 与 parse_python_file 相同格式的字典"""
+        return {
+            "class_name": self.name,
+            "qualname": self.qualname,
+            "docstring": self.docstring,
+            "fields": [field.to_dict("field_name") for field in self.fields],
+            "methods": [method.to_dict("method_name") for method in self.methods]
+        }
+
+    def __reduce__(self):
+        return ClassInfo, (self.name, self.qualname, self.docstring, self.fields, self.methods)
+
+    def __repr__(self):
+        return f"ClassInfo({self.qualname!r})"
+
+class FileInfo:
+    """
+    紧凑的文件解析记录：使用 __slots__、元组和驻留的名称字符串，比嵌套字典占用更少内存。
+    to_dict() 返回与 parse_python_file 默认输出完全相同的字典。
+    """
+    __slots__ = ("file_name", "script_docstring", "global_vars", "classes", "functions")
+
+    def __init__(self, file_name, script_docstring=None, global_vars=(), classes=(), functions=()):
+        self.file_name = sys.intern(file_name)
+        self.script_docstring = script_docstring
+        self.global_vars = tuple(global_vars)
+        self.classes = tuple(classes)
+        self.functions = tuple(functions)
+
+    @classmethod
+    def from_dict(cls, file_info):
+        """
+        :param file_info: parse_python_file 返回的字典
+        :return: FileInfo 对象
+        """
+        return cls(
+            file_info["file_name"],
+            file_info["script_docstring"],
+            [FieldInfo(var["global_var_name"], var["docstring"]) for var in file_info["global_vars"]],
+            [ClassInfo.from_dict(class_info) for class_info in file_info["classes"]],
+            [FunctionInfo(function["function_name"], function["docstring"]) for function in file_info["functions"]],
+        )
+
+    def to_dict(self):
+        """:return: 与 parse_python_file 相同格式的字典"""
+        return {
+            "file_name": self.file_name,
+            "script_docstring": self.script_docstring,
+            "global_vars": [var.to_dict("global_var_name") for var in self.global_vars],
+            "classes": [class_info.to_dict() for class_info in self.classes],
+            "functions": [function.to_dict("function_name") for function in self.functions]
+        }
+
+    def __reduce__(self):
+        return FileInfo, (self.file_name, self.script_docstring, self.global_vars, self.classes, self.functions)
+
+    def __repr__(self):
+        return f"FileInfo({self.file_name!r})"
+
+PARSE_CACHE_VERSION = 2  # 缓存格式版本，格式变化时递增以使旧缓存失效
+
+class ParseCache:
+    """
+    持久化的文件解析缓存，以 路径 + mtime + 文件大小 + 内容哈希 判断文件是否发生变化。
+
+    mtime 和大小都未变化时直接命中，不读取文件；二者有变化但内容哈希相同（如云盘重新同步）时同样命中，
+    只更新记录的文件状态；否则重新计算并写回缓存。每个文件在一次运行中只校验一次，hits/misses 统计命中情况。
+    """
+
+    def __init__(self, cache_file):
+        """
+        :param cache_file: 缓存文件路径，文件不存在或版本不匹配时从空缓存开始
+        """
+        self.cache_file = cache_file
+        self.entries = {}  # {绝对路径: {"mtime": ..., "size": ..., "hash": ..., "value": ...}}
+        self.hits = 0
+        self.misses = 0
+        self._validated = set()  # 本次运行中已经校验过的文件
+        self._pending = {}  # 未命中文件的状态 {绝对路径: (mtime, size, hash)}，等待 store 写入
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """从缓存文件加载缓存条目，文件损坏时丢弃旧缓存。"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == PARSE_CACHE_VERSION:
+                self.entries = data["entries"]
+        except Exception as e:
+            print(f"警告: 读取解析缓存失败，将重新解析全部文件: {e}")
+            self.entries = {}
+
+    def save(self):
+        """将缓存写回磁盘，先写临时文件再替换，避免中断时留下损坏的缓存。"""
+        if not self._dirty:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                pickle.dump({"version": PARSE_CACHE_VERSION, "entries": self.entries}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            print(f"保存解析缓存时发生错误: {e}")
+            traceback.print_exc()
+
+    def get_or_compute(self, file_path, compute):
+        """
+        获取文件的缓存结果，文件有变化或未缓存时调用 compute(file_path) 重新计算并写入缓存。
+
+        :param file_path: 文件路径
+        :param compute: 计算函数，接受文件路径，返回要缓存的结果
+        :return: 缓存或新计算的结果
+        """
+        value = self.lookup(file_path)
+        if value is None:
+            value = compute(file_path)
+            self.store(file_path, value)
+        return value
+
+    def lookup(self, file_path):
+        """
+        查找文件的缓存结果，未命中时返回None并记录文件当前状态，供随后的 store 使用。
+
+        :param file_path: 文件路径
+        :return: 缓存的结果，文件已变化或未缓存时返回None
+        """
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry is not None and key in self._validated:
+            return entry["value"]
+
+        stat = os.stat(key)
+        if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return self._hit(key, entry)
+
+        digest = file_digest(key)
+        if entry is not None and entry["hash"] == digest:
+            # 内容未变，仅文件状态变化
+            entry["mtime"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            self._dirty = True
+            return self._hit(key, entry)
+
+        self.misses += 1
+        self._pending[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return None
+
+    def store(self, file_path, value):
+        """
+        写入文件的计算结果，文件状态取自之前未命中的 lookup 调用。
+
+        :param file_path: 文件路径
+        :param value: 要缓存的结果
+        """
+        key = os.path.abspath(file_path)
+        state = self._pending.pop(key, None)
+        if state is None:
+            stat = os.stat(key)
+            state = (stat.st_mtime_ns, stat.st_size, file_digest(key))
+        mtime, size, digest = state
+        self.entries[key] = {"mtime": mtime, "size": size, "hash": digest, "value": value}
+        self._validated.add(key)
+        self._dirty = True
+
+    def _hit(self, key, entry):
+        self.hits += 1
+        self._validated.add(key)
+        return entry["value"]
+
+    def prune(self, directory_path):
+        """
+        删除指定目录下本次运行未访问到的缓存条目（文件已删除或已不再被解析）。
+
+        :param directory_path: 目录路径
+        """
+        prefix = os.path.join(os.path.abspath(directory_path), "")
+        stale = [key for key in self.entries if key.startswith(prefix) and key not in self._validated]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+    def summary(self):
+        """返回缓存命中统计信息。"""
+        return f"解析缓存: 命中 {self.hits}，未命中 {self.misses}"
+
+
+def file_digest(file_path):
+    """
+    计算文件内容哈希。
+
+    :param file_path: 文件路径
+    :return: 十六进制哈希字符串
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ParseMetrics:
+    """
+    解析过程的结构化指标：各阶段耗时、解析文件数、缓存命中数、解析失败的文件和最慢的文件。
+
+    同时负责按详细级别输出进度，取代逐文件打印：
+    verbose=0 静默；verbose=1 每处理 progress_every 个文件输出一行进度，结束时输出汇总；
+    verbose=2 额外输出逐文件信息（正在解析的文件、发现的依赖等）。
+    """
+
+    def __init__(self, verbose=1, progress_every=500, slowest_count=10):
+        """
+        :param verbose: 详细级别，0 静默，1 批量进度和汇总，2 逐文件输出
+        :param progress_every: verbose=1 时每处理多少个文件输出一次进度
+        :param slowest_count: 记录最慢的文件数量
+        """
+        self.verbose = verbose
+        self.progress_every = progress_every
+        self.slowest_count = slowest_count
+        self.phases = {}  # {阶段名称: 累计耗时（秒）}，按首次进入的顺序
+        self.files_parsed = 0  # 实际解析（未命中缓存）的文件数
+        self.cache_hits = 0
+        self.parse_seconds = 0.0  # 所有文件解析耗时之和，并行解析时可能大于阶段耗时
+        self.failures = []  # [(文件路径, 错误信息)]
+        self.callback_failures = []  # [(文件路径, 错误信息)]
+        self._slowest = []  # 小顶堆 [(耗时, 文件路径)]，只保留 slowest_count 个
+        self._last_progress = {}  # {进度标签: 上次输出进度时的完成数}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        记录一个阶段的耗时，同名阶段多次进入时累加。
+
+        :param name: 阶段名称
+        """
+        self.log(f"[阶段] {name} 开始")
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            self.log(f"[阶段] {name} 完成，耗时 {seconds:.3f}s")
+
+    def file_parsed(self, file_path, seconds):
+        """记录一个文件的解析耗时。"""
+        self.files_parsed += 1
+        self.parse_seconds += seconds
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, (seconds, file_path))
+        elif self._slowest and seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, file_path))
+
+    def cache_hit(self, file_path):
+        """记录一个命中缓存、未重新解析的文件。"""
+        self.cache_hits += 1
+
+    def file_failed(self, file_path, error):
+        """
+        记录解析失败的文件。verbose=1 时只输出错误信息的第一行，verbose=2 时输出完整错误。
+
+        :param file_path: 文件路径
+        :param error: 错误信息
+        """
+        self.failures.append((file_path, error))
+        if self.verbose >= 2:
+            print(f"解析文件依赖时发生错误: {error} (文件: {file_path})")
+            print(f"警告: 无法解析依赖项，跳过文件 {file_path}")
+        elif self.verbose == 1:
+            print(f"警告: 无法解析文件，跳过 {file_path}: {str(error).splitlines()[0] if error else ''}")
+
+    def callback_failed(self, file_path, error):
+        """
+        记录回调函数处理失败的文件，verbose>=1 时输出错误信息。
+
+        :param file_path: 文件路径
+        :param error: 错误信息
+        """
+        self.callback_failures.append((file_path, error))
+        if self.verbose >= 1:
+            print(f"回调函数处理文件 '{file_path}' 时发生错误: {error}")
+
+    def progress(self, done, total, label):
+        """
+        verbose=1 时每完成 progress_every 个文件及全部完成时输出一行进度。
+
+        :param done: 已完成的数量
+        :param total: 总数
+        :param label: 进度标签，如 "解析文件"
+        """
+        if self.verbose != 1:
+            return
+        last = self._last_progress.get(label, 0)
+        if done - last >= self.progress_every or (done == total and done != last):
+            self._last_progress[label] = done
+            print(f"{label}: {done}/{total}")
+
+    def log(self, message, level=2):
+        """verbose 不低于 level 时输出信息，默认只在逐文件模式下输出。"""
+        if self.verbose >= level:
+            print(message)
+
+    @property
+    def slowest_files(self):
+        """最慢的文件列表 [(文件路径, 耗时秒数)]，从慢到快。"""
+        return [(file_path, seconds) for seconds, file_path in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self):
+        """返回全部指标的字典形式，便于输出为JSON。"""
+        return {
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "files_parsed": self.files_parsed,
+            "cache_hits": self.cache_hits,
+            "parse_seconds": round(self.parse_seconds, 6),
+            "failures": [{"file_path": file_path, "error": error} for file_path, error in self.failures],
+            "callback_failures": [{"file_path": file_path, "error": error}
+                                  for file_path, error in self.callback_failures],
+            "slowest_files": [{"file_path": file_path, "seconds": round(seconds, 6)}
+                              for file_path, seconds in self.slowest_files],
+        }
+
+    def summary(self):
+        """返回多行的汇总文本：各阶段耗时、文件数、失败数和最慢的文件。"""
+        lines = [
+            f"解析文件 {self.files_parsed} 个，命中缓存 {self.cache_hits} 个，解析失败 {len(self.failures)} 个"
+            + (f"，回调失败 {len(self.callback_failures)} 个" if self.callback_failures else "")
+        ]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name}: {seconds:.3f}s")
+        if self._slowest:
+            lines.append("最慢的文件:")
+            for file_path, seconds in self.slowest_files:
+                lines.append(f"  {seconds * 1000:.1f}ms {file_path}")
+        return "\n".join(lines)
+
+
+def analyze_python_file(file_path):
+    """
+    单文件分析：只读取一次、解析一次文件，同时得到导入模块名列表和 parse_python_file 的解析结果。
+
+    :param file_path: 文件路径
+    :return: {"imports": [导入语句描述，见 extract_imports], "file_info": parse_python_file的结果}
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        file_content = f.read()
+
+    tree = ast.parse(file_content)
+    return {"imports": extract_imports(tree), "file_info": extract_file_info(file_path, tree, file_content)}
+
+def analyze_python_imports(file_path, fast=False):
+    """
+    只提取文件中的导入语句，不提取类、函数等符号信息。
+
+    :param file_path: 文件路径
+    :param fast: 是否先用词法扫描提取导入（见 scan_imports），只在扫描无法确定时才构建语法树
+    :return: 导入语句描述列表，见 extract_imports
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        file_content = f.read()
+    if fast:
+        return extract_imports_fast(file_content)
+    return extract_imports(ast.parse(file_content))
+
+def analyze_python_files(file_paths, imports_only=False):
+    """
+    批量执行 analyze_python_file，作为进程池中的任务单元；单个文件失败不影响同批其他文件。
+
+    :param file_paths: 文件路径列表
+    :param imports_only: 是否只用词法扫描提取导入，结果为 {"imports": [...]}，不包含 file_info
+    :return: [(分析结果, None, 耗时秒数)] 或失败时 [(None, 错误信息, 耗时秒数)]，与 file_paths 一一对应
+    """
+    results = []
+    for file_path in file_paths:
+        start = time.perf_counter()
+        try:
+            if imports_only:
+                analysis = {"imports": analyze_python_imports(file_path, fast=True)}
+            else:
+                analysis = analyze_python_file(file_path)
+            results.append((analysis, None, time.perf_counter() - start))
+        except Exception as e:
+            results.append((None, f"{e}\n{traceback.format_exc()}", time.perf_counter() - start))
+    return results
+
 import os
 import ast
 from collections import defaultdict, deque
 import traceback  # 用于打印错误堆栈
-def process_files_with_callback(directory_path, callback):
+def process_files_with_callback(directory_path, callback, workers=None, executor="thread", verbose=1, metrics=None,
+                                fast=False):
     """
     列出指定目录中的所有Python文件，并生成文件依赖顺序，逐个文件传递给回调函数。
 
+    workers 为None或1时，回调顺序与原来相同：按 topological_sort 的顺序在当前线程中逐个执行，
+    导入方在被导入的文件之前（如 a 导入 b 时先回调 a）。
+    指定 workers 时按依赖"波次"（dependency_waves）并行执行，依赖项在前：每一波中的文件，
+    其依赖都已在之前的波次中处理完毕，同一波的回调在线程池或进程池中并行执行，波次之间等待全部完成。
+    两种方式下循环依赖中的文件都会被处理。单个回调出错只打印错误，不影响其他文件。
+
     :param directory_path: 目录路径
-    :param callback: 回调函数，接受文件路径作为参数
+    :param callback: 回调函数，接受文件路径作为参数；使用进程池时必须是可pickle的模块级函数
+    :param workers: 并行执行回调的线程/进程数，为None或1时按拓扑顺序逐个执行
+    :param executor: 并行方式，"thread" 使用线程池，"process" 使用进程池
+    :param verbose: 输出详细级别，0 静默，1 批量进度和汇总，2 逐文件输出并打印完整依赖图
+    :param metrics: 可选的 ParseMetrics 对象，传入时不输出汇总，由调用方读取各阶段耗时等指标
+    :param fast: 用词法扫描提取导入生成依赖图，不构建语法树（见 scan_imports）
     """
+    owns_metrics = metrics is None
+    if owns_metrics:
+        metrics = ParseMetrics(verbose)
     try:
         # 1. 检查目录是否存在
         if not os.path.isdir(directory_path):
             raise ValueError(f"指定的目录路径不存在: {directory_path}")
 
-        print(f"开始处理目录 '{directory_path}' 的文件依赖图...")
-        
-        # 2. 生成文件依赖图
-        dependencies = generate_dependency_graph(directory_path)
+        metrics.log(f"开始处理目录 '{directory_path}' 的文件依赖图...", level=1)
 
-        # 3. 打印依赖拓扑图
-        print_dependency_graph(dependencies)
+        # 2. 生成文件依赖图
+        dependencies = generate_dependency_graph(directory_path, metrics=metrics, fast=fast)
 
-        # 4. 通过拓扑排序获取依赖顺序
-        sorted_files = topological_sort(dependencies)
+        # 3. 打印依赖拓扑图，非逐文件模式下只打印规模
+        if metrics.verbose >= 2:
+            print_dependency_graph(dependencies)
+        else:
+            edge_count = sum(len(deps) for deps in dependencies.values())
+            metrics.log(f"文件依赖图: {len(dependencies)} 个文件，{edge_count} 条依赖", level=1)
 
-        # 5. 按依赖顺序遍历文件，并将文件路径传递给回调函数
-        for file_path in sorted_files:
-            print(f"正在处理文件: {file_path}")
-            try:
-                # 将文件路径传递给回调函数
-                callback(file_path)
-            except Exception as cb_error:
-                print(f"回调函数处理文件 '{file_path}' 时发生错误: {cb_error}")
-                traceback.print_exc()
+        if workers and workers > 1:
+            # 4. 按依赖波次并行执行回调
+            run_callback_in_waves(dependencies, callback, workers, executor, metrics=metrics)
+        else:
+            # 4. 通过拓扑排序获取依赖顺序，循环依赖中的文件同样会被处理
+            with metrics.phase("拓扑排序"):
+                sorted_files = topological_sort(dependencies, handle_cycles=True, verbose=metrics.verbose)
+
+            # 5. 按依赖顺序遍历文件，并将文件路径传递给回调函数
+            with metrics.phase("执行回调"):
+                for done, file_path in enumerate(sorted_files, 1):
+                    metrics.log(f"正在处理文件: {file_path}")
+                    try:
+                        # 将文件路径传递给回调函数
+                        callback(file_path)
+                    except Exception as cb_error:
+                        metrics.callback_failed(file_path, cb_error)
+                        if metrics.verbose >= 1:
+                            traceback.print_exc()
+                    metrics.progress(done, len(sorted_files), "处理文件")
+
+        if owns_metrics:
+            metrics.log(metrics.summary(), level=1)
 
     except Exception as e:
         print(f"处理目录时发生错误: {e}")
         traceback.print_exc()
 
 
+def run_callback_in_waves(dependencies, callback, workers, executor="thread", verbose=1, metrics=None):
+    """
+    按依赖波次并行执行回调：每一波提交到线程池/进程池，全部完成后再开始下一波。
+
+    :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :param callback: 回调函数，接受文件路径作为参数
+    :param workers: 并行执行回调的线程/进程数
+    :param executor: "thread" 使用线程池，"process" 使用进程池
+    :param verbose: 输出详细级别，0 静默，1 批量进度，2 逐波次、逐文件输出；传入 metrics 时以 metrics.verbose 为准
+    :param metrics: 可选的 ParseMetrics 对象，记录各阶段耗时和回调失败的文件
+    """
+    if executor == "thread":
+        pool_class = ThreadPoolExecutor
+    elif executor == "process":
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"不支持的并行方式: {executor}，可选 'thread' 或 'process'")
+    if metrics is None:
+        metrics = ParseMetrics(verbose)
+
+    with metrics.phase("划分波次"):
+        waves = dependency_waves(dependencies)
+    total = sum(len(wave) for wave in waves)
+    done = 0
+    with metrics.phase("执行回调"), pool_class(max_workers=workers) as pool:
+        for wave_index, wave in enumerate(waves, 1):
+            metrics.log(f"正在处理第 {wave_index}/{len(waves)} 波，共 {len(wave)} 个文件")
+            # map 在全部结果返回后才结束循环，相当于波次之间的屏障
+            for file_path, error in zip(wave, pool.map(run_callback_safely, [callback] * len(wave), wave)):
+                metrics.log(f"已处理文件: {file_path}")
+                if error is not None:
+                    metrics.callback_failed(file_path, error)
+            done += len(wave)
+            metrics.progress(done, total, "处理文件")
+
+def run_callback_safely(callback, file_path):
+    """
+    执行回调并捕获异常，使单个文件的错误不影响同一波次中的其他文件。
+
+    :param callback: 回调函数
+    :param file_path: 文件路径
+    :return: 成功时返回None，失败时返回错误信息及堆栈
+    """
+    try:
+        callback(file_path)
+        return None
+    except Exception as e:
+        return f"{e}\n{traceback.format_exc().rstrip()}"
 
-def generate_dependency_graph(directory_path):
+def dependency_waves(dependencies):
+    """
+    将依赖图划分为波次：每个文件所在波次中，它的全部依赖都位于更早的波次。
+
+    基于强连通分量计算，循环依赖中的文件互相依赖、无法排序，放在同一波次中。复杂度 O(V+E)。
+
+    :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :return: 波次列表，每个波次是文件路径列表，依赖项所在的波次在前
+    """
+    # Tarjan 先输出被依赖的分量，因此按输出顺序一次遍历即可确定每个分量的层级
+    level = {}
+    waves = []
+    for component in strongly_connected_components(dependencies):
+        members = set(component)
+        component_level = 0
+        for file in component:
+            for dep in dependencies.get(file, ()):
+                if dep not in members:
+                    component_level = max(component_level, level[dep] + 1)
+        for file in component:
+            level[file] = component_level
+        if component_level == len(waves):
+            waves.append([])
+        waves[component_level].extend(component)
+    return waves
+
+
+def generate_dependency_graph(directory_path, cache=None, workers=None, verbose=1, metrics=None, fast=False,
+                              compact=False):
     """
     生成指定目录中Python文件的依赖关系图。
 
     :param directory_path: 目录路径
-    :return: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :param cache: 可选的 ParseCache 对象，命中缓存的文件直接复用缓存的分析结果而不重新解析
+    :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+    :param verbose: 输出详细级别，0 静默，1 批量进度和汇总，2 逐文件输出；传入 metrics 时以 metrics.verbose 为准
+    :param metrics: 可选的 ParseMetrics 对象，用于收集阶段耗时等指标
+    :param fast: 快速模式，用词法扫描提取导入而不构建语法树（见 scan_imports），新解析的文件不写入缓存
+    :param compact: 是否返回 CompactGraph（整数id + CSR 边数组），适合非常大的目录
+    :return: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}；compact=True 时为 CompactGraph
+    """
+    if compact:
+        return CompactGraph.from_directory(directory_path, cache=cache, workers=workers, verbose=verbose,
+                                           metrics=metrics, fast=fast)
+    dependencies, _ = analyze_directory(directory_path, cache=cache, keep_analyses=False, workers=workers,
+                                        verbose=verbose, metrics=metrics, fast=fast)
+    return dependencies
+
+def analyze_directory(directory_path, cache=None, keep_analyses=True, workers=None, chunk_size=None, as_records=False,
+                      verbose=1, metrics=None, fast=False):
     """
+    对目录中的每个Python文件执行一次 analyze_python_file，生成依赖关系图并收集各文件的解析结果。
+
+    没有项目内依赖的文件同样作为键出现在依赖关系图中（依赖列表为空）。
+    指定 workers 时，未命中缓存的文件按块分发到 ProcessPoolExecutor 中解析（ast.parse 受 GIL 限制，线程无法加速），
+    结果按遍历顺序合并，输出与单进程模式相同。
+
+    :param directory_path: 目录路径
+    :param cache: 可选的 ParseCache 对象
+    :param keep_analyses: 是否保留各文件的分析结果，只需要依赖图时设为False以节省内存
+    :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+    :param chunk_size: 每个进程任务包含的文件数，默认根据文件数和进程数自动计算
+    :param as_records: 保留的分析结果中 file_info 是否转换为 FileInfo 记录对象
+    :param verbose: 输出详细级别，0 静默，1 批量进度和汇总，2 逐文件输出；传入 metrics 时以 metrics.verbose 为准
+    :param metrics: 可选的 ParseMetrics 对象；未传入时新建一个，并在结束时按 verbose 输出汇总
+    :param fast: 只用词法扫描提取导入建立依赖图，只能在 keep_analyses=False 时使用
+    :return: (依赖关系图 {文件路径: [依赖文件路径]}, 分析结果 {文件路径: analyze_python_file的结果})
+    """
+    if fast and keep_analyses:
+        raise ValueError("快速模式只提取导入语句，不能与 keep_analyses=True 同时使用")
     dependencies = defaultdict(list)
-    py_files = []
+    analyses = {}
+    owns_metrics = metrics is None
+    if owns_metrics:
+        metrics = ParseMetrics(verbose)
 
     try:
-        # 遍历所有Python文件，构建依赖关系
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if file.endswith(".py"):
-                    file_path = os.path.join(root, file)
-                    py_files.append(file_path)
-                    print(f"正在解析文件: {file_path}")
-
-                    imported_files = get_imported_modules(file_path, directory_path)
-                    if imported_files is None:
-                        print(f"警告: 无法解析依赖项，跳过文件 {file_path}")
-                        continue
-
-                    for imported_file in imported_files:
-                        dependencies[file_path].append(imported_file)
+        # 遍历所有Python文件，并一次性建立模块索引，之后每个导入的解析都只是字典查找
+        with metrics.phase("遍历目录"):
+            file_paths = list_python_files(directory_path)
+            module_index = ModuleIndex(directory_path, file_paths)
+
+        total = len(file_paths)
+        with metrics.phase("解析文件"):
+            analyses_iter = iter_file_analyses(file_paths, cache, workers, chunk_size, metrics, imports_only=fast)
+            for done, (file_path, analysis, error) in enumerate(analyses_iter, 1):
+                metrics.log(f"正在解析文件: {file_path}")
+                metrics.progress(done, total, "解析文件")
+                if analysis is None:
+                    continue  # 错误已由 metrics.file_failed 记录
+
+                if keep_analyses:
+                    if as_records:
+                        analysis = {"imports": analysis["imports"], "file_info": FileInfo.from_dict(analysis["file_info"])}
+                    analyses[file_path] = analysis
+
+                deps = dependencies[file_path]
+                for imported_file in module_index.resolve_imports(analysis["imports"], file_path):
+                    deps.append(imported_file)
+                    if metrics.verbose >= 2:
                         print(f"  -> 发现依赖: {imported_file}")
 
-        return dependencies
+        if owns_metrics and metrics.verbose >= 1:
+            print(metrics.summary())
+        return dependencies, analyses
 
     except Exception as e:
         print(f"生成依赖图时发生错误: {e}")
         traceback.print_exc()
-        return {}
+        return {}, {}
+
+def list_python_files(directory_path):
+    """
+    列出目录下所有Python文件的路径，顺序与 os.walk 遍历顺序一致。
+
+    :param directory_path: 目录路径
+    :return: 文件路径列表
+    """
+    return list(iter_python_files(directory_path))
+
+def iter_python_files(directory_path):
+    """
+    逐个产出目录下的Python文件路径，顺序与 os.walk 遍历顺序一致。
+
+    :param directory_path: 目录路径
+    :return: 生成器，产出文件路径
+    """
+    for root, dirs, files in os.walk(directory_path):
+        for file in files:
+            if file.endswith(".py"):
+                yield os.path.join(root, file)
+
+def iter_file_analyses(file_paths, cache=None, workers=None, chunk_size=None, metrics=None, imports_only=False):
+    """
+    按 file_paths 的顺序逐个产出文件分析结果，命中缓存的文件不重新解析。
+
+    :param file_paths: 文件路径列表
+    :param cache: 可选的 ParseCache 对象，新解析的结果会写入缓存
+    :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+    :param chunk_size: 每个进程任务包含的文件数
+    :param metrics: 可选的 ParseMetrics 对象，记录每个文件的解析耗时、缓存命中和解析失败
+    :param imports_only: 是否只用词法扫描提取导入；未命中缓存的文件结果中没有 file_info，也不会写入缓存
+    :return: 生成器，产出 (文件路径, 分析结果或None, 错误信息或None)
+    """
+    if not workers or workers <= 1:
+        for file_path in file_paths:
+            start = time.perf_counter()
+            try:
+                analysis = cache.lookup(file_path) if cache is not None else None
+                if analysis is None:
+                    if imports_only:
+                        analysis = {"imports": analyze_python_imports(file_path, fast=True)}
+                    else:
+                        analysis = analyze_python_file(file_path)
+                        if cache is not None:
+                            cache.store(file_path, analysis)
+                    if metrics is not None:
+                        metrics.file_parsed(file_path, time.perf_counter() - start)
+                elif metrics is not None:
+                    metrics.cache_hit(file_path)
+                yield file_path, analysis, None
+            except Exception as e:
+                error = f"{e}\n{traceback.format_exc()}"
+                if metrics is not None:
+                    metrics.file_failed(file_path, error)
+                yield file_path, None, error
+        return
+
+    # 1. 先在主进程中查询缓存，只把未命中的文件交给进程池
+    cached = {}
+    pending = []
+    for file_path in file_paths:
+        try:
+            analysis = cache.lookup(file_path) if cache is not None else None
+        except OSError:
+            analysis = None
+        if analysis is None:
+            pending.append(file_path)
+        else:
+            cached[file_path] = analysis
+
+    # 2. 按块分发，减少进程间通信次数
+    if chunk_size is None:
+        chunk_size = max(1, min(256, len(pending) // (workers * 4)))
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    # 3. 按原始顺序合并缓存结果和进程池结果
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk_results = executor.map(analyze_python_files, chunks, [imports_only] * len(chunks))
+        pending_results = (result for chunk in chunk_results for result in chunk)
+        for file_path in file_paths:
+            if file_path in cached:
+                if metrics is not None:
+                    metrics.cache_hit(file_path)
+                yield file_path, cached.pop(file_path), None
+                continue
+            analysis, error, seconds = next(pending_results)
+            if analysis is not None and cache is not None and not imports_only:
+                cache.store(file_path, analysis)
+            if metrics is not None:
+                if analysis is not None:
+                    metrics.file_parsed(file_path, seconds)
+                else:
+                    metrics.file_failed(file_path, error)
+            yield file_path, analysis, error
 
-def get_imported_modules(file_path, directory_path):
+def get_imported_modules(file_path, directory_path, module_index=None, fast=False):
     """
     解析Python文件中的import语句，获取项目内部的模块依赖。
 
     :param file_path: 当前文件路径
     :param directory_path: 项目根目录路径
+    :param module_index: 可选的 ModuleIndex，解析多个文件时应复用同一个索引；
+                         为None时不遍历目录，按需检查模块文件是否存在（见 FileSystemModuleResolver）
+    :param fast: 是否先用词法扫描提取导入，只在扫描无法确定时才构建语法树
     :return: 被导入的项目内模块文件路径列表，解析失败时返回None
     """
-    imported_files = []
-
     try:
         if not os.path.exists(file_path):
             raise ValueError(f"文件路径不存在: {file_path}")
@@ -234,63 +1361,347 @@ def get_imported_modules(file_path, directory_path):
             file_content = f.read()
 
         # 解析Python文件
-        tree = ast.parse(file_content)
-
-        # 查找import和from ... import语句
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    module_path = resolve_module_path(alias.name, directory_path)
-                    if module_path:
-                        imported_files.append(module_path)
-                    else:
-                        # print(f"警告: 无法解析模块 {alias.name}，在 {file_path}")
-                        pass
-
-            elif isinstance(node, ast.ImportFrom):
-                module_path = resolve_module_path(node.module, directory_path)
-                if module_path:
-                    imported_files.append(module_path)
-                else:
-                    # print(f"警告: 无法解析模块 {node.module}，在 {file_path}")
-                    pass
+        imports = extract_imports_fast(file_content) if fast else extract_imports(ast.parse(file_content))
 
-        return imported_files
+        if module_index is None:
+            module_index = FileSystemModuleResolver(directory_path)
+        return module_index.resolve_imports(imports, file_path)
 
     except Exception as e:
         print(f"解析文件依赖时发生错误: {e} (文件: {file_path})")
         traceback.print_exc()
         return None
 
-def resolve_module_path(module_name, directory_path):
+def extract_imports(tree):
+    """
+    提取语法树中的import和from ... import语句。
+
+    :param tree: ast.parse 得到的语法树
+    :return: 导入语句描述列表，每项为 (模块名, 导入的名称元组, 相对导入层级)：
+             import a.b -> ("a.b", (), 0)；from . import x -> (None, ("x",), 1)
+    """
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append((alias.name, (), 0))
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.module, tuple(alias.name for alias in node.names), node.level))
+    return imports
+
+# 每个分支都以固定字符开头（引号、#、换行、i），正则引擎可以直接跳到这些字符处尝试匹配，而不必在每个位置尝试全部分支
+IMPORT_SCAN_PATTERN = re.compile(r"""
+    \'\'\'(?:\\[\s\S]|[^\\])*?\'\'\'
+  | \"\"\"(?:\\[\s\S]|[^\\])*?\"\"\"
+  | '(?:\\[\s\S]|[^'\\\n])*'
+  | "(?:\\[\s\S]|[^"\\\n])*"
+  | \#[^\r\n]*
+  | \n[ \t]*import\b(?P<names>(?:\\\r?\n|[^\r\n;\#\\])*)
+  | \n[ \t]*from\b(?P<module>(?:[ \t.]|\\\r?\n)*[\w.]*)(?:[ \t]|\\\r?\n)*import\b(?:[ \t]|\\\r?\n)*
+        (?:\((?P<paren_names>(?:\#[^\r\n]*|[^)\#])*)\)|(?P<from_names>(?:\\\r?\n|[^\r\n;\#\\(])*))
+  | \n[ \t]*(?P<bare_from>from)\b
+  | import\b
+""", re.VERBOSE)
+
+IMPORT_ALIAS_PATTERN = re.compile(r"([^\W\d]\w*(?:[ \t]*\.[ \t]*[^\W\d]\w*)*)(?:[ \t]+as[ \t]+[^\W\d]\w*)?")
+
+def scan_imports(file_content):
+    """
+    不构建语法树，用编译好的正则在C层面一次扫描出文件中的 import 和 from ... import 语句。
+
+    扫描跳过字符串字面量和注释，支持反斜杠续行和括号中的多行导入。遇到无法确定的写法时返回None，
+    由调用方回退到 ast.parse：如分号后的导入、单行 if 中的导入，以及任何未被识别为导入语句的
+    import 关键字或行首的 from 关键字。
+    与 extract_imports 的结果相同，只是嵌套在函数等代码块中的导入按源码顺序而不是语法树遍历顺序排列。
+
+    :param file_content: 文件内容
+    :return: 导入语句描述列表，格式同 extract_imports；无法确定时返回None
+    """
+    if "import" not in file_content:
+        return []
+
+    # 在开头补一个换行，使第一行的导入语句同样以换行开头
+    file_content = "\n" + file_content
+    imports = []
+    for match in IMPORT_SCAN_PATTERN.finditer(file_content):
+        names = match.group("names")
+        module = match.group("module")
+        if names is None and module is None:
+            if match.group("bare_from"):
+                return None  # 行首的 from 没有匹配为完整的导入语句，如模块名中间的续行
+            if match.group().startswith("import"):
+                start = match.start()
+                if file_content[start - 1].isalnum() or file_content[start - 1] == "_":
+                    continue  # 标识符的一部分，如 reimport
+                return None
+            continue  # 字符串或注释
+
+        if module is None:
+            names = split_import_names(names)
+            if not names:
+                return None
+            imports.extend((name, (), 0) for name in names)
+            continue
+
+        module = "".join(module.replace("\\\r\n", " ").replace("\\\n", " ").split())
+        level = len(module) - len(module.lstrip("."))
+        module = module[level:] or None
+        if match.group("paren_names") is not None:
+            names = split_import_names(re.sub(r"#[^\r\n]*", "", match.group("paren_names")), allow_trailing_comma=True)
+        else:
+            names = split_import_names(match.group("from_names"), allow_star=True)
+        if not names or (level == 0 and module is None) or (module and not IMPORT_ALIAS_PATTERN.fullmatch(module)):
+            return None
+        imports.append((module, tuple(names), level))
+    return imports
+
+def split_import_names(text, allow_star=False, allow_trailing_comma=False):
+    """
+    拆分导入语句中以逗号分隔的名称列表，去掉 as 别名。
+
+    :param text: 名称列表文本，可能包含反斜杠续行
+    :param allow_star: 是否允许 from ... import *
+    :param allow_trailing_comma: 是否允许末尾逗号（仅括号形式）
+    :return: 名称列表，文本不是合法的名称列表时返回None
+    """
+    text = text.replace("\\\r\n", " ").replace("\\\n", " ").strip()
+    if allow_star and text == "*":
+        return ["*"]
+    parts = [part.strip() for part in text.split(",")]
+    if allow_trailing_comma and len(parts) > 1 and not parts[-1]:
+        parts.pop()
+    names = []
+    for part in parts:
+        match = IMPORT_ALIAS_PATTERN.fullmatch(part)
+        if match is None:
+            return None
+        names.append("".join(match.group(1).split()))
+    return names
+
+def extract_imports_fast(file_content):
+    """
+    先用 scan_imports 做词法扫描，只有扫描结果无法确定时才回退到 ast.parse。
+
+    :param file_content: 文件内容
+    :return: 导入语句描述列表，格式同 extract_imports
+    """
+    imports = scan_imports(file_content)
+    if imports is None:
+        imports = extract_imports(ast.parse(file_content))
+    return imports
+
+class ModuleIndex:
+    """
+    项目内模块索引：一次遍历建立 模块名 -> 文件路径 的映射，包括包（__init__.py）。
+
+    建好索引后解析导入只需字典查找，不再对每个导入调用 os.path.exists，
+    并支持相对导入（from . import x）和 from 包 import 子模块 的解析。
+    """
+
+    def __init__(self, directory_path, file_paths=None):
+        """
+        :param directory_path: 项目根目录路径
+        :param file_paths: 目录下的Python文件列表，为None时自动遍历目录
+        """
+        self.directory_path = directory_path
+        self.modules = {}  # {模块名: 文件路径}
+        self.module_names = {}  # {文件路径: (模块名, 是否为包)}
+        if file_paths is None:
+            file_paths = list_python_files(directory_path)
+        for file_path in file_paths:
+            self.add_file(file_path)
+
+    def add_file(self, file_path):
+        """
+        将文件加入索引。
+
+        :param file_path: 目录下的Python文件路径
+        """
+        module_name, is_package = self.module_name_of(file_path)
+        self.module_names[file_path] = (module_name, is_package)
+        if not module_name:
+            return  # 根目录的 __init__.py 没有对应的模块名
+        # 同名的包和模块同时存在时，与Python导入规则一致，包优先
+        if is_package or module_name not in self.modules:
+            self.modules[module_name] = file_path
+
+    def module_name_of(self, file_path):
+        """
+        根据文件相对项目根目录的路径计算模块名。
+
+        :param file_path: 目录下的Python文件路径
+        :return: (模块名, 是否为包)，根目录的 __init__.py 的模块名为空字符串
+        """
+        rel_path = os.path.relpath(file_path, self.directory_path)
+        parts = rel_path[:-len(".py")].split(os.sep)
+        is_package = parts[-1] == "__init__"
+        if is_package:
+            parts = parts[:-1]
+        return ".".join(parts), is_package
+
+    def module_info(self, file_path):
+        """
+        :param file_path: 目录下的Python文件路径
+        :return: (模块名, 是否为包)，文件不在索引中时返回 (None, False)
+        """
+        return self.module_names.get(file_path, (None, False))
+
+    def remove_file(self, file_path):
+        """
+        从索引中移除文件。
+
+        :param file_path: 目录下的Python文件路径
+        """
+        module_name, is_package = self.module_names.pop(file_path, (None, False))
+        if module_name and self.modules.get(module_name) == file_path:
+            del self.modules[module_name]
+            # 恢复被包遮蔽的同名模块
+            shadowed = os.path.join(self.directory_path, *module_name.split(".")) + ".py"
+            if is_package and shadowed in self.module_names:
+                self.modules[module_name] = shadowed
+
+    def resolve(self, module_name):
+        """
+        :param module_name: 绝对模块名（如 utils.parser）
+        :return: 对应的文件路径，不在项目内时返回None
+        """
+        return self.modules.get(module_name)
+
+    def resolve_imports(self, imports, file_path):
+        """
+        将 extract_imports 得到的导入语句解析为项目内文件路径，项目外的模块被忽略，结果去重并保持顺序。
+
+        :param imports: extract_imports 的结果
+        :param file_path: 发起导入的文件路径，用于解析相对导入
+        :return: 被导入的项目内模块文件路径列表
+        """
+        imported_files = {}
+        for module_name, names, level in imports:
+            if level:
+                module_name = self.resolve_relative(module_name, level, file_path)
+                if module_name is None:
+                    continue
+
+            # from 包 import 子模块：优先解析为子模块文件
+            unresolved = not names
+            for name in names:
+                submodule_path = self.resolve(f"{module_name}.{name}" if module_name else name)
+                if submodule_path:
+                    imported_files[submodule_path] = None
+                else:
+                    unresolved = True
+
+            if unresolved and module_name:
+                module_path = self.resolve(module_name)
+                if module_path:
+                    imported_files[module_path] = None
+
+        imported_files.pop(file_path, None)
+        return list(imported_files)
+
+    def resolve_relative(self, module_name, level, file_path):
+        """
+        将相对导入转换为绝对模块名。
+
+        :param module_name: from 后的模块名，from . import x 时为None
+        :param level: 相对导入层级（点的个数）
+        :param file_path: 发起导入的文件路径
+        :return: 绝对模块名，超出项目根目录时返回None；结果为空字符串表示项目根目录
+        """
+        current, is_package = self.module_info(file_path)
+        if current is None:
+            return None
+        package_parts = current.split(".") if current else []
+        if not is_package:
+            package_parts = package_parts[:-1]
+        if level - 1 > len(package_parts):
+            return None
+        base_parts = package_parts[:len(package_parts) - (level - 1)]
+        if module_name:
+            base_parts.append(module_name)
+        return ".".join(base_parts)
+
+class FileSystemModuleResolver(ModuleIndex):
+    """
+    不建立索引的模块解析器：解析规则与 ModuleIndex 相同，但按需检查模块文件是否存在，不遍历目录。
+
+    只解析少量文件时使用（如单独调用 get_imported_modules），开销与导入数量成正比，与项目大小无关；
+    解析整个项目时应建立一次 ModuleIndex 并复用。
+    """
+
+    def __init__(self, directory_path):
+        """
+        :param directory_path: 项目根目录路径
+        """
+        self.directory_path = directory_path
+        self.modules = {}
+        self.module_names = {}
+
+    def resolve(self, module_name):
+        """
+        :param module_name: 绝对模块名（如 utils.parser）
+        :return: 对应的文件路径，不在项目内时返回None
+        """
+        return resolve_module_path(module_name, self.directory_path)
+
+    def module_info(self, file_path):
+        """
+        :param file_path: 目录下的Python文件路径
+        :return: (模块名, 是否为包)，文件不在项目根目录下时返回 (None, False)
+        """
+        rel_path = os.path.relpath(file_path, self.directory_path)
+        if rel_path.startswith(os.pardir + os.sep):
+            return None, False
+        return self.module_name_of(file_path)
+
+def resolve_module_path(module_name, directory_path, module_index=None):
     """
     根据模块名称解析项目内模块的文件路径。
 
     :param module_name: 模块名称（如 utils.parser）
     :param directory_path: 项目根目录路径
+    :param module_index: 可选的 ModuleIndex，提供时直接查索引，不访问文件系统
     :return: 对应的文件路径，如果模块在项目内存在，返回其文件路径；否则返回None
     """
+    if not module_name:
+        return None
+    if module_index is not None:
+        return module_index.resolve(module_name)
     try:
-        # 将模块名转换为文件路径
-        module_path = os.path.join(directory_path, module_name.replace(".", "/") + ".py")
-        if os.path.exists(module_path):
-            return module_path
-        else:
-            # print(f"警告: 模块路径不存在 {module_path} (模块: {module_name})")
-            return None
+        # 将模块名转换为文件路径，包优先于同名模块
+        base_path = os.path.join(directory_path, module_name.replace(".", "/"))
+        for module_path in (os.path.join(base_path, "__init__.py"), base_path + ".py"):
+            if os.path.exists(module_path):
+                return module_path
+        # print(f"警告: 模块路径不存在 {base_path} (模块: {module_name})")
+        return None
     except Exception as e:
         # print(f"解析模块路径时发生错误: {e} (模块: {module_name})")
         traceback.print_exc()
         return None
 
-def topological_sort(dependencies):
+def topological_sort(dependencies, handle_cycles=False, verbose=1):
     """
     根据文件依赖关系进行拓扑排序，返回按依赖顺序排序的文件列表。
 
+    默认使用Kahn算法，处于循环依赖中的文件入度始终不为0，会从结果中丢失。
+    handle_cycles=True 时改用强连通分量缩点排序，循环依赖的文件作为一组连续输出并打印警告，结果包含全部文件。
+
     :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :param handle_cycles: 是否处理循环依赖
+    :param verbose: 为0时不打印循环依赖警告
     :return: 拓扑排序后的文件路径列表
     """
     try:
+        if isinstance(dependencies, CompactGraph):
+            return dependencies.topological_sort(handle_cycles, verbose)
+        if handle_cycles:
+            sorted_groups, cycle_groups = topological_sort_with_cycles(dependencies)
+            if verbose >= 1:
+                for group in cycle_groups:
+                    print(f"警告: 发现循环依赖: {' -> '.join(group)}")
+            return [file for group in sorted_groups for file in group]
+
         indegree = {file: 0 for file in dependencies}  # 记录每个文件的入度
         for file, deps in dependencies.items():
             for dep in deps:
@@ -318,65 +1729,877 @@ def topological_sort(dependencies):
         traceback.print_exc()
         return []
 
-def print_dependency_graph(dependencies):
+def topological_sort_with_cycles(dependencies):
+    """
+    基于强连通分量（Tarjan算法）的拓扑排序：将循环依赖缩为一组，对缩点后的无环图排序，总复杂度 O(V+E)。
+
+    组的顺序与 topological_sort 相同（导入方在前，被依赖的文件在后）。
+
+    :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :return: (排序后的文件组列表 [[文件路径]], 其中构成循环依赖的文件组列表)
+    """
+    if isinstance(dependencies, CompactGraph):
+        return dependencies.topological_sort_with_cycles()
+    components = strongly_connected_components(dependencies)
+    components.reverse()  # Tarjan 先输出被依赖的分量，反转后与 Kahn 算法的顺序一致
+
+    cycle_groups = [
+        group for group in components
+        if len(group) > 1 or group[0] in dependencies.get(group[0], ())
+    ]
+    return components, cycle_groups
+
+def strongly_connected_components(dependencies):
+    """
+    使用迭代版Tarjan算法计算依赖图的强连通分量，不受递归深度限制。
+
+    :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :return: 强连通分量列表，每个分量是文件路径列表；被依赖的分量先于依赖它的分量输出
+    """
+    if isinstance(dependencies, CompactGraph):
+        return dependencies.strongly_connected_components()
+
+    # 收集所有节点：既包括键，也包括只作为依赖出现的文件
+    nodes = dict.fromkeys(dependencies)
+    for deps in dependencies.values():
+        nodes.update(dict.fromkeys(deps))
+
+    index = {}  # 节点的访问序号
+    lowlink = {}  # 节点能回溯到的最小访问序号
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+
+    for start in nodes:
+        if start in index:
+            continue
+
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(dependencies.get(start, ())))]
+
+        while work:
+            node, deps = work[-1]
+            for dep in deps:
+                if dep not in index:
+                    # 首次访问，先处理该依赖，之后回到当前节点继续遍历
+                    index[dep] = lowlink[dep] = counter
+                    counter += 1
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(dependencies.get(dep, ()))))
+                    break
+                elif dep in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dep])
+            else:
+                # 当前节点的依赖全部处理完毕
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.reverse()
+                    components.append(component)
+
+    return components
+
+def print_dependency_graph(dependencies, limit=None):
     """
     打印文件依赖拓扑图，显示每个文件的依赖项。
 
     :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+    :param limit: 最多打印的文件数，为None时打印全部，超出部分只打印剩余数量
     """
     try:
+        if isinstance(dependencies, CompactGraph):
+            dependencies.print(limit)
+            return
         print("\n文件依赖拓扑图:")
-        for file, deps in dependencies.items():
+        for index, (file, deps) in enumerate(dependencies.items()):
+            if limit is not None and index >= limit:
+                print(f"... 其余 {len(dependencies) - limit} 个文件未显示")
+                break
             print(f"{file} 依赖 -> {', '.join(deps) if deps else '无'}")
     except Exception as e:
         print(f"打印依赖拓扑图时发生错误: {e}")
         traceback.print_exc()
 
 
+class CompactGraph:
+    """
+    紧凑的整数编号依赖图：文件路径驻留为整数id，依赖边以 CSR 形式保存在 array('i') 中
+    （offsets[i]:offsets[i+1] 是文件 i 的依赖在 targets 中的范围），反向边按需以同样的形式构建。
+
+    与 {文件路径: [依赖文件路径]} 相比，每条边只占4字节、每个文件不再需要一个列表对象，
+    排序、反向查询和打印都直接在整数数组上进行，不再反复对路径字符串求哈希。
+    topological_sort、topological_sort_with_cycles、strongly_connected_components 和 print_dependency_graph
+    可以直接接受 CompactGraph，结果与对应的字典形式依赖图相同。
+    """
+
+    __slots__ = ("paths", "offsets", "targets", "present", "_ids", "_reverse_offsets", "_reverse_targets")
+
+    def __init__(self, paths, offsets, targets, present=None):
+        """
+        :param paths: 文件路径列表，下标即文件id
+        :param offsets: array('i')，长度为文件数+1
+        :param targets: array('i')，全部依赖边的目标文件id
+        :param present: 可选的 bytearray，标记哪些文件是依赖图的键（解析成功的文件）；
+                        为None时全部都是。只作为依赖出现的文件不会被打印，也不出现在 to_dict() 的键中
+        """
+        self.paths = paths
+        self.offsets = offsets
+        self.targets = targets
+        self.present = present if present is not None else bytearray(b"\x01") * len(paths)
+        self._ids = None  # {文件路径: 文件id}，只有按路径查询时才需要，首次使用时构建
+        self._reverse_offsets = None
+        self._reverse_targets = None
+
+    @classmethod
+    def from_dependencies(cls, dependencies):
+        """
+        从字典形式的依赖图构建。文件id的分配顺序与字典算法遍历节点的顺序一致（先是键，再是只作为依赖出现的文件），
+        因此排序结果与字典形式完全相同。
+
+        :param dependencies: 文件依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+        :return: CompactGraph 对象
+        """
+        ids = {file: file_id for file_id, file in enumerate(dependencies)}
+        paths = list(dependencies)
+        key_count = len(paths)
+        offsets = array("i", [0])
+        targets = array("i")
+        for deps in dependencies.values():
+            for dep in deps:
+                dep_id = ids.get(dep)
+                if dep_id is None:
+                    dep_id = ids[dep] = len(paths)
+                    paths.append(dep)
+                targets.append(dep_id)
+            offsets.append(len(targets))
+        # 只作为依赖出现的文件没有依赖边
+        offsets.extend([len(targets)] * (len(paths) - key_count))
+        present = bytearray(b"\x01") * key_count + bytearray(len(paths) - key_count)
+        return cls(paths, offsets, targets, present)
+
+    @classmethod
+    def from_directory(cls, directory_path, cache=None, workers=None, verbose=1, metrics=None, fast=False):
+        """
+        直接解析目录构建紧凑依赖图，不经过字典形式。文件id按目录遍历顺序分配，解析失败的文件不是依赖图的键。
+
+        :param directory_path: 目录路径
+        :param cache: 可选的 ParseCache 对象
+        :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+        :param verbose: 输出详细级别，0 静默，1 批量进度和汇总，2 逐文件输出；传入 metrics 时以 metrics.verbose 为准
+        :param metrics: 可选的 ParseMetrics 对象
+        :param fast: 是否只用词法扫描提取导入（见 scan_imports）
+        :return: CompactGraph 对象
+        """
+        owns_metrics = metrics is None
+        if owns_metrics:
+            metrics = ParseMetrics(verbose)
+
+        with metrics.phase("遍历目录"):
+            paths = list_python_files(directory_path)
+            module_index = ModuleIndex(directory_path, paths)
+        ids = {path: file_id for file_id, path in enumerate(paths)}
+
+        # 解析结果按遍历顺序产出，因此可以逐个文件追加依赖边
+        offsets = array("i", [0])
+        targets = array("i")
+        present = bytearray(len(paths))
+        with metrics.phase("解析文件"):
+            analyses = iter_file_analyses(paths, cache, workers, metrics=metrics, imports_only=fast)
+            for done, (file_path, analysis, error) in enumerate(analyses, 1):
+                metrics.log(f"正在解析文件: {file_path}")
+                metrics.progress(done, len(paths), "解析文件")
+                if analysis is not None:
+                    present[done - 1] = 1
+                    targets.extend(ids[dep] for dep in module_index.resolve_imports(analysis["imports"], file_path))
+                offsets.append(len(targets))
+
+        if owns_metrics and metrics.verbose >= 1:
+            print(metrics.summary())
+        return cls(paths, offsets, targets, present)
+
+    @property
+    def ids(self):
+        """{文件路径: 文件id}"""
+        if self._ids is None:
+            self._ids = {path: file_id for file_id, path in enumerate(self.paths)}
+        return self._ids
+
+    def __len__(self):
+        """依赖图中键的数量，与字典形式的 len() 相同。"""
+        return self.present.count(1)
+
+    def __contains__(self, file):
+        file_id = self.ids.get(file)
+        return file_id is not None and self.present[file_id] == 1
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def dependency_ids(self, file_id):
+        """文件的直接依赖id（数组切片）。"""
+        return self.targets[self.offsets[file_id]:self.offsets[file_id + 1]]
+
+    def dependent_ids(self, file_id):
+        """直接依赖该文件的文件id（数组切片），首次调用时构建反向边。"""
+        if self._reverse_offsets is None:
+            self._build_reverse()
+        return self._reverse_targets[self._reverse_offsets[file_id]:self._reverse_offsets[file_id + 1]]
+
+    def _build_reverse(self):
+        """用计数排序一次构建反向 CSR，每个文件的依赖方按id升序排列。复杂度 O(V+E)。"""
+        node_count = len(self.paths)
+        reverse_offsets = array("i", [0]) * (node_count + 1)
+        for target in self.targets:
+            reverse_offsets[target + 1] += 1
+        for file_id in range(node_count):
+            reverse_offsets[file_id + 1] += reverse_offsets[file_id]
+        cursor = array("i", reverse_offsets)
+        reverse_targets = array("i", [0]) * len(self.targets)
+        offsets, targets = self.offsets, self.targets
+        for source in range(node_count):
+            for target in targets[offsets[source]:offsets[source + 1]]:
+                reverse_targets[cursor[target]] = source
+                cursor[target] += 1
+        self._reverse_offsets = reverse_offsets
+        self._reverse_targets = reverse_targets
+
+    def dependencies(self, file, transitive=False):
+        """
+        :param file: 文件路径
+        :param transitive: 是否包含间接依赖
+        :return: 直接依赖的文件路径列表；transitive=True 时返回全部传递依赖的集合
+        """
+        file_id = self.ids.get(file)
+        if file_id is None:
+            return set() if transitive else []
+        if not transitive:
+            return [self.paths[dep] for dep in self.dependency_ids(file_id)]
+        return {self.paths[dep] for dep in self._closure(file_id, self.dependency_ids)}
+
+    def dependents(self, file, transitive=True):
+        """
+        :param file: 文件路径
+        :param transitive: 是否包含间接依赖方
+        :return: 依赖该文件的文件路径集合；transitive=True 时包含所有间接依赖方
+        """
+        file_id = self.ids.get(file)
+        if file_id is None:
+            return set()
+        if not transitive:
+            return {self.paths[dependent] for dependent in self.dependent_ids(file_id)}
+        return {self.paths[dependent] for dependent in self._closure(file_id, self.dependent_ids)}
+
+    def _closure(self, file_id, neighbours):
+        visited = bytearray(len(self.paths))
+        result = []
+        queue = deque(neighbours(file_id))
+        while queue:
+            current = queue.popleft()
+            if visited[current]:
+                continue
+            visited[current] = 1
+            result.append(current)
+            queue.extend(neighbours(current))
+        return result
+
+    def _active(self):
+        """参与排序的文件：依赖图的键，以及只作为依赖出现（被导入）的文件。"""
+        active = bytearray(self.present)
+        for target in self.targets:
+            active[target] = 1
+        return active
+
+    def topological_sort_ids(self):
+        """
+        Kahn 算法拓扑排序，顺序与 topological_sort 的字典形式相同（导入方在前），循环依赖中的文件会丢失。
+
+        :return: 文件id列表
+        """
+        node_count = len(self.paths)
+        offsets, targets = self.offsets, self.targets
+        indegree = array("i", [0]) * node_count
+        for target in targets:
+            indegree[target] += 1
+        present = self.present
+        queue = deque(file_id for file_id in range(node_count) if indegree[file_id] == 0 and present[file_id])
+        sorted_ids = []
+        while queue:
+            current = queue.popleft()
+            sorted_ids.append(current)
+            for dep in targets[offsets[current]:offsets[current + 1]]:
+                indegree[dep] -= 1
+                if indegree[dep] == 0:
+                    queue.append(dep)
+        return sorted_ids
+
+    def strongly_connected_component_ids(self):
+        """
+        迭代版 Tarjan 算法，输出顺序与 strongly_connected_components 的字典形式相同（被依赖的分量在前）。
+
+        :return: 强连通分量列表，每个分量是文件id列表
+        """
+        node_count = len(self.paths)
+        offsets, targets = self.offsets, self.targets
+        index = array("i", [-1]) * node_count
+        lowlink = array("i", [0]) * node_count
+        on_stack = bytearray(node_count)
+        active = self._active()
+        stack = []
+        components = []
+        counter = 0
+
+        for start in range(node_count):
+            if index[start] != -1 or not active[start]:
+                continue
+            index[start] = lowlink[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack[start] = 1
+            work_nodes = [start]  # 深度优先遍历的节点栈
+            work_positions = [offsets[start]]  # 每个节点下一条待处理的依赖边
+
+            while work_nodes:
+                node = work_nodes[-1]
+                position = work_positions[-1]
+                end = offsets[node + 1]
+                descended = False
+                while position < end:
+                    dep = targets[position]
+                    position += 1
+                    if index[dep] == -1:
+                        # 首次访问，先处理该依赖，之后回到当前节点继续遍历
+                        work_positions[-1] = position
+                        index[dep] = lowlink[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack[dep] = 1
+                        work_nodes.append(dep)
+                        work_positions.append(offsets[dep])
+                        descended = True
+                        break
+                    elif on_stack[dep] and index[dep] < lowlink[node]:
+                        lowlink[node] = index[dep]
+                if descended:
+                    continue
+
+                # 当前节点的依赖全部处理完毕
+                work_nodes.pop()
+                work_positions.pop()
+                if work_nodes:
+                    parent = work_nodes[-1]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    split = len(stack) - 1
+                    while stack[split] != node:
+                        split -= 1
+                    component = stack[split:]
+                    del stack[split:]
+                    for member in component:
+                        on_stack[member] = 0
+                    components.append(component)
+
+        return components
+
+    def strongly_connected_components(self):
+        """与 strongly_connected_components(dependencies) 相同，返回文件路径形式的强连通分量列表。"""
+        paths = self.paths
+        return [[paths[file_id] for file_id in component] for component in self.strongly_connected_component_ids()]
+
+    def topological_sort_with_cycles(self):
+        """与 topological_sort_with_cycles(dependencies) 相同：返回 (排序后的文件组列表, 构成循环依赖的文件组列表)。"""
+        components = self.strongly_connected_component_ids()
+        components.reverse()  # Tarjan 先输出被依赖的分量，反转后与 Kahn 算法的顺序一致
+        paths = self.paths
+        groups = [[paths[file_id] for file_id in component] for component in components]
+        cycle_groups = [
+            group for group, component in zip(groups, components)
+            if len(component) > 1 or component[0] in self.dependency_ids(component[0])
+        ]
+        return groups, cycle_groups
+
+    def topological_sort(self, handle_cycles=False, verbose=1):
+        """与 topological_sort(dependencies, handle_cycles, verbose) 相同，返回文件路径列表。"""
+        if handle_cycles:
+            sorted_groups, cycle_groups = self.topological_sort_with_cycles()
+            if verbose >= 1:
+                for group in cycle_groups:
+                    print(f"警告: 发现循环依赖: {' -> '.join(group)}")
+            return [file for group in sorted_groups for file in group]
+        paths = self.paths
+        return [paths[file_id] for file_id in self.topological_sort_ids()]
+
+    def print(self, limit=None):
+        """与 print_dependency_graph(dependencies, limit) 的输出相同。"""
+        print("\n文件依赖拓扑图:")
+        paths = self.paths
+        key_count = len(self)
+        printed = 0
+        for file_id, path in enumerate(paths):
+            if not self.present[file_id]:
+                continue
+            if limit is not None and printed >= limit:
+                print(f"... 其余 {key_count - limit} 个文件未显示")
+                break
+            deps = self.dependency_ids(file_id)
+            print(f"{path} 依赖 -> {', '.join(paths[dep] for dep in deps) if deps else '无'}")
+            printed += 1
+
+    def to_dict(self):
+        """
+        :return: 字典形式的依赖图 {文件路径: [依赖文件路径]}
+        """
+        paths = self.paths
+        return {paths[file_id]: [paths[dep] for dep in self.dependency_ids(file_id)]
+                for file_id in range(len(paths)) if self.present[file_id]}
+
+class DependencyGraph:
+    """
+    同时保存正向和反向邻接表的依赖关系图，支持影响范围查询。
+
+    传递闭包按需计算并缓存，重复查询直接返回缓存结果；图被修改时缓存失效。
+    """
+
+    def __init__(self, dependencies=None):
+        """
+        :param dependencies: 可选的初始依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+        """
+        self.forward = {}  # {文件路径: [依赖文件路径]}
+        self.reverse = defaultdict(set)  # {文件路径: {直接依赖它的文件}}
+        self._dependencies_closure = {}
+        self._dependents_closure = {}
+        for file, deps in (dependencies or {}).items():
+            self.set_dependencies(file, deps)
+
+    def set_dependencies(self, file, deps):
+        """
+        设置（或替换）文件的直接依赖。
+
+        :param file: 文件路径
+        :param deps: 依赖文件路径列表
+        """
+        for dep in self.forward.get(file, ()):
+            self.reverse[dep].discard(file)
+        self.forward[file] = list(deps)
+        for dep in self.forward[file]:
+            self.reverse[dep].add(file)
+        self._invalidate()
+
+    def remove_file(self, file):
+        """
+        删除文件及其依赖边，其他文件指向它的边保留（与 generate_dependency_graph 中依赖未解析文件的情况一致）。
+
+        :param file: 文件路径
+        """
+        for dep in self.forward.pop(file, ()):
+            self.reverse[dep].discard(file)
+        self._invalidate()
+
+    def _invalidate(self):
+        if self._dependencies_closure or self._dependents_closure:
+            self._dependencies_closure = {}
+            self._dependents_closure = {}
+
+    def dependencies(self, file, transitive=False):
+        """
+        :param file: 文件路径
+        :param transitive: 是否包含间接依赖
+        :return: 直接依赖列表；transitive=True 时返回全部传递依赖的集合（不含文件自身，除非处于循环中）
+        """
+        if not transitive:
+            return list(self.forward.get(file, ()))
+        return self._closure(file, self.forward, self._dependencies_closure)
+
+    def dependents(self, file, transitive=True):
+        """
+        :param file: 文件路径
+        :param transitive: 是否包含间接依赖方
+        :return: 依赖该文件的文件集合；transitive=True 时包含所有间接依赖方
+        """
+        if not transitive:
+            return frozenset(self.reverse.get(file, ()))
+        return self._closure(file, self.reverse, self._dependents_closure)
+
+    def affected(self, changed_files):
+        """
+        :param changed_files: 有变化的文件
+        :return: 变化的文件及其所有传递依赖方的集合，即需要重新处理的文件
+        """
+        affected = set(changed_files)
+        for file in changed_files:
+            affected |= self.dependents(file)
+        return affected
+
+    @staticmethod
+    def _closure(file, adjacency, memo):
+        closure = memo.get(file)
+        if closure is None:
+            visited = set()
+            queue = deque(adjacency.get(file, ()))
+            while queue:
+                current = queue.popleft()
+                if current in visited:
+                    continue
+                visited.add(current)
+                queue.extend(adjacency.get(current, ()))
+            closure = memo[file] = frozenset(visited)
+        return closure
+
+    def to_dict(self):
+        """
+        :return: 依赖关系图，字典形式 {文件路径: [依赖文件路径]}
+        """
+        return {file: list(deps) for file, deps in self.forward.items()}
+
+    def __contains__(self, file):
+        return file in self.forward
+
+    def __len__(self):
+        return len(self.forward)
+
+class ProjectState:
+    """
+    在内存中维护目录的解析结果和依赖关系图。
+
+    refresh() 只对比文件的 mtime 和大小，重新解析有变化的文件，并就地更新依赖图的正向和反向边；
+    只有新增或删除文件（模块集合变化）时才重新解析全部文件的导入，而这一步只是字典查找，不会重新读取文件。
+    """
+
+    def __init__(self, directory_path, cache=None, workers=None):
+        """
+        :param directory_path: 项目根目录路径
+        :param cache: 可选的 ParseCache 对象，用于首次全量解析
+        :param workers: 首次全量解析的并行进程数
+        """
+        self.directory_path = directory_path
+        self.stats = {}  # {文件路径: (mtime, 文件大小)}
+        self.analyses = {}  # {文件路径: analyze_python_file的结果}，解析失败的文件不在其中
+        self.graph = DependencyGraph()
+        self.removed_dependents = {}  # 最近一次 refresh 中被删除的文件 -> 删除前直接依赖它的文件
+        self.module_index = ModuleIndex(directory_path, [])
+        self.load(cache, workers)
+
+    def load(self, cache=None, workers=None):
+        """全量扫描并解析目录，建立初始状态。"""
+        self.stats = scan_python_files(self.directory_path)
+        file_paths = list(self.stats)
+        for file_path in file_paths:
+            self.module_index.add_file(file_path)
+        for file_path, analysis, error in iter_file_analyses(file_paths, cache, workers):
+            if analysis is not None:
+                self.analyses[file_path] = analysis
+            else:
+                print(f"警告: 无法解析文件 {file_path}: {error}")
+        for file_path in file_paths:
+            self.update_dependencies(file_path)
+
+    def refresh(self):
+        """
+        检查文件变化并增量更新状态。
+
+        :return: 有变化的文件集合（新增、修改和删除的文件）
+        """
+        snapshot = scan_python_files(self.directory_path)
+        added = snapshot.keys() - self.stats.keys()
+        removed = self.stats.keys() - snapshot.keys()
+        modified = {file for file in snapshot.keys() & self.stats.keys() if snapshot[file] != self.stats[file]}
+        self.stats = snapshot
+
+        self.removed_dependents = {file: self.graph.dependents(file, transitive=False) for file in removed}
+        for file_path in removed:
+            self.module_index.remove_file(file_path)
+            self.analyses.pop(file_path, None)
+            self.update_dependencies(file_path, removed=True)
+        for file_path in added:
+            self.module_index.add_file(file_path)
+
+        for file_path in added | modified:
+            try:
+                self.analyses[file_path] = analyze_python_file(file_path)
+            except Exception as e:
+                self.analyses.pop(file_path, None)
+                print(f"警告: 无法解析文件 {file_path}: {e}")
+
+        # 模块集合变化时，其他文件原本无法解析的导入可能变得可以解析（或相反），需要重新解析全部导入
+        relink = self.stats if added or removed else added | modified
+        for file_path in relink:
+            self.update_dependencies(file_path)
+
+        return added | modified | removed
+
+    def update_dependencies(self, file_path, removed=False):
+        """
+        根据文件当前的分析结果更新它的正向和反向依赖边。
+
+        :param file_path: 文件路径
+        :param removed: 文件是否已被删除
+        """
+        if removed:
+            self.graph.remove_file(file_path)
+            return
+
+        analysis = self.analyses.get(file_path)
+        deps = self.module_index.resolve_imports(analysis["imports"], file_path) if analysis else []
+        if deps != self.graph.forward.get(file_path):
+            self.graph.set_dependencies(file_path, deps)
+
+    @property
+    def dependencies(self):
+        """当前的依赖关系图，字典形式 {文件路径: [依赖文件路径]}"""
+        return self.graph.forward
+
+    def affected(self, changed_files):
+        """
+        :param changed_files: 有变化的文件
+        :return: 仍存在的变化文件及其所有传递依赖方的集合
+        """
+        seeds = set(changed_files)
+        for file_path in changed_files:
+            # 被删除的文件已不在依赖图中，从删除前记录的依赖方继续查找
+            seeds |= self.removed_dependents.get(file_path, set())
+        return {file for file in self.graph.affected(seeds) if file in self.graph}
+
+    def order(self, files):
+        """
+        只对给定文件构成的子图做拓扑排序，依赖项在前，循环依赖的文件相邻输出。
+
+        :param files: 文件集合
+        :return: 排序后的文件列表
+        """
+        subgraph = {file: [dep for dep in self.graph.forward.get(file, ()) if dep in files] for file in files}
+        return [file for component in strongly_connected_components(subgraph) for file in component]
+
+def scan_python_files(directory_path):
+    """
+    扫描目录下所有Python文件的 mtime 和大小，只调用 stat，不读取文件内容。遍历方式与 os.walk 相同（不进入目录的符号链接）。
+
+    :param directory_path: 目录路径
+    :return: {文件路径: (mtime, 文件大小)}
+    """
+    stats = {}
+    stack = [directory_path]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                subdirs = []
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue  # 文件在扫描过程中被删除
+                        stats[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+    return stats
+
+def watch(directory_path, on_change, interval=2.0, cache=None, workers=None, use_inotify=True):
+    """
+    持续监视目录，文件变化时只重新解析变化的文件、就地更新依赖图，并调用回调函数。
+
+    inotify_simple 是可选依赖（仅Linux，需要时 pip install inotify_simple，见 requirements.txt）：
+    安装了它时阻塞等待文件系统事件；未安装或无法创建 inotify 实例时，每隔 interval 秒轮询一次文件的 mtime。
+    按 Ctrl+C 停止监视。
+
+    :param directory_path: 项目根目录路径
+    :param on_change: 回调函数 on_change(changed_files, affected_files)：changed_files 为有变化的文件列表
+                      （包括已删除的文件），affected_files 为仍存在的变化文件及其全部传递依赖方，依赖项在前
+    :param interval: 轮询间隔（秒），使用 inotify 时为最长等待时间
+    :param cache: 可选的 ParseCache 对象，用于启动时的全量解析
+    :param workers: 启动时全量解析的并行进程数
+    :param use_inotify: 可用时是否使用 inotify
+    :return: 最终的 ProjectState 对象
+    """
+    print(f"开始监视目录: {directory_path}")
+    state = ProjectState(directory_path, cache=cache, workers=workers)
+    if cache is not None:
+        cache.save()
+
+    notifier = None
+    if use_inotify and INotify is not None:
+        try:
+            notifier = InotifyWaiter(directory_path)
+        except OSError as e:
+            print(f"警告: 无法使用 inotify，改为每 {interval} 秒轮询: {e}")
+    try:
+        while True:
+            if notifier is not None:
+                notifier.wait(interval)
+            else:
+                time.sleep(interval)
+
+            changed = state.refresh()
+            if not changed:
+                continue
+            affected = state.order(state.affected(changed))
+            try:
+                on_change(sorted(changed), affected)
+            except Exception as e:
+                print(f"回调函数处理文件变化时发生错误: {e}")
+                traceback.print_exc()
+    except KeyboardInterrupt:
+        print("停止监视目录")
+    finally:
+        if notifier is not None:
+            notifier.close()
+    return state
+
+class InotifyWaiter:
+    """使用 inotify 等待目录树中的文件变化，新建的子目录会被自动加入监视。"""
+
+    def __init__(self, directory_path):
+        self.inotify = INotify()
+        self.watched = {}  # {目录路径: watch描述符}
+        self.flags = (inotify_flags.CREATE | inotify_flags.DELETE | inotify_flags.MODIFY
+                      | inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO)
+        self.directory_path = directory_path
+        self.add_watches()
+
+    def add_watches(self):
+        """为尚未监视的目录添加监视。"""
+        for root, dirs, files in os.walk(self.directory_path):
+            if root not in self.watched:
+                try:
+                    self.watched[root] = self.inotify.add_watch(root, self.flags)
+                except OSError as e:
+                    print(f"警告: 无法监视目录 {root}: {e}")
+
+    def wait(self, timeout):
+        """
+        阻塞直到有文件事件或超时。
+
+        :param timeout: 最长等待时间（秒）
+        """
+        events = self.inotify.read(timeout=int(timeout * 1000))
+        if events:
+            # 短暂等待，把一次保存触发的多个事件合并处理
+            time.sleep(0.05)
+            self.inotify.read(timeout=0)
+            if any(event.mask & inotify_flags.ISDIR for event in events):
+                self.add_watches()
+
+    def close(self):
+        self.inotify.close()
+
+
 
 def depth_first_traverse_directory(directory_path, callback, exclude_dirs=None):
     """
     深度优先遍历指定目录，将目录路径传递给回调函数，并支持排除指定的目录。
     
     遍历顺序为从最深层的子目录开始，逐步返回并处理上层目录，直到最顶层目录。
+    基于 iter_directories_post_order 实现，不受递归深度限制，并会跳过符号链接造成的循环。
     
     :param directory_path: 要遍历的根目录路径
     :param callback: 处理每个目录的回调函数，接受目录路径作为参数
     :param exclude_dirs: 排除的目录列表，默认为 ['.git', '.github', '.ci']
     """
     try:
-        # 设置默认的排除目录列表
-        if exclude_dirs is None:
-            exclude_dirs = ['.git', '.github', '.ci']
-
-        # 递归深度优先遍历
-        def traverse(dir_path):
-            # 遍历子目录
+        for dir_path in iter_directories_post_order(directory_path, exclude_dirs):
             try:
-                with os.scandir(dir_path) as it:
-                    subdirs = []
-                    for entry in it:
-                        # 如果是目录并且不在排除列表中，递归遍历子目录
-                        if entry.is_dir() and entry.name not in exclude_dirs:
-                            subdirs.append(entry.path)
-                    
-                    # 先递归处理子目录
-                    for subdir in subdirs:
-                        traverse(subdir)
-
-                # 子目录处理完成后，再处理当前目录
                 callback(dir_path)
             except Exception as e:
                 print(f"处理目录 {dir_path} 时发生错误: {e}")
                 traceback.print_exc()
 
-        # 从根目录开始遍历
-        traverse(directory_path)
-
     except Exception as e:
         print(f"深度优先遍历目录时发生错误: {e}")
         traceback.print_exc()
 
+def iter_directories_post_order(directory_path, exclude_dirs=None, errors=None):
+    """
+    以迭代方式后序遍历目录树，子目录先于父目录产出，按需逐个生成目录路径。
+
+    每个目录先读出全部子目录项、关闭 os.scandir 迭代器后再向下遍历，同一时刻最多打开一个目录，
+    打开的文件描述符数量与目录深度无关；内存占用与当前路径上各层的子目录数之和成正比。
+    目录类型直接取自 DirEntry，普通子目录不额外调用 stat；通过祖先目录的 (st_dev, st_ino)
+    识别符号链接循环。无法读取的目录会打印错误、记入 errors 并跳过；
+    文件描述符耗尽（EMFILE/ENFILE）时直接抛出异常，不会悄悄截断遍历结果。
+
+    :param directory_path: 要遍历的根目录路径
+    :param exclude_dirs: 排除的目录名列表，默认为 ['.git', '.github', '.ci']
+    :param errors: 可选的列表，追加无法读取的目录 (目录路径, 异常)
+    :return: 生成器，按后序产出目录路径
+    """
+    if exclude_dirs is None:
+        exclude_dirs = ['.git', '.github', '.ci']
+    exclude_dirs = set(exclude_dirs)
+
+    def report(path, error):
+        if error.errno in (errno.EMFILE, errno.ENFILE):
+            raise error
+        print(f"处理目录 {path} 时发生错误: {error}")
+        if errors is not None:
+            errors.append((path, error))
+
+    def list_child_directories(dir_path, dir_key):
+        children = []
+        with os.scandir(dir_path) as iterator:
+            for entry in iterator:
+                if not entry.is_dir() or entry.name in exclude_dirs:
+                    continue
+                if entry.is_symlink():
+                    # 只有符号链接可能指向其他位置，需要 stat 获取真实目录
+                    child_stat = entry.stat()
+                    child_key = (child_stat.st_dev, child_stat.st_ino)
+                else:
+                    # 普通子目录与父目录在同一设备上，inode 由 scandir 直接提供
+                    child_key = (dir_key[0], entry.inode())
+                if child_key in ancestors:
+                    print(f"警告: 跳过循环链接的目录 {entry.path}")
+                    continue
+                children.append((entry.path, child_key))
+        return children
+
+    try:
+        root_stat = os.stat(directory_path)
+        root_key = (root_stat.st_dev, root_stat.st_ino)
+        ancestors = {root_key}  # 当前路径上所有目录的 (st_dev, st_ino)
+        root_children = list_child_directories(directory_path, root_key)
+    except OSError as e:
+        report(directory_path, e)
+        return
+
+    stack = [(directory_path, root_key, iter(root_children))]
+    while stack:
+        dir_path, dir_key, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            # 所有子目录处理完毕，产出当前目录
+            stack.pop()
+            ancestors.discard(dir_key)
+            yield dir_path
+            continue
+
+        child_path, child_key = child
+        ancestors.add(child_key)
+        try:
+            grandchildren = list_child_directories(child_path, child_key)
+        except OSError as e:
+            ancestors.discard(child_key)
+            report(child_path, e)
+            continue
+        stack.append((child_path, child_key, iter(grandchildren)))
+
 # 示例回调函数
 def example_directory_callback(dir_path):
     """
@@ -437,6 +2660,14 @@ def run_list_files_example(directory_path):
         for function_info in file_info["functions"]:
             print(f"  函数: {function_info['function_name']}, 注释: {function_info['docstring']}")
 
+def run_stream_example(directory_path):
+    """
+    运行 stream_python_files_and_contents 示例，依赖项解析完成后立即输出依赖它的文件。
+    """
+    print("\n=== 运行 stream_python_files_and_contents 示例 ===")
+    for file_path, file_info in stream_python_files_and_contents(directory_path):
+        print(f"{file_path}: {len(file_info['classes'])} 个类，{len(file_info['functions'])} 个函数")
+
 def run_callback_example(directory_path):
     """
     运行 process_files_with_callback 示例。
@@ -452,6 +2683,23 @@ def run_dependency_graph_example(directory_path):
     dependencies = generate_dependency_graph(directory_path)
     print_dependency_graph(dependencies)
 
+def example_change_callback(changed_files, affected_files):
+    """
+    示例回调函数，打印变化的文件及受影响的文件。
+
+    :param changed_files: 有变化的文件列表
+    :param affected_files: 受影响的文件列表，依赖项在前
+    """
+    print(f"变化的文件: {changed_files}")
+    print(f"需要重新处理的文件: {affected_files}")
+
+def run_watch_example(directory_path):
+    """
+    运行监视模式示例，按 Ctrl+C 停止。
+    """
+    print("\n=== 运行 watch 示例 ===")
+    watch(directory_path, example_change_callback)
+
 
 
 if __name__ == "__main__":
@@ -460,12 +2708,18 @@ if __name__ == "__main__":
     # 运行list_python_files_and_contents示例
     # run_list_files_example(directory_path)
     
+    # 运行stream_python_files_and_contents示例
+    # run_stream_example(directory_path)
+
     # 运行process_files_with_callback示例
     # run_callback_example(directory_path)
     
     # 运行依赖图生成和打印示例
     # run_dependency_graph_example(directory_path)
 
+    # 运行监视模式示例
+    # run_watch_example(directory_path)
+
     # 运行深度优先遍历目录示例
     # run_depth_first_traverse_example(directory_path)
 
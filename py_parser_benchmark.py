@@ -0,0 +1,319 @@
+# /content/utils/py_parser_benchmark.py
+"""
+简介：py_parser 性能基准测试。生成指定规模的合成Python包目录树（可控制导入扇出和循环依赖比例），
+分别统计 generate_dependency_graph（含只做词法扫描的快速模式）、topological_sort、parse_python_file、
+process_files_with_callback、stream_python_files_and_contents 各阶段的耗时、每秒处理文件数和峰值内存，
+以及流式解析产出第一个结果的等待时间，以JSON格式输出，便于跟踪解析器的性能变化。
+
+使用方法：
+python py_parser_benchmark.py --sizes 1000 10000 100000 --fanout 5 --cycle-ratio 0.01 --output bench.json
+
+工作流：
+1. 生成合成目录树
+2. 依次运行各阶段并计时
+3. 可选地在 tracemalloc 下再运行一次，统计各阶段峰值内存
+4. 输出JSON结果
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import py_parser
+
+MODULES_PER_PACKAGE = 100  # 每个包中的模块数
+
+
+def generate_synthetic_tree(root_dir, module_count, fanout=5, cycle_ratio=0.01, symbols=5, seed=0):
+    """
+    生成合成的Python包目录树。
+
+    模块 i 从编号更小的模块中随机导入 fanout 个（保证无环），并以 cycle_ratio 的概率额外导入一个编号更大的模块，
+    从而形成循环依赖。导入语句混合使用 import、from 包 import 模块 和同包内的相对导入。
+
+    :param root_dir: 目标目录
+    :param module_count: 模块数量
+    :param fanout: 每个模块导入的项目内模块数
+    :param cycle_ratio: 产生循环依赖的模块比例
+    :param symbols: 每个模块中生成的类、函数和全局变量数量
+    :param seed: 随机种子，相同参数生成相同的目录树
+    :return: 生成的文件数（包括 __init__.py）
+    """
+    rng = random.Random(seed)
+    file_count = 0
+
+    def module_ref(index):
+        return f"pkg_{index // MODULES_PER_PACKAGE}", f"mod_{index}"
+
+    for index in range(module_count):
+        package, module = module_ref(index)
+        package_dir = os.path.join(root_dir, package)
+        if index % MODULES_PER_PACKAGE == 0:
+            os.makedirs(package_dir, exist_ok=True)
+            with open(os.path.join(package_dir, "__init__.py"), "w", encoding="utf-8") as f:
+                f.write(f'"""合成包 {package}"""\n')
+            file_count += 1
+
+        targets = rng.sample(range(index), min(fanout, index)) if index else []
+        if index + 1 < module_count and rng.random() < cycle_ratio:
+            targets.append(rng.randrange(index + 1, module_count))
+
+        lines = [f'"""合成模块 {module}"""', ""]
+        for style, target in enumerate(targets):
+            target_package, target_module = module_ref(target)
+            if target_package == package and style % 3 == 2:
+                lines.append(f"from .{target_module} import CONSTANT_0")
+            elif style % 2:
+                lines.append(f"from {target_package} import {target_module}")
+            else:
+                lines.append(f"import {target_package}.{target_module}")
+        lines.append("")
+
+        for n in range(symbols):
+            lines.append(f"# 全局常量 {n}")
+            lines.append(f"CONSTANT_{n} = {n}  # 行尾注释 {n}")
+        lines.append("")
+        for n in range(symbols):
+            lines.extend([
+                f"class Model{n}:",
+                f'    """合成类 {n}"""',
+                f"    field_a = {n}  # 字段注释",
+                "    # 字段上方的注释",
+                f"    field_b = '{n}#not-a-comment'",
+                "",
+                "    def method(self, value):",
+                '        """合成方法"""',
+                "        total = 0",
+                "        for item in range(value):",
+                "            total += item * self.field_a",
+                "        return total",
+                "",
+                f"def function_{n}(x, y=1):",
+                f'    """合成函数 {n}"""',
+                "    return [x * y for _ in range(3)]",
+                "",
+            ])
+
+        with open(os.path.join(package_dir, f"{module}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        file_count += 1
+
+    return file_count
+
+
+def noop_callback(file_path):
+    """基准测试使用的空回调。"""
+
+
+@contextlib.contextmanager
+def suppress_output():
+    """屏蔽被测函数中 verbose 无法关闭的剩余输出。"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def run_phases(root_dir):
+    """
+    依次运行各阶段，返回每个阶段的 (名称, 耗时秒数)、文件数、generate_dependency_graph 内部的 ParseMetrics 指标，
+    以及流式解析产出第一个结果的等待时间。
+
+    :param root_dir: 合成目录树根目录
+    :return: (阶段结果列表, 依赖图中的文件数, 指标字典, 第一个结果的等待秒数)
+    """
+    results = []
+    metrics = py_parser.ParseMetrics(verbose=0)
+
+    def timed(name, func):
+        start = time.perf_counter()
+        with suppress_output():
+            value = func()
+        results.append((name, time.perf_counter() - start))
+        return value
+
+    dependencies = timed("generate_dependency_graph",
+                         lambda: py_parser.generate_dependency_graph(root_dir, metrics=metrics))
+    timed("generate_dependency_graph_fast",
+          lambda: py_parser.generate_dependency_graph(root_dir, verbose=0, fast=True))
+    timed("topological_sort", lambda: py_parser.topological_sort(dependencies))
+    timed("topological_sort_with_cycles",
+          lambda: py_parser.topological_sort(dependencies, handle_cycles=True, verbose=0))
+    compact = timed("compact_graph_from_dependencies", lambda: py_parser.CompactGraph.from_dependencies(dependencies))
+    timed("topological_sort_compact", lambda: py_parser.topological_sort(compact))
+    timed("topological_sort_with_cycles_compact",
+          lambda: py_parser.topological_sort(compact, handle_cycles=True, verbose=0))
+    file_paths = list(dependencies)
+    timed("parse_python_file", lambda: [py_parser.parse_python_file(file_path) for file_path in file_paths])
+    timed("process_files_with_callback",
+          lambda: py_parser.process_files_with_callback(root_dir, noop_callback, verbose=0))
+    first_result = timed("stream_python_files_and_contents", lambda: consume_stream(root_dir))
+    return results, len(file_paths), metrics.to_dict(), first_result
+
+
+def consume_stream(root_dir):
+    """
+    完整消费 stream_python_files_and_contents，返回产出第一个结果所用的秒数。
+
+    :param root_dir: 合成目录树根目录
+    :return: 第一个结果的等待时间（秒），没有结果时为None
+    """
+    start = time.perf_counter()
+    first_result = None
+    for _ in py_parser.stream_python_files_and_contents(root_dir, verbose=0):
+        if first_result is None:
+            first_result = time.perf_counter() - start
+    return first_result
+
+
+def measure_peak_memory(root_dir):
+    """
+    在 tracemalloc 下再运行一次各阶段，统计每个阶段的Python对象分配峰值（字节）。
+
+    :param root_dir: 合成目录树根目录
+    :return: {阶段名称: 峰值字节数}
+    """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def traced(name, func):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            with suppress_output():
+                value = func()
+            peaks[name] = tracemalloc.get_traced_memory()[1] - base
+            return value
+
+        dependencies = traced("generate_dependency_graph",
+                              lambda: py_parser.generate_dependency_graph(root_dir, verbose=0))
+        traced("generate_dependency_graph_fast",
+               lambda: py_parser.generate_dependency_graph(root_dir, verbose=0, fast=True))
+        traced("topological_sort", lambda: py_parser.topological_sort(dependencies))
+        traced("topological_sort_with_cycles",
+               lambda: py_parser.topological_sort(dependencies, handle_cycles=True, verbose=0))
+        compact = traced("compact_graph_from_dependencies",
+                         lambda: py_parser.CompactGraph.from_dependencies(dependencies))
+        traced("topological_sort_compact", lambda: py_parser.topological_sort(compact))
+        traced("topological_sort_with_cycles_compact",
+               lambda: py_parser.topological_sort(compact, handle_cycles=True, verbose=0))
+        peaks["graph_bytes_dict"] = graph_size(lambda: {file: list(deps) for file, deps in dependencies.items()})
+        peaks["graph_bytes_compact"] = graph_size(lambda: py_parser.CompactGraph.from_dependencies(dependencies))
+        file_paths = list(dependencies)
+        traced("parse_python_file", lambda: [py_parser.parse_python_file(file_path) for file_path in file_paths])
+        traced("process_files_with_callback",
+               lambda: py_parser.process_files_with_callback(root_dir, noop_callback, verbose=0))
+        traced("stream_python_files_and_contents", lambda: consume_stream(root_dir))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def graph_size(build):
+    """
+    在 tracemalloc 下测量依赖图结构本身占用的内存（路径字符串与原图共享，不计入）。
+
+    :param build: 构建依赖图的函数
+    :return: 构建后仍被依赖图引用的字节数
+    """
+    base = tracemalloc.get_traced_memory()[0]
+    graph = build()
+    size = tracemalloc.get_traced_memory()[0] - base
+    del graph
+    return size
+
+
+def run_benchmark(module_count, fanout=5, cycle_ratio=0.01, symbols=5, seed=0, measure_memory=True, work_dir=None):
+    """
+    生成一个规模的合成目录树并运行全部阶段。
+
+    :param module_count: 模块数量
+    :param fanout: 每个模块导入的项目内模块数
+    :param cycle_ratio: 产生循环依赖的模块比例
+    :param symbols: 每个模块中生成的符号数量
+    :param seed: 随机种子
+    :param measure_memory: 是否统计峰值内存（需要额外运行一次）
+    :param work_dir: 生成目录树的位置，默认使用临时目录并在结束后删除
+    :return: 结果字典
+    """
+    root_dir = tempfile.mkdtemp(prefix=f"py_parser_bench_{module_count}_", dir=work_dir)
+    try:
+        start = time.perf_counter()
+        file_count = generate_synthetic_tree(root_dir, module_count, fanout, cycle_ratio, symbols, seed)
+        generate_seconds = time.perf_counter() - start
+
+        phases, graph_files, graph_metrics, first_result = run_phases(root_dir)
+        peaks = measure_peak_memory(root_dir) if measure_memory else {}
+
+        return {
+            "modules": module_count,
+            "files": file_count,
+            "graph_files": graph_files,
+            "fanout": fanout,
+            "cycle_ratio": cycle_ratio,
+            "symbols": symbols,
+            "seed": seed,
+            "generate_seconds": round(generate_seconds, 4),
+            "stream_first_result_seconds": round(first_result, 4) if first_result is not None else None,
+            "graph_bytes": {"dict": peaks.get("graph_bytes_dict"), "compact": peaks.get("graph_bytes_compact")},
+            "phases": [
+                {
+                    "phase": name,
+                    "seconds": round(seconds, 4),
+                    "files_per_second": round(file_count / seconds, 1) if seconds > 0 else None,
+                    "peak_memory_bytes": peaks.get(name),
+                }
+                for name, seconds in phases
+            ],
+            "graph_breakdown": {
+                "phases": graph_metrics["phases"],
+                "files_parsed": graph_metrics["files_parsed"],
+                "parse_failures": len(graph_metrics["failures"]),
+                "slowest_files": [
+                    {"file_path": os.path.relpath(item["file_path"], root_dir), "seconds": item["seconds"]}
+                    for item in graph_metrics["slowest_files"]
+                ],
+            },
+        }
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="py_parser 合成仓库基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000], help="模块数量，可指定多个，如 1000 10000 100000")
+    parser.add_argument("--fanout", type=int, default=5, help="每个模块导入的项目内模块数")
+    parser.add_argument("--cycle-ratio", type=float, default=0.01, help="产生循环依赖的模块比例")
+    parser.add_argument("--symbols", type=int, default=5, help="每个模块中生成的类、函数和全局变量数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存（可节省一半运行时间）")
+    parser.add_argument("--work-dir", default=None, help="生成合成目录树的位置，默认使用系统临时目录")
+    parser.add_argument("--output", default=None, help="结果JSON文件路径，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "results": [
+            run_benchmark(size, args.fanout, args.cycle_ratio, args.symbols, args.seed,
+                          measure_memory=not args.no_memory, work_dir=args.work_dir)
+            for size in args.sizes
+        ],
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"基准测试结果已写入 {args.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
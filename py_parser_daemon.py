@@ -0,0 +1,498 @@
+# /content/utils/py_parser_daemon.py
+"""
+简介：常驻的 py_parser 分析服务。在内存中保存目录的解析结果和依赖关系图（py_parser.ProjectState），
+通过 Unix 套接字回答符号、依赖和排序查询。每次回答前只对比文件的 mtime 和大小并重新解析有变化的文件，
+因此重复分析只需要查询本身的开销，不再重复导入模块、遍历目录和全量解析。仅支持提供 Unix 套接字的系统。
+
+使用方法：
+python py_parser_daemon.py serve /content/utils             # 前台启动服务，可同时预加载多个目录
+client = ensure_daemon(["/content/utils"])                   # 在 notebook 中：服务未运行时在后台启动
+client.find_symbol("/content/utils", "ParseCache")
+client.order("/content/utils")
+python py_parser_daemon.py query order /content/utils        # 命令行查询
+
+协议：每个请求和响应都是一行JSON。
+请求 {"command": 命令名, "args": {参数}}；响应 {"ok": true, "result": 结果} 或 {"ok": false, "error": 错误信息}
+"""
+
+import os  # 用于处理路径和删除套接字文件
+import sys  # 用于以子进程方式启动服务
+import json  # 用于编码请求和响应
+import stat  # 用于确认套接字路径上的文件是套接字
+import time  # 用于等待服务启动
+import socket  # 用于客户端连接
+import argparse  # 用于命令行参数
+import tempfile  # 用于默认套接字路径
+import threading  # 用于串行化对项目状态的访问和后台预加载目录
+import traceback  # 用于打印错误堆栈
+import subprocess  # 用于在后台启动服务
+import socketserver  # 用于Unix套接字服务
+
+from py_parser import ProjectState, topological_sort
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"py_parser_{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+
+
+class DaemonError(RuntimeError):
+    """服务返回错误或无法连接服务时抛出。"""
+
+
+class AnalysisService:
+    """
+    服务端的查询处理：按目录保存 ProjectState，每次查询前先 refresh() 该目录。
+    所有命令在同一把锁下执行，多个客户端并发请求时串行处理。
+    """
+
+    def __init__(self, workers=None):
+        """
+        :param workers: 首次加载目录时并行解析的进程数
+        """
+        self.workers = workers
+        self.states = {}  # {目录绝对路径: ProjectState}
+        self.lock = threading.Lock()
+        self.commands = {
+            "ping": self.ping,
+            "load": self.load,
+            "refresh": self.refresh,
+            "files": self.files,
+            "file_info": self.file_info,
+            "contents": self.contents,
+            "find_symbol": self.find_symbol,
+            "dependencies": self.dependencies,
+            "dependents": self.dependents,
+            "graph": self.graph,
+            "order": self.order,
+            "affected": self.affected,
+            "directories": self.directories,
+        }
+
+    def handle(self, command, args):
+        """
+        执行一个命令。
+
+        :param command: 命令名
+        :param args: 参数字典
+        :return: 可JSON序列化的结果
+        """
+        handler = self.commands.get(command)
+        if handler is None:
+            raise ValueError(f"未知命令: {command}")
+        if command == "ping":
+            return handler()  # 不等待锁：预加载大目录期间也能立即确认服务已启动
+        with self.lock:
+            return handler(**args)
+
+    def preload(self, directories):
+        """
+        依次加载目录，服务开始监听后在后台线程中调用。加载期间对这些目录的查询在锁上等待加载完成，
+        单个目录加载失败不影响其他目录。
+
+        :param directories: 目录路径列表
+        """
+        for directory in directories:
+            try:
+                self.handle("load", {"directory": directory})
+            except Exception as e:
+                print(f"预加载目录 {directory} 时发生错误: {e}")
+                traceback.print_exc()
+
+    def state(self, directory, refresh=True):
+        """
+        获取目录的 ProjectState，首次访问时全量加载，之后每次访问前增量刷新。
+
+        :param directory: 目录路径
+        :param refresh: 是否在返回前刷新有变化的文件
+        :return: (ProjectState, 本次刷新中有变化的文件集合)
+        """
+        directory = os.path.abspath(directory)
+        state = self.states.get(directory)
+        if state is None:
+            if not os.path.isdir(directory):
+                raise ValueError(f"指定的目录路径不存在: {directory}")
+            print(f"加载目录: {directory}")
+            state = self.states[directory] = ProjectState(directory, workers=self.workers)
+            return state, set()
+        changed = state.refresh() if refresh else set()
+        if changed:
+            print(f"刷新目录 {directory}: {len(changed)} 个文件有变化")
+        return state, changed
+
+    # ---------- 命令 ----------
+
+    def ping(self):
+        return "pong"
+
+    def load(self, directory):
+        state, _ = self.state(directory, refresh=False)
+        return len(state.stats)
+
+    def refresh(self, directory):
+        _, changed = self.state(directory)
+        return sorted(changed)
+
+    def directories(self):
+        return sorted(self.states)
+
+    def files(self, directory):
+        state, _ = self.state(directory)
+        return sorted(state.stats)
+
+    def file_info(self, directory, file_path):
+        state, _ = self.state(directory)
+        analysis = state.analyses.get(file_path)
+        return analysis["file_info"] if analysis is not None else None
+
+    def contents(self, directory):
+        """与 list_python_files_and_contents 的结果相同：按依赖顺序排列的文件解析结果。"""
+        state, _ = self.state(directory)
+        return [state.analyses[file]["file_info"] for file in self.sorted_files(state) if file in state.analyses]
+
+    def find_symbol(self, directory, name):
+        """在类、方法、字段、函数和全局变量中查找同名符号。"""
+        state, _ = self.state(directory)
+        matches = []
+        for file_path, analysis in state.analyses.items():
+            file_info = analysis["file_info"]
+            for class_info in file_info["classes"]:
+                qualname = class_info.get("qualname", class_info["class_name"])
+                if class_info["class_name"] == name:
+                    matches.append({"kind": "class", "file_path": file_path, "qualname": qualname,
+                                    "docstring": class_info["docstring"]})
+                for method_info in class_info["methods"]:
+                    if method_info["method_name"] == name:
+                        matches.append({"kind": "method", "file_path": file_path, "qualname": f"{qualname}.{name}",
+                                        "docstring": method_info["docstring"]})
+                for field_info in class_info["fields"]:
+                    if field_info["field_name"] == name:
+                        matches.append({"kind": "field", "file_path": file_path, "qualname": f"{qualname}.{name}",
+                                        "docstring": field_info["docstring"]})
+            for function_info in file_info["functions"]:
+                if function_info["function_name"] == name:
+                    matches.append({"kind": "function", "file_path": file_path, "qualname": name,
+                                    "docstring": function_info["docstring"]})
+            for var_info in file_info["global_vars"]:
+                if var_info["global_var_name"] == name:
+                    matches.append({"kind": "global", "file_path": file_path, "qualname": name,
+                                    "docstring": var_info["docstring"]})
+        return sorted(matches, key=lambda match: (match["file_path"], match["kind"], match["qualname"]))
+
+    def dependencies(self, directory, file_path, transitive=False):
+        state, _ = self.state(directory)
+        return sorted(state.graph.dependencies(file_path, transitive=transitive))
+
+    def dependents(self, directory, file_path, transitive=True):
+        state, _ = self.state(directory)
+        return sorted(state.graph.dependents(file_path, transitive=transitive))
+
+    def graph(self, directory):
+        state, _ = self.state(directory)
+        return state.graph.to_dict()
+
+    def order(self, directory, files=None):
+        """
+        files 为None时返回与 list_python_files_and_contents 相同的全目录顺序，
+        否则只对给定文件排序（依赖项在前，见 ProjectState.order）。
+        """
+        state, _ = self.state(directory)
+        if files is None:
+            return self.sorted_files(state)
+        return state.order(set(files) & set(state.graph.forward))
+
+    def affected(self, directory, files):
+        """返回给定文件及其所有传递依赖方，依赖项在前。"""
+        state, _ = self.state(directory)
+        return state.order(state.affected(files))
+
+    @staticmethod
+    def sorted_files(state):
+        return topological_sort(state.dependencies, handle_cycles=True, verbose=0)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """逐行读取JSON请求并逐行返回JSON响应，一个连接中可以发送多个请求。"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                command = request.get("command")
+                if command == "shutdown":
+                    self.respond({"ok": True, "result": None})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                result = self.server.service.handle(command, request.get("args") or {})
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                traceback.print_exc()
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.respond(response)
+
+    def respond(self, response):
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix 套接字服务，每个连接一个线程，查询由 AnalysisService 串行执行。"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.service = service
+        super().__init__(socket_path, DaemonRequestHandler)
+
+
+def remove_stale_socket(socket_path):
+    """
+    删除上次未正常退出留下的套接字文件。路径上有正在监听的服务或者不是套接字时拒绝删除。
+
+    :param socket_path: Unix 套接字路径
+    :raises DaemonError: 路径上已有服务在监听，或路径上的文件不是套接字时
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise DaemonError(f"路径已存在且不是套接字，拒绝覆盖: {socket_path}")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)  # 无人监听的旧套接字
+            return
+    raise DaemonError(f"已有服务在监听该套接字: {socket_path}")
+
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, directories=(), workers=None):
+    """
+    在前台运行服务，直到收到 shutdown 命令或 Ctrl+C。
+
+    :param socket_path: Unix 套接字路径，上次未正常退出留下的套接字文件会被替换
+    :param directories: 启动后在后台线程中预加载的目录，加载期间服务已可以响应 ping
+    :param workers: 首次加载目录时并行解析的进程数
+    :raises DaemonError: 路径上已有服务在监听，或路径上是普通文件等非套接字文件时
+    """
+    remove_stale_socket(socket_path)
+    service = AnalysisService(workers=workers)
+    old_umask = os.umask(0o177)  # 创建时即只允许当前用户连接，不留下 chmod 之前的窗口
+    try:
+        server = DaemonServer(socket_path, service)
+    finally:
+        os.umask(old_umask)
+    print(f"py_parser 分析服务已启动: {socket_path}")
+    if directories:
+        threading.Thread(target=service.preload, args=(list(directories),), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("py_parser 分析服务已停止")
+
+
+class DaemonClient:
+    """
+    分析服务的客户端。每个请求单独建立连接；文件和目录路径在客户端转换为绝对路径后再发送。
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=None):
+        """
+        :param socket_path: Unix 套接字路径
+        :param timeout: 等待响应的超时时间（秒），为None时一直等待（首次加载大目录可能较慢）
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, command, **args):
+        """
+        发送一个请求并返回结果。
+
+        :param command: 命令名
+        :param args: 命令参数
+        :return: 命令结果
+        :raises DaemonError: 无法连接服务或服务返回错误时
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps({"command": command, "args": args}, ensure_ascii=False).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise DaemonError(f"无法连接分析服务 {self.socket_path}: {e}") from e
+        if not line:
+            raise DaemonError("分析服务未返回响应")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error"))
+        return response.get("result")
+
+    def ping(self):
+        return self.request("ping") == "pong"
+
+    def load(self, directory):
+        return self.request("load", directory=os.path.abspath(directory))
+
+    def refresh(self, directory):
+        return self.request("refresh", directory=os.path.abspath(directory))
+
+    def files(self, directory):
+        return self.request("files", directory=os.path.abspath(directory))
+
+    def file_info(self, directory, file_path):
+        return self.request("file_info", directory=os.path.abspath(directory), file_path=os.path.abspath(file_path))
+
+    def contents(self, directory):
+        return self.request("contents", directory=os.path.abspath(directory))
+
+    def find_symbol(self, directory, name):
+        return self.request("find_symbol", directory=os.path.abspath(directory), name=name)
+
+    def dependencies(self, directory, file_path, transitive=False):
+        return self.request("dependencies", directory=os.path.abspath(directory),
+                            file_path=os.path.abspath(file_path), transitive=transitive)
+
+    def dependents(self, directory, file_path, transitive=True):
+        return self.request("dependents", directory=os.path.abspath(directory),
+                            file_path=os.path.abspath(file_path), transitive=transitive)
+
+    def graph(self, directory):
+        return self.request("graph", directory=os.path.abspath(directory))
+
+    def order(self, directory, files=None):
+        if files is not None:
+            files = [os.path.abspath(file) for file in files]
+        return self.request("order", directory=os.path.abspath(directory), files=files)
+
+    def affected(self, directory, files):
+        return self.request("affected", directory=os.path.abspath(directory),
+                            files=[os.path.abspath(file) for file in files])
+
+    def directories(self):
+        return self.request("directories")
+
+    def shutdown(self):
+        return self.request("shutdown")
+
+
+def start_daemon(directories=(), socket_path=DEFAULT_SOCKET_PATH, workers=None, log_file=None, wait=30.0):
+    """
+    在后台子进程中启动分析服务，并等待服务可以响应。
+
+    :param directories: 启动后在后台预加载的目录，不需要等待加载完成
+    :param socket_path: Unix 套接字路径
+    :param workers: 首次加载目录时并行解析的进程数
+    :param log_file: 服务输出写入的文件，为None时丢弃
+    :param wait: 等待服务启动的最长时间（秒）
+    :return: DaemonClient 对象
+    """
+    command = [sys.executable, os.path.abspath(__file__), "serve", "--socket", socket_path]
+    if workers:
+        command += ["--workers", str(workers)]
+    command += [os.path.abspath(directory) for directory in directories]
+    output = open(log_file, "ab") if log_file else subprocess.DEVNULL
+    try:
+        subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                         start_new_session=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        if log_file:
+            output.close()
+
+    client = DaemonClient(socket_path)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            if client.ping():
+                return client
+        except DaemonError:
+            time.sleep(0.05)
+    raise DaemonError(f"分析服务在 {wait} 秒内未启动: {socket_path}")
+
+
+def ensure_daemon(directories=(), socket_path=DEFAULT_SOCKET_PATH, workers=None, log_file=None, wait=30.0):
+    """
+    返回已运行服务的客户端，服务未运行时在后台启动。
+
+    :param directories: 服务未运行时启动时预加载的目录
+    :param socket_path: Unix 套接字路径
+    :param workers: 首次加载目录时并行解析的进程数
+    :param log_file: 服务输出写入的文件
+    :param wait: 等待服务启动的最长时间（秒）
+    :return: DaemonClient 对象
+    """
+    client = DaemonClient(socket_path)
+    try:
+        if client.ping():
+            return client
+    except DaemonError:
+        pass
+    return start_daemon(directories, socket_path, workers, log_file, wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="py_parser 常驻分析服务")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="在前台运行服务")
+    serve_parser.add_argument("directories", nargs="*", help="启动时预加载的目录")
+    serve_parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix 套接字路径")
+    serve_parser.add_argument("--workers", type=int, default=None, help="首次加载目录时并行解析的进程数")
+
+    query_parser = subparsers.add_parser("query", help="向运行中的服务发送查询并输出JSON结果")
+    query_parser.add_argument("command", help="命令名，如 files、find_symbol、dependencies、order、shutdown")
+    query_parser.add_argument("directory", nargs="?", help="目录路径")
+    query_parser.add_argument("target", nargs="?", help="文件路径或符号名")
+    query_parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix 套接字路径")
+    args = parser.parse_args(argv)
+
+    if args.action == "serve":
+        try:
+            serve(args.socket, args.directories, args.workers)
+        except DaemonError as e:
+            print(f"无法启动分析服务: {e}")
+        return None
+
+    client = DaemonClient(args.socket)
+    request_args = {}
+    if args.directory:
+        request_args["directory"] = os.path.abspath(args.directory)
+    if args.target:
+        if args.command == "find_symbol":
+            request_args["name"] = args.target
+        elif args.command in ("order", "affected"):
+            request_args["files"] = [os.path.abspath(args.target)]
+        else:
+            request_args["file_path"] = os.path.abspath(args.target)
+    try:
+        result = client.request(args.command, **request_args)
+    except DaemonError as e:
+        print(f"查询失败: {e}")
+        return None
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+def run_daemon_example(directory_path):
+    """
+    运行分析服务示例：确保服务运行，查询符号、依赖和排序。
+    """
+    print("\n=== 运行分析服务示例 ===")
+    client = ensure_daemon([directory_path])
+    print(f"文件数: {len(client.files(directory_path))}")
+    for match in client.find_symbol(directory_path, "ParseCache"):
+        print(f"{match['kind']}: {match['qualname']} ({match['file_path']})")
+    print(f"依赖顺序前10个文件: {client.order(directory_path)[:10]}")
+
+
+if __name__ == "__main__":
+    # 运行分析服务示例
+    # run_daemon_example("/content/utils")
+
+    main()
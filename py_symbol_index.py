@@ -0,0 +1,562 @@
+# /content/utils/py_symbol_index.py
+"""
+简介：基于 SQLite 的跨仓库符号索引。把 py_parser 的解析结果（文件、类、方法、字段、函数、全局变量）和
+项目内导入关系写入本地数据库，按名称建立索引，之后"类 X 定义在哪里""哪些模块定义了全局变量 Y"
+之类的查询直接走索引，不必重新解析整个目录。
+
+使用方法：
+index = SymbolIndex("/content/symbols.db")
+index.update("/content/utils")          # 首次全量建立，之后只重新解析内容有变化的文件
+index.find_class("ParseCache")          # [{"file_path": ..., "class_name": ..., "qualname": ..., "docstring": ...}]
+index.find_global("PARSE_CACHE_VERSION")
+index.dependents("/content/utils/py_parser.py")
+
+工作流：
+1. 遍历目录，按 mtime + 文件大小 + 内容哈希判断文件是否变化
+2. 只重新解析有变化的文件，在一个事务中替换该文件的全部符号
+3. 删除目录下已不存在的文件
+4. 模块集合变化时根据已保存的导入语句重新解析导入关系，无需重新读取文件
+"""
+
+import os  # 用于遍历文件和处理路径
+import json  # 用于保存导入的名称列表
+import sqlite3  # 用于持久化符号索引
+import traceback  # 用于打印错误堆栈
+
+from py_parser import ModuleIndex, ParseMetrics, file_digest, iter_file_analyses, iter_python_files
+
+SYMBOL_INDEX_VERSION = 1  # 数据库结构版本，结构变化时递增以重建数据库
+# 本模块创建的表，结构版本变化时只删除这些表
+SYMBOL_INDEX_TABLES = ("files", "classes", "methods", "fields", "functions", "globals", "imports", "import_edges")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    root TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    docstring TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS methods (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS fields (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS globals (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS imports (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    module TEXT,
+    names TEXT NOT NULL,
+    level INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS import_edges (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    target_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    PRIMARY KEY (file_id, target_id)
+);
+CREATE INDEX IF NOT EXISTS idx_files_root ON files(root);
+CREATE INDEX IF NOT EXISTS idx_classes_name ON classes(name);
+CREATE INDEX IF NOT EXISTS idx_classes_file ON classes(file_id);
+CREATE INDEX IF NOT EXISTS idx_methods_name ON methods(name);
+CREATE INDEX IF NOT EXISTS idx_methods_file ON methods(file_id);
+CREATE INDEX IF NOT EXISTS idx_fields_name ON fields(name);
+CREATE INDEX IF NOT EXISTS idx_fields_file ON fields(file_id);
+CREATE INDEX IF NOT EXISTS idx_functions_name ON functions(name);
+CREATE INDEX IF NOT EXISTS idx_functions_file ON functions(file_id);
+CREATE INDEX IF NOT EXISTS idx_globals_name ON globals(name);
+CREATE INDEX IF NOT EXISTS idx_globals_file ON globals(file_id);
+CREATE INDEX IF NOT EXISTS idx_imports_file ON imports(file_id);
+CREATE INDEX IF NOT EXISTS idx_import_edges_target ON import_edges(target_id);
+"""
+
+
+class SymbolIndex:
+    """
+    SQLite 符号索引。同一个数据库可以索引多个目录（仓库），每个文件记录所属的根目录，
+    update(directory_path) 只更新和清理该目录下的文件。
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: 数据库文件路径，使用 ":memory:" 时只保存在内存中
+        :raises ValueError: 数据库不是符号索引数据库（结构版本不一致且包含其他表）时
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            self.create_schema()
+        except Exception:
+            self.connection.close()
+            raise
+        self.connection.execute("PRAGMA journal_mode = WAL")
+
+    def create_schema(self):
+        """
+        创建表和索引，数据库结构版本不一致时删除本模块的旧表重建。
+        结构版本不一致且数据库中有其他表时（如指向了其他应用的数据库）拒绝修改数据库。
+        """
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SYMBOL_INDEX_VERSION:
+            foreign_tables = [row[0] for row in self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+                if row[0] not in SYMBOL_INDEX_TABLES]
+            if foreign_tables:
+                raise ValueError(f"数据库 {self.db_path} 不是符号索引数据库，包含其他表: {', '.join(sorted(foreign_tables))}")
+        with self.connection:
+            if version != SYMBOL_INDEX_VERSION:
+                self.connection.execute("PRAGMA foreign_keys = OFF")
+                for table in SYMBOL_INDEX_TABLES:
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute("PRAGMA foreign_keys = ON")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SYMBOL_INDEX_VERSION}")
+
+    def close(self):
+        """关闭数据库连接。"""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    # ---------- 增量更新 ----------
+
+    def update(self, directory_path, workers=None, verbose=1):
+        """
+        增量更新目录的索引：mtime 和大小都未变化的文件直接跳过；有变化但内容哈希相同的文件只更新文件状态；
+        其余文件重新解析并替换全部符号；解析失败的文件保留文件记录但不含任何符号和导入，
+        直到文件内容再次变化。目录下已删除的文件从索引中移除。
+
+        :param directory_path: 目录路径
+        :param workers: 并行解析的进程数，为None或1时在当前进程中逐个解析
+        :param verbose: 输出详细级别，0 静默，1 汇总，2 逐文件输出
+        :return: 统计字典 {"parsed": 重新解析的文件数, "unchanged": 未变化的文件数, "removed": 删除的文件数, "failed": 解析失败的文件数}
+        """
+        root = os.path.abspath(directory_path)
+        metrics = ParseMetrics(verbose)
+        stats = {"parsed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        try:
+            known = {row["path"]: row for row in self.connection.execute(
+                "SELECT id, path, mtime_ns, size, hash FROM files WHERE root = ?", (root,))}
+
+            # 1. 找出有变化的文件
+            with metrics.phase("检查文件变化"):
+                current = {}
+                changed = []
+                restat = []
+                for file_path in iter_python_files(root):
+                    try:
+                        stat = os.stat(file_path)
+                        row = known.get(file_path)
+                        if row is not None and row["mtime_ns"] == stat.st_mtime_ns and row["size"] == stat.st_size:
+                            current[file_path] = (stat.st_mtime_ns, stat.st_size)
+                            stats["unchanged"] += 1
+                            continue
+                        digest = file_digest(file_path)
+                    except OSError as e:
+                        # 遍历之后被删除或无法读取的文件按已删除处理
+                        metrics.log(f"无法读取文件，按已删除处理: {file_path}: {e}")
+                        continue
+                    current[file_path] = (stat.st_mtime_ns, stat.st_size)
+                    if row is not None and row["hash"] == digest:
+                        restat.append((stat.st_mtime_ns, stat.st_size, row["id"]))
+                        stats["unchanged"] += 1
+                        continue
+                    changed.append((file_path, digest))
+
+            removed = [path for path in known if path not in current]
+            added = [file_path for file_path, _ in changed if file_path not in known]
+
+            # 2. 重新解析有变化的文件，在一个事务中写入
+            with metrics.phase("解析并写入"), self.connection:
+                self.connection.executemany("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", restat)
+                self.connection.executemany("DELETE FROM files WHERE id = ?", [(known[path]["id"],) for path in removed])
+                stats["removed"] = len(removed)
+
+                digests = dict(changed)
+                changed_ids = []
+                for file_path, analysis, error in iter_file_analyses(list(digests), workers=workers, metrics=metrics):
+                    if analysis is None:
+                        # 清空该文件原有的符号和导入，同时保存新的文件状态，内容不变时下次更新不再重新解析
+                        analysis = {"imports": [], "file_info": {
+                            "file_name": os.path.basename(file_path), "script_docstring": None,
+                            "classes": [], "functions": [], "global_vars": []}}
+                        stats["failed"] += 1
+                    else:
+                        stats["parsed"] += 1
+                    mtime_ns, size = current[file_path]
+                    changed_ids.append(self.store_file(root, file_path, mtime_ns, size, digests[file_path], analysis))
+
+                # 3. 模块集合变化时所有文件的导入都可能解析到不同的文件，否则只需更新重新解析的文件
+                with metrics.phase("解析导入关系"):
+                    module_index = ModuleIndex(root, list(current))
+                    if added or removed:
+                        changed_ids = [row[0] for row in self.connection.execute(
+                            "SELECT id FROM files WHERE root = ?", (root,))]
+                    self.resolve_import_edges(module_index, changed_ids)
+
+            if verbose >= 1:
+                print(f"符号索引已更新: 重新解析 {stats['parsed']} 个文件，未变化 {stats['unchanged']} 个，"
+                      f"删除 {stats['removed']} 个，解析失败 {stats['failed']} 个")
+                if verbose >= 2:
+                    print(metrics.summary())
+            return stats
+
+        except Exception as e:
+            print(f"更新符号索引时发生错误: {e}")
+            traceback.print_exc()
+            return stats
+
+    def store_file(self, root, file_path, mtime_ns, size, digest, analysis):
+        """
+        写入一个文件的解析结果，替换该文件原有的全部符号和导入。需要在事务中调用。
+
+        :param root: 文件所属的根目录
+        :param file_path: 文件路径
+        :param mtime_ns: 文件修改时间（纳秒）
+        :param size: 文件大小
+        :param digest: 文件内容哈希
+        :param analysis: py_parser.analyze_python_file 的结果
+        :return: 文件id
+        """
+        file_info = analysis["file_info"]
+        execute = self.connection.execute
+        row = execute("SELECT id FROM files WHERE path = ?", (file_path,)).fetchone()
+        if row is None:
+            file_id = execute(
+                "INSERT INTO files (path, root, file_name, docstring, mtime_ns, size, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, root, file_info["file_name"], file_info["script_docstring"], mtime_ns, size, digest),
+            ).lastrowid
+        else:
+            # 保留文件id，其他文件指向该文件的导入关系不受影响；删除类会级联删除其方法和字段
+            file_id = row[0]
+            execute("UPDATE files SET root = ?, file_name = ?, docstring = ?, mtime_ns = ?, size = ?, hash = ? WHERE id = ?",
+                    (root, file_info["file_name"], file_info["script_docstring"], mtime_ns, size, digest, file_id))
+            for table in ("classes", "functions", "globals", "imports"):
+                execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+
+        for class_info in file_info["classes"]:
+            class_id = execute(
+                "INSERT INTO classes (file_id, name, qualname, docstring) VALUES (?, ?, ?, ?)",
+                (file_id, class_info["class_name"], class_info.get("qualname", class_info["class_name"]),
+                 class_info["docstring"]),
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO methods (file_id, class_id, name, docstring) VALUES (?, ?, ?, ?)",
+                [(file_id, class_id, method["method_name"], method["docstring"]) for method in class_info["methods"]])
+            self.connection.executemany(
+                "INSERT INTO fields (file_id, class_id, name, docstring) VALUES (?, ?, ?, ?)",
+                [(file_id, class_id, field["field_name"], field["docstring"]) for field in class_info["fields"]])
+
+        self.connection.executemany(
+            "INSERT INTO functions (file_id, name, docstring) VALUES (?, ?, ?)",
+            [(file_id, function["function_name"], function["docstring"]) for function in file_info["functions"]])
+        self.connection.executemany(
+            "INSERT INTO globals (file_id, name, docstring) VALUES (?, ?, ?)",
+            [(file_id, var["global_var_name"], var["docstring"]) for var in file_info["global_vars"]])
+        self.connection.executemany(
+            "INSERT INTO imports (file_id, module, names, level) VALUES (?, ?, ?, ?)",
+            [(file_id, module, json.dumps(list(names)), level) for module, names, level in analysis["imports"]])
+        return file_id
+
+    def resolve_import_edges(self, module_index, file_ids):
+        """
+        根据已保存的导入语句重新计算文件的项目内导入关系，不重新读取文件。需要在事务中调用。
+
+        :param module_index: 文件所属目录的 ModuleIndex
+        :param file_ids: 需要重新计算的文件id列表
+        """
+        if not file_ids:
+            return
+        path_ids = {row[1]: row[0] for row in self.connection.execute(
+            "SELECT id, path FROM files WHERE root = ?", (module_index.directory_path,))}
+        imports = {}
+        for file_id, module, names, level in self.connection.execute(
+                "SELECT file_id, module, names, level FROM imports WHERE file_id IN "
+                "(SELECT id FROM files WHERE root = ?)", (module_index.directory_path,)):
+            imports.setdefault(file_id, []).append((module, tuple(json.loads(names)), level))
+
+        id_paths = {file_id: path for path, file_id in path_ids.items()}
+        edges = []
+        for file_id in file_ids:
+            file_path = id_paths.get(file_id)
+            if file_path is None:
+                continue
+            for target in module_index.resolve_imports(imports.get(file_id, ()), file_path):
+                if target in path_ids:
+                    edges.append((file_id, path_ids[target]))
+
+        self.connection.executemany("DELETE FROM import_edges WHERE file_id = ?", [(file_id,) for file_id in file_ids])
+        self.connection.executemany("INSERT OR IGNORE INTO import_edges (file_id, target_id) VALUES (?, ?)", edges)
+
+    # ---------- 查询 ----------
+
+    def query(self, sql, params=()):
+        """执行查询，返回字典列表。"""
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def find_class(self, name, like=False):
+        """
+        查找类定义。
+
+        :param name: 类名；like=True 时为 SQL LIKE 模式，如 "Parse%"
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"file_path", "class_name", "qualname", "docstring"}]
+        """
+        return self.query(
+            f"SELECT files.path AS file_path, classes.name AS class_name, classes.qualname, classes.docstring "
+            f"FROM classes JOIN files ON files.id = classes.file_id WHERE classes.name {'LIKE' if like else '='} ? "
+            f"ORDER BY files.path, classes.id", (name,))
+
+    def find_function(self, name, like=False):
+        """
+        查找顶级函数定义。
+
+        :param name: 函数名；like=True 时为 SQL LIKE 模式
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"file_path", "function_name", "docstring"}]
+        """
+        return self.query(
+            f"SELECT files.path AS file_path, functions.name AS function_name, functions.docstring "
+            f"FROM functions JOIN files ON files.id = functions.file_id WHERE functions.name {'LIKE' if like else '='} ? "
+            f"ORDER BY files.path, functions.id", (name,))
+
+    def find_method(self, name, class_name=None, like=False):
+        """
+        查找类中的方法定义。
+
+        :param name: 方法名；like=True 时为 SQL LIKE 模式
+        :param class_name: 可选，只查找该类中的方法
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"file_path", "class_name", "qualname", "method_name", "docstring"}]
+        """
+        sql = (f"SELECT files.path AS file_path, classes.name AS class_name, classes.qualname, "
+               f"methods.name AS method_name, methods.docstring "
+               f"FROM methods JOIN classes ON classes.id = methods.class_id JOIN files ON files.id = methods.file_id "
+               f"WHERE methods.name {'LIKE' if like else '='} ?")
+        params = [name]
+        if class_name is not None:
+            sql += " AND classes.name = ?"
+            params.append(class_name)
+        return self.query(sql + " ORDER BY files.path, methods.id", params)
+
+    def find_field(self, name, class_name=None, like=False):
+        """
+        查找类中的公开字段。
+
+        :param name: 字段名；like=True 时为 SQL LIKE 模式
+        :param class_name: 可选，只查找该类中的字段
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"file_path", "class_name", "qualname", "field_name", "docstring"}]
+        """
+        sql = (f"SELECT files.path AS file_path, classes.name AS class_name, classes.qualname, "
+               f"fields.name AS field_name, fields.docstring "
+               f"FROM fields JOIN classes ON classes.id = fields.class_id JOIN files ON files.id = fields.file_id "
+               f"WHERE fields.name {'LIKE' if like else '='} ?")
+        params = [name]
+        if class_name is not None:
+            sql += " AND classes.name = ?"
+            params.append(class_name)
+        return self.query(sql + " ORDER BY files.path, fields.id", params)
+
+    def find_global(self, name, like=False):
+        """
+        查找定义了指定全局变量的模块。
+
+        :param name: 全局变量名；like=True 时为 SQL LIKE 模式
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"file_path", "global_var_name", "docstring"}]
+        """
+        return self.query(
+            f"SELECT files.path AS file_path, globals.name AS global_var_name, globals.docstring "
+            f"FROM globals JOIN files ON files.id = globals.file_id WHERE globals.name {'LIKE' if like else '='} ? "
+            f"ORDER BY files.path, globals.id", (name,))
+
+    def find_symbol(self, name, like=False):
+        """
+        在类、函数、方法、字段和全局变量中查找同名符号。
+
+        :param name: 符号名；like=True 时为 SQL LIKE 模式
+        :param like: 是否按 LIKE 模式匹配
+        :return: [{"kind", "file_path", "name", "qualname", "docstring"}]，qualname 对方法和字段为 类名.成员名
+        """
+        operator = "LIKE" if like else "="
+        return self.query(
+            f"SELECT 'class' AS kind, files.path AS file_path, classes.name AS name, classes.qualname AS qualname, "
+            f"classes.docstring AS docstring FROM classes JOIN files ON files.id = classes.file_id "
+            f"WHERE classes.name {operator} :name "
+            f"UNION ALL SELECT 'function', files.path, functions.name, functions.name, functions.docstring "
+            f"FROM functions JOIN files ON files.id = functions.file_id WHERE functions.name {operator} :name "
+            f"UNION ALL SELECT 'method', files.path, methods.name, classes.qualname || '.' || methods.name, "
+            f"methods.docstring FROM methods JOIN classes ON classes.id = methods.class_id "
+            f"JOIN files ON files.id = methods.file_id WHERE methods.name {operator} :name "
+            f"UNION ALL SELECT 'field', files.path, fields.name, classes.qualname || '.' || fields.name, "
+            f"fields.docstring FROM fields JOIN classes ON classes.id = fields.class_id "
+            f"JOIN files ON files.id = fields.file_id WHERE fields.name {operator} :name "
+            f"UNION ALL SELECT 'global', files.path, globals.name, globals.name, globals.docstring "
+            f"FROM globals JOIN files ON files.id = globals.file_id WHERE globals.name {operator} :name",
+            {"name": name})
+
+    def file_symbols(self, file_path):
+        """
+        返回文件的全部符号，格式与 py_parser.parse_python_file 的结果相同。
+
+        :param file_path: 文件路径
+        :return: 文件信息字典，文件未被索引时返回None
+        """
+        row = self.connection.execute(
+            "SELECT id, file_name, docstring FROM files WHERE path = ?", (os.path.abspath(file_path),)).fetchone()
+        if row is None:
+            return None
+        file_id = row["id"]
+        classes = []
+        for class_row in self.connection.execute(
+                "SELECT id, name, qualname, docstring FROM classes WHERE file_id = ? ORDER BY id", (file_id,)).fetchall():
+            classes.append({
+                "class_name": class_row["name"],
+                "qualname": class_row["qualname"],
+                "docstring": class_row["docstring"],
+                "fields": [{"field_name": name, "docstring": docstring} for name, docstring in self.connection.execute(
+                    "SELECT name, docstring FROM fields WHERE class_id = ? ORDER BY id", (class_row["id"],))],
+                "methods": [{"method_name": name, "docstring": docstring} for name, docstring in self.connection.execute(
+                    "SELECT name, docstring FROM methods WHERE class_id = ? ORDER BY id", (class_row["id"],))],
+            })
+        return {
+            "file_name": row["file_name"],
+            "script_docstring": row["docstring"],
+            "global_vars": [{"global_var_name": name, "docstring": docstring} for name, docstring in self.connection.execute(
+                "SELECT name, docstring FROM globals WHERE file_id = ? ORDER BY id", (file_id,))],
+            "classes": classes,
+            "functions": [{"function_name": name, "docstring": docstring} for name, docstring in self.connection.execute(
+                "SELECT name, docstring FROM functions WHERE file_id = ? ORDER BY id", (file_id,))],
+        }
+
+    def dependencies(self, file_path):
+        """
+        返回文件直接导入的项目内文件。
+
+        :param file_path: 文件路径
+        :return: 文件路径列表
+        """
+        return [row[0] for row in self.connection.execute(
+            "SELECT target.path FROM import_edges JOIN files AS source ON source.id = import_edges.file_id "
+            "JOIN files AS target ON target.id = import_edges.target_id WHERE source.path = ? ORDER BY target.path",
+            (os.path.abspath(file_path),))]
+
+    def dependents(self, file_path):
+        """
+        返回直接导入了该文件的项目内文件。
+
+        :param file_path: 文件路径
+        :return: 文件路径列表
+        """
+        return [row[0] for row in self.connection.execute(
+            "SELECT source.path FROM import_edges JOIN files AS target ON target.id = import_edges.target_id "
+            "JOIN files AS source ON source.id = import_edges.file_id WHERE target.path = ? ORDER BY source.path",
+            (os.path.abspath(file_path),))]
+
+    def dependency_graph(self, directory_path):
+        """
+        从索引中读取目录的文件依赖关系图，格式与 py_parser.generate_dependency_graph 相同。
+
+        :param directory_path: 目录路径
+        :return: {文件路径: [依赖文件路径]}
+        """
+        root = os.path.abspath(directory_path)
+        dependencies = {row[0]: [] for row in self.connection.execute(
+            "SELECT path FROM files WHERE root = ? ORDER BY id", (root,))}
+        for source, target in self.connection.execute(
+                "SELECT source.path, target.path FROM import_edges "
+                "JOIN files AS source ON source.id = import_edges.file_id "
+                "JOIN files AS target ON target.id = import_edges.target_id WHERE source.root = ?", (root,)):
+            dependencies[source].append(target)
+        return dependencies
+
+    def remove_root(self, directory_path):
+        """
+        从索引中删除一个目录（仓库）的全部文件和符号。
+
+        :param directory_path: 目录路径
+        :return: 删除的文件数
+        """
+        with self.connection:
+            return self.connection.execute(
+                "DELETE FROM files WHERE root = ?", (os.path.abspath(directory_path),)).rowcount
+
+    def roots(self):
+        """返回索引中的全部根目录及其文件数。"""
+        return self.query("SELECT root, COUNT(*) AS file_count FROM files GROUP BY root ORDER BY root")
+
+
+def build_symbol_index(directory_paths, db_path, workers=None, verbose=1):
+    """
+    建立或增量更新一个或多个目录的符号索引。
+
+    :param directory_paths: 目录路径或目录路径列表
+    :param db_path: 数据库文件路径
+    :param workers: 并行解析的进程数
+    :param verbose: 输出详细级别
+    :return: SymbolIndex 对象，用完后应调用 close()
+    """
+    if isinstance(directory_paths, str):
+        directory_paths = [directory_paths]
+    index = SymbolIndex(db_path)
+    for directory_path in directory_paths:
+        index.update(directory_path, workers=workers, verbose=verbose)
+    return index
+
+
+def run_symbol_index_example(directory_path, db_path):
+    """
+    运行符号索引示例：建立索引并查询类、全局变量和依赖关系。
+    """
+    print("\n=== 运行符号索引示例 ===")
+    with build_symbol_index(directory_path, db_path) as index:
+        for item in index.find_class("ParseCache"):
+            print(f"类 {item['qualname']} 定义在 {item['file_path']}")
+        for item in index.find_global("PARSE_CACHE_VERSION"):
+            print(f"全局变量 {item['global_var_name']} 定义在 {item['file_path']}")
+        for item in index.find_symbol("%index%", like=True)[:10]:
+            print(f"{item['kind']}: {item['qualname']} ({item['file_path']})")
+
+
+if __name__ == "__main__":
+    directory_path = "/content/utils"  # 指定目录路径
+    db_path = "/content/symbols.db"  # 符号索引数据库路径
+
+    # 运行符号索引示例
+    # run_symbol_index_example(directory_path, db_path)
@@ -0,0 +1,23 @@
+# /content/utils/tests/conftest.py
+"""测试共用的夹具：把仓库根目录加入导入路径，并提供生成临时Python目录树的函数。"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """
+    返回一个函数，按 {相对路径: 文件内容} 在临时目录中写入文件，并返回目录路径字符串。
+    """
+    def make(files):
+        for relative_path, content in files.items():
+            file_path = tmp_path / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content, encoding="utf-8")
+        return str(tmp_path)
+    return make
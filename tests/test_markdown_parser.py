@@ -0,0 +1,49 @@
+# /content/utils/tests/test_markdown_parser.py
+"""markdown_parser 的回归测试。"""
+
+import pytest
+
+pytest.importorskip("markdown_it")
+
+import markdown_parser
+
+
+HTML_BLOCKS = [
+    "<!--\n注释\n\n# 注释中的标题\n-->",
+    "<pre>\n代码\n\n# 不是标题\n</pre>",
+    "<script>\nx = 1\n\n# 不是标题\n</script>",
+    "<STYLE>\n\n# a { color: red }\n</STYLE>",
+    "<?php\n\n# 不是标题\n?>",
+    "<!DOCTYPE html\n\n# 不是标题\n>",
+    "<![CDATA[\n\n# 不是标题\n]]>",
+    "<!-- 单行注释 -->\n\n# 是标题",
+    "<div>\n\n# 空行结束了类型6的 HTML 块\n</div>",
+    "<!--\n```\n\n# 注释中的围栏不是代码块\n-->\n\n```python\n# a.py\n\n# 代码块中的注释\n```",
+]
+
+
+def describe(nodes):
+    """节点的可比较描述：类型、级别、标题、内容和所属标题。"""
+    return [(node.type, node.level, node.title, node.content, node.parent.title) for node in nodes]
+
+
+@pytest.mark.parametrize("block", HTML_BLOCKS)
+def test_streaming_matches_parse_markdown_around_html_blocks(block):
+    """跨越空行的 HTML 块中的标题行不会成为切分点，流式解析与整篇解析的节点一致。"""
+    markdown_text = f"# 开始\n\n文本\n\n{block}\n\n## 结束\n\n```python\n# b.py\nx = 1\n```\n"
+    expected = describe(list(markdown_parser.parse_markdown(markdown_text).walk())[1:])
+    chunks = [markdown_text[start:start + 7] for start in range(0, len(markdown_text), 7)]
+    actual = describe(markdown_parser.iter_markdown_nodes(iter(chunks), section_size=1))
+    assert actual == expected
+
+
+def test_get_markdown_parser_with_unhashable_options():
+    """选项值不可哈希时不缓存实例，但仍可使用；可哈希的选项返回同一个实例。"""
+    options = {"breaks": True, "langPrefix": "lang-", "highlight": None, "extra": ["a"]}
+    md = markdown_parser.get_markdown_parser("commonmark", options)
+    assert md is not markdown_parser.get_markdown_parser("commonmark", options)
+    assert md.options["breaks"] is True
+
+    assert markdown_parser.get_markdown_parser("commonmark", {"breaks": True}) is \
+        markdown_parser.get_markdown_parser("commonmark", {"breaks": True})
+    assert markdown_parser.parse_markdown("# 标题\n", options={"extra": {"a": 1}}).children[0].title == "标题"
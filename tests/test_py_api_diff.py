@@ -0,0 +1,36 @@
+# /content/utils/tests/test_py_api_diff.py
+"""py_api_diff 的回归测试。"""
+
+import os
+
+import py_api_diff
+
+
+def test_cache_drops_deleted_files_and_unreferenced_symbols(make_tree):
+    """反复比较时，已删除、重命名的文件和内容变化前的旧符号哈希从缓存中删除，缓存大小不随比较次数增长。"""
+    root = make_tree({
+        "old/a.py": "def f():\n    pass\n",
+        "old/b.py": "def g():\n    pass\n",
+        "new/a.py": "def f(x):\n    pass\n",
+        "new/b.py": "def g():\n    pass\n",
+    })
+    old_directory = os.path.join(root, "old")
+    new_directory = os.path.join(root, "new")
+    cache = py_api_diff.SymbolHashCache()
+
+    for version in range(5):
+        with open(os.path.join(new_directory, "a.py"), "w", encoding="utf-8") as f:
+            f.write(f"def f(x{', y' * version}):\n    pass\n")
+        diff = py_api_diff.diff_api(old_directory, new_directory, cache=cache)
+        assert [item["qualname"] for item in diff["changed"]] == ["f"]
+        assert len(cache.digests) == 4
+        assert len(cache.symbols) == 2  # 旧版本和当前版本的 a.py；两边相同的 b.py 不需要解析
+
+    os.rename(os.path.join(new_directory, "b.py"), os.path.join(new_directory, "c.py"))
+    diff = py_api_diff.diff_api(old_directory, new_directory, cache=cache)
+    assert [item["qualname"] for item in diff["removed"]] == ["g"]
+    assert [item["qualname"] for item in diff["added"]] == ["g"]
+    assert os.path.join(new_directory, "b.py") not in cache.digests
+    assert sorted(cache.digests) == sorted(os.path.join(directory, name) for directory, name in (
+        (old_directory, "a.py"), (old_directory, "b.py"), (new_directory, "a.py"), (new_directory, "c.py")))
+    assert set(cache.symbols) == {entry[2] for entry in cache.digests.values()}
@@ -0,0 +1,189 @@
+# /content/utils/tests/test_py_parser.py
+"""py_parser 的回归测试。"""
+
+import os
+import sys
+
+import pytest
+
+import py_parser
+
+
+def test_callback_order_sequential_and_waves(make_tree):
+    """workers 为None时保持原来的拓扑顺序（导入方在前），workers>1 时按波次执行（依赖项在前）。"""
+    root = make_tree({
+        "a.py": "import b\n",
+        "b.py": "import c\n",
+        "c.py": "X = 1\n",
+    })
+    sequential = []
+    parallel = []
+    py_parser.process_files_with_callback(root, sequential.append, verbose=0)
+    py_parser.process_files_with_callback(root, parallel.append, workers=2, verbose=0)
+
+    expected = [os.path.join(root, name) for name in ("a.py", "b.py", "c.py")]
+    assert sequential == expected
+    assert parallel == expected[::-1]
+
+
+def test_get_imported_modules_without_index_does_not_walk_tree(make_tree, monkeypatch):
+    """不传 module_index 时逐个文件调用 get_imported_modules 不会每次都遍历目录，结果与使用索引时相同。"""
+    root = make_tree({
+        "main.py": "import pkg.util\nfrom pkg import sub\nimport os\n",
+        "pkg/__init__.py": "",
+        "pkg/util.py": "from . import sub\nfrom .sub import helper\n",
+        "pkg/sub.py": "from ..main import run\n",
+    })
+    file_paths = py_parser.list_python_files(root)
+    module_index = py_parser.ModuleIndex(root, file_paths)
+    expected = {file_path: py_parser.get_imported_modules(file_path, root, module_index) for file_path in file_paths}
+
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda *args, **kwargs: walks.append(args) or real_walk(*args, **kwargs))
+    actual = {file_path: py_parser.get_imported_modules(file_path, root) for file_path in file_paths}
+
+    assert walks == []
+    assert actual == expected
+    assert expected[os.path.join(root, "main.py")] == [os.path.join(root, "pkg", "util.py"),
+                                                       os.path.join(root, "pkg", "sub.py")]
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_iter_python_files_and_contents_silent_when_verbose_zero(make_tree, capsys, tmp_path, ordered):
+    """verbose=0 时解析失败的文件被跳过、循环依赖照常产出，都不输出警告；verbose=1 时输出警告。"""
+    root = make_tree({"good.py": "X = 1\n", "bad.py": "def (:\n", "c1.py": "import c2\n", "c2.py": "import c1\n"})
+    results = [file_path for file_path, _ in py_parser.iter_python_files_and_contents(root, ordered, verbose=0)]
+    assert sorted(results) == [os.path.join(root, name) for name in ("c1.py", "c2.py", "good.py")]
+    assert capsys.readouterr().out == ""
+
+    output_path = str(tmp_path / "out.jsonl")
+    assert py_parser.write_python_files_jsonl(root, output_path, ordered, verbose=0) == 3
+    assert capsys.readouterr().out == ""
+
+    list(py_parser.iter_python_files_and_contents(root, ordered))
+    out = capsys.readouterr().out
+    assert "bad.py" in out
+    assert ("循环依赖" in out) == ordered
+
+
+IMPORT_SOURCES = [
+    "import a\nimport b.c as d, e\n",
+    "from a import b\nfrom .a.b import c as d, e\nfrom .. import f\nfrom . import *\n",
+    "from a import (\n    b,  # 注释\n    c as d,\n)\n",
+    "import a, \\\n    b\nfrom a import b, \\\n    c\n",
+    "from a \\\n    import b\n",
+    "from \\\n    a import b\n",
+    "from a import \\\n    b\n",
+    "from a import \\\n    (b, c)\n",
+    "from a.\\\nb import c\n",
+    "from .\\\n    import b\n",
+    "def f():\n    from a import b\n    import c\n",
+    "x = 'import a'\n# import b\ns = \"\"\"\nfrom c import d\n\"\"\"\n",
+    "import a; import b\n",
+    "if x: import a\n",
+    "def g():\n    x = (yield\n         from y)\n    import a\n",
+]
+
+
+@pytest.mark.parametrize("source", IMPORT_SOURCES)
+def test_scan_imports_matches_ast(source):
+    """词法扫描的结果与语法树提取的结果一致；无法确定时返回None，由调用方回退到 ast.parse。"""
+    expected = py_parser.extract_imports(py_parser.ast.parse(source))
+    scanned = py_parser.scan_imports(source)
+    if scanned is not None:
+        assert scanned == expected
+    assert py_parser.extract_imports_fast(source) == expected
+
+
+def test_scan_imports_accepts_continuation_before_import():
+    """from 模块名与 import 之间的反斜杠续行不会让扫描把后一行当作 import 语句。"""
+    assert py_parser.scan_imports("from a \\\n    import b\n") == [("a", ("b",), 0)]
+    assert py_parser.scan_imports("from a.\\\nb import c\n") is None
+
+
+COMMENT_SOURCE = '''\
+"""模块说明 # 不是注释"""
+A = f"{'#'} x"  # a 注释
+B = f'{d["#"]}'  # b 注释
+C = f"{x!r:>{width}}#"  # c 注释
+D = """
+# 三引号字符串中的内容，不是注释
+'" 引号也不结束字符串
+"""  # d 注释
+# e 注释
+E = \'\'\'it's # "x"\'\'\'
+F = "say \\"#\\" and 'q'"  # f 注释
+G = 'a' "#" 'b'
+H = f"{'{'}"  # h 注释
+'''
+
+
+def global_docstrings(root, file_name):
+    """解析文件，返回 {全局变量名: 注释}。"""
+    file_info = py_parser.parse_python_file(os.path.join(root, file_name))
+    return {item["global_var_name"]: item["docstring"] for item in file_info["global_vars"]}
+
+
+def test_comment_map_handles_strings_containing_hash(make_tree):
+    """f-string、嵌套引号和三引号字符串中的 # 不会被当作注释，字符串之后的注释仍然被识别。"""
+    root = make_tree({"m.py": COMMENT_SOURCE})
+    assert global_docstrings(root, "m.py") == {
+        "A": "a 注释",
+        "B": "b 注释",
+        "C": "c 注释",
+        "D": None,  # 多行赋值的行尾注释在最后一行，不属于声明所在行
+        "E": "e 注释",
+        "F": "f 注释",
+        "G": None,
+        "H": "h 注释",
+    }
+
+
+def test_comment_scan_regex_matches_tokenize():
+    """正则扫描与 tokenize 扫描的结果一致；花括号不配对的 f-string 让正则扫描放弃，改用 tokenize。"""
+    for source in (COMMENT_SOURCE.replace("H = f\"{'{'}\"  # h 注释\n", ""), open(py_parser.__file__, encoding="utf-8").read()):
+        regex_map = py_parser.CommentMap()
+        tokenize_map = py_parser.CommentMap()
+        assert py_parser.scan_comments(source, regex_map)
+        assert py_parser.scan_comments_tokenize(source, tokenize_map)
+        assert regex_map.trailing == tokenize_map.trailing
+        assert regex_map.full_line == tokenize_map.full_line
+
+    assert not py_parser.scan_comments(COMMENT_SOURCE, py_parser.CommentMap())
+    comment_map = py_parser.build_comment_map(COMMENT_SOURCE)
+    assert comment_map.trailing[8] == "d 注释"
+    assert comment_map.trailing[13] == "h 注释"
+    assert comment_map.full_line == {9: "e 注释"}
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="嵌套同种引号的 f-string 需要 Python 3.12")
+def test_comment_map_nested_same_quote_fstring(make_tree):
+    """Python 3.12 起 f-string 中可以嵌套同种引号，正则无法处理时回退到 tokenize。"""
+    root = make_tree({"m.py": 'A = f"{d["#"]}"  # a 注释\nB = 1  # b 注释\n'})
+    assert global_docstrings(root, "m.py") == {"A": "a 注释", "B": "b 注释"}
+
+
+def test_post_order_walk_keeps_open_descriptors_constant(tmp_path):
+    """深层目录树在较低的文件描述符上限下也能完整遍历，打开的描述符数量不随深度增长。"""
+    resource = pytest.importorskip("resource")
+    depth = 300
+    path = tmp_path
+    for level in range(depth):
+        path = path / f"d{level % 10}"
+    path.mkdir(parents=True)
+    (tmp_path / "d0" / "side").mkdir()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(64, hard), hard))
+    try:
+        errors = []
+        visited = list(py_parser.iter_directories_post_order(str(tmp_path), errors=errors))
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    expected = [root for root, dirs, files in os.walk(str(tmp_path), topdown=False)]
+    assert errors == []
+    assert len(visited) == depth + 2
+    assert sorted(visited) == sorted(expected)
+    assert visited[-1] == str(tmp_path)
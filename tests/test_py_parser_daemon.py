@@ -0,0 +1,99 @@
+# /content/utils/tests/test_py_parser_daemon.py
+"""py_parser_daemon 的回归测试。"""
+
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+import py_parser_daemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="需要 Unix 套接字")
+
+
+def test_serve_answers_ping_while_preloading(make_tree, monkeypatch):
+    """预加载目录在服务开始监听之后进行，加载期间 ping 立即返回，查询等待加载完成。"""
+    root = make_tree({"a.py": "X = 1\n"})
+    socket_path = os.path.join(root, "d.sock")
+    loading = threading.Event()
+    release = threading.Event()
+    real_state = py_parser_daemon.ProjectState
+
+    def slow_state(directory, **kwargs):
+        loading.set()
+        release.wait(10)
+        return real_state(directory, **kwargs)
+
+    monkeypatch.setattr(py_parser_daemon, "ProjectState", slow_state)
+    server_thread = threading.Thread(target=py_parser_daemon.serve, args=(socket_path, [root]), daemon=True)
+    server_thread.start()
+    try:
+        client = py_parser_daemon.DaemonClient(socket_path, timeout=5)
+        assert loading.wait(5)
+        assert client.ping()
+
+        files = []
+        query = threading.Thread(target=lambda: files.extend(client.files(root)))
+        query.start()
+        query.join(0.2)
+        assert query.is_alive()  # 在锁上等待预加载完成
+        release.set()
+        query.join(5)
+        assert files == [os.path.join(root, "a.py")]
+        assert client.directories() == [root]
+    finally:
+        release.set()
+        try:
+            py_parser_daemon.DaemonClient(socket_path, timeout=5).shutdown()
+        except py_parser_daemon.DaemonError:
+            pass
+        server_thread.join(5)
+
+
+def start_server(socket_path):
+    """在后台线程中启动服务并等待可以响应，返回 (线程, 客户端)。"""
+    server_thread = threading.Thread(target=py_parser_daemon.serve, args=(socket_path,), daemon=True)
+    server_thread.start()
+    client = py_parser_daemon.DaemonClient(socket_path, timeout=5)
+    for _ in range(100):
+        try:
+            if client.ping():
+                return server_thread, client
+        except py_parser_daemon.DaemonError:
+            server_thread.join(0.05)
+    raise AssertionError("服务未启动")
+
+
+def test_serve_refuses_live_socket_and_regular_file(tmp_path):
+    """已有服务在监听时拒绝启动，原服务不受影响；路径上是普通文件时不删除它。"""
+    socket_path = str(tmp_path / "d.sock")
+    server_thread, client = start_server(socket_path)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        with pytest.raises(py_parser_daemon.DaemonError):
+            py_parser_daemon.serve(socket_path)
+        assert client.ping()
+    finally:
+        client.shutdown()
+        server_thread.join(5)
+
+    file_path = tmp_path / "notes.txt"
+    file_path.write_text("x", encoding="utf-8")
+    with pytest.raises(py_parser_daemon.DaemonError):
+        py_parser_daemon.serve(str(file_path))
+    assert file_path.read_text(encoding="utf-8") == "x"
+
+
+def test_serve_replaces_stale_socket(tmp_path):
+    """上次未正常退出留下的、无人监听的套接字文件被替换。"""
+    socket_path = str(tmp_path / "d.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(socket_path)
+    assert os.path.exists(socket_path)
+
+    server_thread, client = start_server(socket_path)
+    client.shutdown()
+    server_thread.join(5)
+    assert not os.path.exists(socket_path)
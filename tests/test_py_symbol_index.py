@@ -0,0 +1,98 @@
+# /content/utils/tests/test_py_symbol_index.py
+"""py_symbol_index 的回归测试。"""
+
+import os
+import sqlite3
+
+import pytest
+
+import py_symbol_index
+
+
+def test_update_clears_symbols_of_file_that_fails_to_parse(make_tree, monkeypatch):
+    """文件改为无法解析的内容后，旧的符号和导入关系被清除；内容不变时下次更新不再重新解析。"""
+    root = make_tree({
+        "main.py": "import pkg.c\n",
+        "pkg/__init__.py": "",
+        "pkg/c.py": "import main\n\ndef g():\n    pass\n\nclass C:\n    pass\n",
+    })
+    c_path = os.path.join(root, "pkg", "c.py")
+    with py_symbol_index.SymbolIndex(":memory:") as index:
+        index.update(root, verbose=0)
+        assert [row["file_path"] for row in index.find_function("g")] == [c_path]
+        assert index.dependencies(c_path) == [os.path.join(root, "main.py")]
+
+        with open(c_path, "w", encoding="utf-8") as f:
+            f.write("def (:\n")
+        stats = index.update(root, verbose=0)
+        assert stats["failed"] == 1
+        assert index.find_function("g") == []
+        assert index.find_class("C") == []
+        assert index.dependencies(c_path) == []
+        assert index.dependents(c_path) == [os.path.join(root, "main.py")]
+
+        # 只修改 mtime，内容哈希相同，不再解析
+        os.utime(c_path, ns=(0, 0))
+        analyzed = []
+        real_iter = py_symbol_index.iter_file_analyses
+        monkeypatch.setattr(py_symbol_index, "iter_file_analyses",
+                            lambda file_paths, **kwargs: analyzed.extend(file_paths) or real_iter(file_paths, **kwargs))
+        stats = index.update(root, verbose=0)
+        assert analyzed == []
+        assert stats == {"parsed": 0, "unchanged": 3, "removed": 0, "failed": 0}
+
+
+def test_open_refuses_database_with_unrelated_tables(tmp_path):
+    """指向其他应用的数据库时拒绝重建，已有的表和数据保持不变。"""
+    db_path = str(tmp_path / "app.db")
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute("CREATE TABLE users (name TEXT)")
+        connection.execute("INSERT INTO users VALUES ('a')")
+    connection.close()
+
+    with pytest.raises(ValueError):
+        py_symbol_index.SymbolIndex(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("SELECT name FROM users").fetchall() == [("a",)]
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == 0
+    connection.close()
+
+
+def test_rebuild_drops_only_own_tables(tmp_path):
+    """结构版本变化时只重建本模块的表，索引数据库中用户自己加的表保留。"""
+    db_path = str(tmp_path / "symbols.db")
+    with py_symbol_index.SymbolIndex(db_path) as index:
+        with index.connection:
+            index.connection.execute("CREATE TABLE notes (text TEXT)")
+            index.connection.execute("INSERT INTO notes VALUES ('x')")
+            index.connection.execute("INSERT INTO files (path, root, file_name, mtime_ns, size, hash) "
+                                     "VALUES ('/a.py', '/', 'a.py', 0, 0, '')")
+
+    with py_symbol_index.SymbolIndex(db_path) as index:
+        assert index.query("SELECT text FROM notes") == [{"text": "x"}]
+        assert len(index.query("SELECT path FROM files")) == 1
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA user_version = 0")
+    connection.execute("DROP TABLE notes")
+    connection.close()
+    with py_symbol_index.SymbolIndex(db_path) as index:
+        assert index.query("SELECT path FROM files") == []
+
+
+def test_update_treats_file_deleted_during_scan_as_removed(make_tree, monkeypatch):
+    """遍历到的文件在读取状态之前被删除时，按已删除处理，不中断整个更新。"""
+    root = make_tree({"a.py": "def f():\n    pass\n", "b.py": "def g():\n    pass\n"})
+    b_path = os.path.join(root, "b.py")
+    with py_symbol_index.SymbolIndex(":memory:") as index:
+        index.update(root, verbose=0)
+        listed = list(py_symbol_index.iter_python_files(root))
+        os.remove(b_path)
+        monkeypatch.setattr(py_symbol_index, "iter_python_files", lambda directory_path: iter(listed))
+
+        stats = index.update(root, verbose=0)
+        assert stats == {"parsed": 0, "unchanged": 1, "removed": 1, "failed": 0}
+        assert index.find_function("g") == []
+        assert [row["function_name"] for row in index.find_function("f")] == ["f"]